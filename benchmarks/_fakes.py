@@ -0,0 +1,299 @@
+"""부하 테스트용 가짜 Discord 객체와 가짜 yt-dlp
+
+MusicCog가 실제로 쓰는 속성/메서드만 흉내 냅니다. 음성 클라이언트는 py-cord의 AudioPlayer처럼
+스레드 하나에서 20ms마다 source.read()를 호출하고, 곡이 끝나면 after 콜백을 부른 뒤 소스를 정리합니다.
+"""
+import asyncio
+import itertools
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+FRAME_SECONDS = 0.02
+_ids = itertools.count(1)
+
+
+class FakeEncoder:
+    """Opus 인코딩을 건너뛸 때 쓰는 인코더 (voice_client.encoder가 None이 아니기만 하면 됨)"""
+    SAMPLES_PER_FRAME = 960
+
+    def encode(self, data, frame_size):
+        return data
+
+
+class FakeMessage:
+    def __init__(self, content=None):
+        self.id = next(_ids)
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+
+
+class FakeTextChannel:
+    def __init__(self, guild):
+        self.id = next(_ids)
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return FakeMessage(content)
+
+
+class FakeVoiceClient:
+    def __init__(self, channel, encoder=None):
+        self.channel = channel
+        self.guild = channel.guild
+        self.encoder = encoder or FakeEncoder()
+        self._connected = True
+        self._thread = None
+        self._stop = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self.frames = 0
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._thread is not None and self._thread.is_alive() and self._resumed.is_set()
+
+    def is_paused(self):
+        return self._thread is not None and self._thread.is_alive() and not self._resumed.is_set()
+
+    def play(self, source, after=None):
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("Already playing audio.")
+        self._stop = threading.Event()
+        self._resumed.set()
+        self._thread = threading.Thread(target=self._run, args=(source, after, self._stop), daemon=True)
+        self._thread.start()
+
+    def _run(self, source, after, stopped):
+        error = None
+        next_at = time.perf_counter()
+        try:
+            while not stopped.is_set():
+                if not self._resumed.is_set():
+                    self._resumed.wait(0.1)
+                    next_at = time.perf_counter()
+                    continue
+                data = source.read()
+                if not data:
+                    break
+                if not source.is_opus():
+                    self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME)
+                self.frames += 1
+                if self.guild.first_audio_at is None:
+                    self.guild.first_audio_at = time.perf_counter()
+                next_at += FRAME_SECONDS
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception as e:
+            error = e
+        finally:
+            # py-cord AudioPlayer와 같은 순서: after 콜백 → 소스 정리
+            if after is not None:
+                try:
+                    after(error)
+                except Exception:
+                    pass
+            source.cleanup()
+
+    def stop(self):
+        self._stop.set()
+        self._resumed.set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, force=False):
+        self.stop()
+        self._connected = False
+        self.guild.voice_client = None
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild, member, encoder_factory=None):
+        self.id = next(_ids)
+        self.name = f'voice-{guild.id}'
+        self.guild = guild
+        self.members = [member]
+        self._encoder_factory = encoder_factory
+
+    async def connect(self, timeout=None, **kwargs):
+        await asyncio.sleep(0)  # 실제 연결처럼 한 번 양보
+        encoder = self._encoder_factory() if self._encoder_factory else None
+        self.guild.voice_client = FakeVoiceClient(self, encoder)
+        return self.guild.voice_client
+
+
+class FakeGuild:
+    def __init__(self, guild_id, encoder_factory=None):
+        self.id = guild_id
+        self.name = f'bench-{guild_id}'
+        self.voice_client = None
+        self.first_audio_at = None  # 첫 오디오 프레임이 나간 시각(perf_counter). 음성 스레드가 기록
+        self.member = SimpleNamespace(id=next(_ids), name=f'user-{guild_id}', bot=False, voice=None)
+        self.voice_channel = FakeVoiceChannel(self, self.member, encoder_factory)
+        self.member.voice = SimpleNamespace(channel=self.voice_channel)
+        self.text_channel = FakeTextChannel(self)
+
+    def get_channel(self, channel_id):
+        return self.voice_channel if channel_id == self.voice_channel.id else None
+
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+
+class FakeFollowup:
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    async def send(self, content=None, **kwargs):
+        self.ctx.response.done = True
+        return FakeMessage(content)
+
+
+class FakeContext:
+    """슬래시 명령어 컨텍스트 (discord.ApplicationContext 중 MusicCog가 쓰는 부분)"""
+    def __init__(self, guild, command, options):
+        self.guild = guild
+        self.author = guild.member
+        self.channel = guild.text_channel
+        self.command = SimpleNamespace(name=command)
+        self.options = options
+        self.response = FakeResponse()
+        self.followup = FakeFollowup(self)
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def defer(self, **kwargs):
+        self.response.done = True
+
+    async def respond(self, content=None, **kwargs):
+        self.response.done = True
+        return FakeMessage(content)
+
+    async def original_response(self):
+        return FakeMessage()
+
+
+class FakeBot:
+    def __init__(self, loop, guilds):
+        self.loop = loop
+        self._guilds = {guild.id: guild for guild in guilds}
+        self.user = SimpleNamespace(id=0)
+        self.latency = 0.0
+        self.cogs = {}
+
+    @property
+    def guilds(self):
+        return list(self._guilds.values())
+
+    @property
+    def voice_clients(self):
+        return [guild.voice_client for guild in self._guilds.values() if guild.voice_client]
+
+    def get_guild(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        return None
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def is_ready(self):
+        return True
+
+
+class FakeYoutube:
+    """core.extractor의 워커 함수를 대신하는 가짜 yt-dlp
+
+    모든 곡은 로컬 HTTP 서버의 같은 오디오 파일을 가리키며(video id는 쿼리로 구분), 호출마다
+    latency초(0.5~1.5배 지터) 동안 워커를 붙잡고 fail_rate 확률로 실패합니다.
+    """
+    def __init__(self, audio_url, latency=0.5, fail_rate=0.0, track_seconds=30, playlist_size=200, seed=None):
+        self.audio_url = audio_url
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.track_seconds = track_seconds
+        self.playlist_size = playlist_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _work(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+            failed = self._random.random() < self.fail_rate
+            if failed:
+                self.failures += 1
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("fake extraction failure")
+
+    def _entries(self, prefix, count, start=0):
+        return [{'id': f'{prefix}{i}', 'title': f'{prefix} #{i}'} for i in range(start, start + count)]
+
+    def _stream_info(self, video_id):
+        return {
+            'id': video_id,
+            'title': f'Track {video_id}',
+            'duration': self.track_seconds,
+            'webpage_url': f'https://www.youtube.com/watch?v={video_id}',
+            'formats': [{
+                'url': f'{self.audio_url}?v={video_id}', 'format_id': '251', 'ext': 'webm', 'acodec': 'opus',
+                'abr': 128, 'asr': 48000, 'audio_channels': 2, 'container': 'webm_dash', 'protocol': 'https',
+            }],
+        }
+
+    def run_extract(self, profile, url, sanitize, params=None):
+        self._work()
+        video_id = url.split('v=')[-1].split('&')[0]
+        if profile == 'related':
+            return {'entries': self._entries(f'rel{video_id}x', 10)}
+        if profile == 'playlist':
+            first, _, last = (params or {}).get('playlist_items', f'1-{self.playlist_size}').partition('-')
+            start, end = int(first) - 1, min(int(last), self.playlist_size)
+            return {'entries': self._entries(f'pl{video_id}x', max(0, end - start), start)}
+        if url.startswith('ytsearch'):
+            return {'entries': [self._stream_info(f'search{i}') for i in range(5)]}
+        return self._stream_info(video_id)
+
+    def run_open_playlist(self, url):
+        self._work()
+        list_id = url.split('list=')[-1]
+
+        def entries():
+            for i in range(self.playlist_size):
+                if i and i % 100 == 0:
+                    self._work()  # 다음 페이지 요청
+                yield {'id': f'pl{list_id}x{i}', 'title': f'{list_id} #{i}'}
+        return entries()
+
+    def install(self):
+        import core.extractor
+
+        core.extractor._run_extract = self.run_extract
+        core.extractor._run_open_playlist = self.run_open_playlist
+        core.extractor._warm_worker = lambda: None
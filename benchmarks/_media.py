@@ -0,0 +1,41 @@
+"""벤치마크 공용: 테스트 오디오 파일 생성과 로컬 HTTP 서버"""
+import functools
+import http.server
+import os
+import shlex
+import subprocess
+import threading
+
+# (파일 이름, 생성용 FFmpeg 인코딩 옵션, yt-dlp가 알려 주는 포맷 정보)
+TEST_FILES = [
+    ('test.m4a', '-c:a aac -b:a 128k -movflags +faststart', {'ext': 'm4a', 'container': 'm4a_dash', 'acodec': 'mp4a.40.2', 'asr': 44100, 'abr': 128}),
+    ('test.webm', '-c:a libopus -b:a 128k -ar 48000', {'ext': 'webm', 'container': 'webm_dash', 'acodec': 'opus', 'asr': 48000, 'abr': 128}),
+]
+
+
+def generate_files(directory, seconds, names=None):
+    for name, encode_opts, _ in TEST_FILES:
+        if names and name not in names:
+            continue
+        subprocess.run(
+            ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+             '-ac', '2', *shlex.split(encode_opts), os.path.join(directory, name)],
+            check=True,
+        )
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory):
+    """directory를 서빙하는 HTTP 서버를 백그라운드 스레드로 띄웁니다."""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def file_url(server, name):
+    return f'http://127.0.0.1:{server.server_address[1]}/{name}'
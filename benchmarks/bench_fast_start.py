@@ -0,0 +1,82 @@
+"""FFmpeg 시작 지연 벤치마크: 전체 프로브 vs fast-start
+
+로컬 HTTP 서버로 테스트 오디오 파일(m4a/AAC, webm/Opus)을 서빙하고,
+FFmpeg를 띄운 뒤 첫 PCM 프레임(20ms)이 나올 때까지의 시간을 두 모드로 측정합니다.
+
+    python benchmarks/bench_fast_start.py --runs 20
+"""
+import argparse
+import os
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks._media import TEST_FILES, generate_files, start_server, file_url  # noqa: E402
+from core.ffmpeg import build_ffmpeg_options  # noqa: E402
+
+FRAME_SIZE = 3840  # 48kHz, 16bit, stereo, 20ms
+
+
+def time_to_first_frame(url, ffmpeg_opts):
+    # discord.FFmpegPCMAudio와 같은 순서로 인자를 구성합니다.
+    args = ['ffmpeg', *shlex.split(ffmpeg_opts['before_options']), '-i', url,
+            '-f', 's16le', '-ar', '48000', '-ac', '2', '-loglevel', 'warning',
+            *shlex.split(ffmpeg_opts['options']), 'pipe:1']
+    started = time.perf_counter()
+    proc = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        frame = proc.stdout.read(FRAME_SIZE)
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.kill()
+        proc.wait()
+    if len(frame) != FRAME_SIZE:
+        raise RuntimeError(f"FFmpeg produced no audio for {url}")
+    return elapsed
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {label:<11} median={statistics.median(samples) * 1000:7.1f} ms  p95={p95 * 1000:7.1f} ms  min={samples[0] * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--seconds', type=int, default=30, help='테스트 파일 길이(초)')
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg'):
+        sys.exit("ffmpeg를 찾을 수 없습니다.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_files(directory, args.seconds)
+        server = start_server(directory)
+        try:
+            for name, _, stream_format in TEST_FILES:
+                url = file_url(server, name)
+                modes = {
+                    'full-probe': build_ffmpeg_options(stream_format, fast_start=False),
+                    'fast-start': build_ffmpeg_options(stream_format, fast_start=True),
+                }
+                results = {label: [] for label in modes}
+                # 두 모드를 번갈아 측정해 캐시/워밍업 편향을 줄입니다.
+                for _ in range(args.runs):
+                    for label, ffmpeg_opts in modes.items():
+                        results[label].append(time_to_first_frame(url, ffmpeg_opts))
+                print(f"{name} ({stream_format['acodec']}, {args.runs} runs)")
+                for label, samples in results.items():
+                    report(label, samples)
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""오프라인 부하 테스트: 수백 개 길드에서 MusicCog 명령어를 동시에 실행
+
+네트워크 없이 실행됩니다. (ffmpeg 필요)
+- 가짜 음성 클라이언트: 길드마다 스레드 하나가 20ms마다 프레임을 읽음 (전송은 하지 않음)
+- 가짜 yt-dlp: 호출마다 --extract-latency초 지연, --fail-rate 확률로 실패
+- 로컬 HTTP 서버: 모든 곡이 같은 webm/Opus 테스트 파일을 스트리밍
+
+길드마다 /play로 재생을 시작한 뒤 --duration초 동안 /play, /queue, /skip, /playlist 등을 무작위로 섞어 실행하고
+명령어 처리량, 첫 오디오까지의 시간, 이벤트 루프 지연, 길드당 메모리를 보고합니다.
+
+    python benchmarks/bench_load.py --guilds 200 --duration 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks._media import generate_files, start_server, file_url  # noqa: E402
+
+# 첫 /play 뒤에 실행할 명령어 비율
+COMMAND_MIX = (('play', 0.40), ('queue', 0.20), ('skip', 0.15), ('nowplaying', 0.15), ('remove', 0.05), ('playlist', 0.05))
+FIRST_AUDIO_TIMEOUT = 60.0
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def rss_bytes():
+    """현재 프로세스의 RSS (리눅스 /proc 기준)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class LoadTest:
+    def __init__(self, args, audio_url):
+        from benchmarks._fakes import FakeBot, FakeGuild, FakeYoutube
+        from cogs.music import MusicCog
+
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.youtube = FakeYoutube(
+            audio_url, latency=args.extract_latency, fail_rate=args.fail_rate,
+            track_seconds=args.track_seconds, playlist_size=args.playlist_size, seed=args.seed,
+        )
+        self.youtube.install()
+        encoder_factory = None
+        if args.encode:
+            import discord
+            encoder_factory = discord.opus.Encoder
+        self.guilds = [FakeGuild(1000 + i, encoder_factory) for i in range(args.guilds)]
+        self.bot = FakeBot(asyncio.get_running_loop(), self.guilds)
+        self.cog = MusicCog(self.bot)
+        self.bot.cogs['MusicCog'] = self.cog
+        self.command_latency = defaultdict(list)
+        self.command_errors = defaultdict(int)
+        self.first_audio = []
+        self.first_audio_timeouts = 0
+        self.loop_lag = []
+        self.ffmpeg_peak = 0
+        self._next_video = 0
+
+    def _video_url(self):
+        self._next_video += 1
+        return f'https://www.youtube.com/watch?v=bench{self._next_video}'
+
+    async def invoke(self, guild, command, *args):
+        from benchmarks._fakes import FakeContext
+
+        ctx = FakeContext(guild, command, {'args': args})
+        started = time.perf_counter()
+        try:
+            await self.cog.cog_before_invoke(ctx)
+            await getattr(self.cog, command).callback(self.cog, ctx, *args)
+        except Exception as e:
+            self.command_errors[command] += 1
+            if self.args.verbose:
+                print(f"  /{command} failed in guild {guild.id}: {e!r}")
+        self.command_latency[command].append(time.perf_counter() - started)
+
+    async def run_guild(self, index, guild, deadline):
+        await asyncio.sleep(index * self.args.ramp / max(1, self.args.guilds))
+        started = time.perf_counter()
+        await self.invoke(guild, 'play', self._video_url())
+        while guild.first_audio_at is None and time.perf_counter() - started < FIRST_AUDIO_TIMEOUT:
+            await asyncio.sleep(0.02)
+        if guild.first_audio_at is None:
+            self.first_audio_timeouts += 1
+        else:
+            self.first_audio.append(guild.first_audio_at - started)
+        commands, weights = zip(*COMMAND_MIX)
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.random.expovariate(1 / self.args.think))
+            if time.perf_counter() >= deadline:
+                break
+            command = self.random.choices(commands, weights)[0]
+            if command == 'play':
+                await self.invoke(guild, 'play', self._video_url())
+            elif command == 'playlist':
+                await self.invoke(guild, 'playlist', f'https://www.youtube.com/playlist?list=PL{guild.id}x{self._next_video}')
+            elif command == 'remove':
+                await self.invoke(guild, 'remove', 1)
+            else:
+                await self.invoke(guild, command)
+
+    async def sample(self, deadline):
+        """이벤트 루프 지연과 FFmpeg 프로세스 수를 주기적으로 기록합니다."""
+        from core.metrics import count_ffmpeg_processes
+
+        loop = asyncio.get_running_loop()
+        interval = 0.05
+        last_ffmpeg = 0.0
+        while time.perf_counter() < deadline:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag.append(max(0.0, time.perf_counter() - expected))
+            if time.perf_counter() - last_ffmpeg >= 1.0:
+                last_ffmpeg = time.perf_counter()
+                count = await loop.run_in_executor(None, count_ffmpeg_processes)
+                self.ffmpeg_peak = max(self.ffmpeg_peak, count or 0)
+
+    async def run(self):
+        rss_before = rss_bytes()
+        own_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.perf_counter()
+        deadline = started + self.args.ramp + self.args.duration
+        await asyncio.gather(
+            self.sample(deadline),
+            *(self.run_guild(i, guild, deadline) for i, guild in enumerate(self.guilds)),
+        )
+        wall = time.perf_counter() - started
+        rss_after = rss_bytes()
+        own_after = resource.getrusage(resource.RUSAGE_SELF)
+        report = self.report(wall, rss_after - rss_before)
+        await self.teardown()
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        python_cpu = (own_after.ru_utime + own_after.ru_stime) - (own_before.ru_utime + own_before.ru_stime)
+        ffmpeg_cpu = (children_after.ru_utime + children_after.ru_stime) - (children_before.ru_utime + children_before.ru_stime)
+        report.append(f"  cpu: python={python_cpu:.1f}s ffmpeg={ffmpeg_cpu:.1f}s over {wall:.1f}s wall")
+        print('\n'.join(report))
+
+    def report(self, wall, rss_delta):
+        from core.audio import gap_tracker
+        from core.extractor import extraction_engine
+
+        total = sum(len(samples) for samples in self.command_latency.values())
+        started = sum(state.player.started for state in self.cog.states.values())
+        skipped = sum(state.player.skipped for state in self.cog.states.values())
+        queued = sum(len(state.queue) for state in self.cog.states.values())
+        extraction = extraction_engine.stats()
+        gaps = gap_tracker.stats()
+        lines = [
+            f"{self.args.guilds} guilds, {wall:.1f}s (ramp {self.args.ramp}s + {self.args.duration}s), "
+            f"extract latency {self.args.extract_latency * 1000:.0f}ms, fail rate {self.args.fail_rate:.0%}",
+            f"  commands: {total} ({total / wall:.1f}/s), errors {dict(self.command_errors) or 0}",
+        ]
+        for command, samples in sorted(self.command_latency.items()):
+            lines.append(
+                f"    /{command:<11} n={len(samples):<6} p50={percentile(samples, 0.5) * 1000:7.1f}ms "
+                f"p95={percentile(samples, 0.95) * 1000:7.1f}ms max={max(samples) * 1000:7.1f}ms"
+            )
+        lines += [
+            f"  first audio: p50={percentile(self.first_audio, 0.5) * 1000:.0f}ms "
+            f"p95={percentile(self.first_audio, 0.95) * 1000:.0f}ms p99={percentile(self.first_audio, 0.99) * 1000:.0f}ms "
+            f"max={max(self.first_audio, default=0) * 1000:.0f}ms timeouts={self.first_audio_timeouts}",
+            f"  tracks: started={started} ({started / wall:.1f}/s) skipped={skipped} queued={queued}",
+            f"  extraction: calls={self.youtube.calls} failed={extraction['failed']} rejected={extraction['rejected']} "
+            f"wait_avg={extraction['wait_avg'] * 1000:.0f}ms",
+            f"  gaps: p50={gaps['p50_ms']:.1f}ms p95={gaps['p95_ms']:.1f}ms gapless={gaps['gapless']} fallback={gaps['fallback']}",
+            f"  loop lag: p50={percentile(self.loop_lag, 0.5) * 1000:.1f}ms p99={percentile(self.loop_lag, 0.99) * 1000:.1f}ms "
+            f"max={max(self.loop_lag, default=0) * 1000:.1f}ms",
+            f"  memory: rss +{rss_delta / 2**20:.1f}MiB ({rss_delta / max(1, self.args.guilds) / 1024:.0f}KiB/guild), "
+            f"ffmpeg processes peak={self.ffmpeg_peak}",
+        ]
+        return lines
+
+    async def teardown(self):
+        for guild in self.guilds:
+            if guild.voice_client:
+                await guild.voice_client.disconnect()
+            self.cog._drop_state(guild.id)
+        await asyncio.sleep(0.5)  # 음성 스레드가 after 콜백과 정리를 끝낼 시간
+        self.cog.cog_unload()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=100, help='동시에 재생하는 길드 수')
+    parser.add_argument('--duration', type=float, default=60, help='모든 길드가 시작된 뒤 부하를 유지할 시간(초)')
+    parser.add_argument('--ramp', type=float, default=10, help='길드를 나눠 시작하는 시간(초)')
+    parser.add_argument('--think', type=float, default=5.0, help='길드마다 명령어 사이 평균 간격(초)')
+    parser.add_argument('--extract-latency', type=float, default=0.5, help='가짜 yt-dlp 호출당 지연(초)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='가짜 yt-dlp 실패 확률 (0~1)')
+    parser.add_argument('--track-seconds', type=int, default=30, help='테스트 곡 길이(초)')
+    parser.add_argument('--playlist-size', type=int, default=200, help='가짜 재생목록 길이')
+    parser.add_argument('--yt-rate', type=float, default=50.0, help='유튜브 요청 토큰 버킷의 초당 보충량 (YT_REQUEST_RATE)')
+    parser.add_argument('--workers', type=int, default=8, help='추출 워커 수 (EXTRACT_WORKERS)')
+    parser.add_argument('--encode', action='store_true', help='PCM 곡을 실제로 Opus 인코딩 (libopus 필요)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='실패한 명령어 출력')
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg'):
+        sys.exit("ffmpeg를 찾을 수 없습니다.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # core 모듈은 import 시점에 환경 변수를 읽으므로 먼저 지정합니다. 디스크에 남는 저장소는 모두 끕니다.
+        os.environ.update({
+            'EXTRACT_MODE': 'thread',
+            'EXTRACT_WORKERS': str(args.workers),
+            'EXTRACT_MAX_WAITING': str(max(32, args.guilds * 2)),
+            'YT_REQUEST_RATE': str(args.yt_rate),
+            'YT_REQUEST_BURST': str(max(10, int(args.yt_rate))),
+            'GUILD_STATE_PATH': '',
+            'AUDIO_CACHE_DIR': '',
+            'SHARED_STORE_PATH': '',
+            'RELATED_CACHE_PATH': '',
+            'LOUDNESS_CACHE_PATH': os.path.join(directory, 'loudness.json'),
+            'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+        })
+        from core.logs import setup_logging
+        setup_logging(level=os.environ['LOG_LEVEL'])
+
+        generate_files(directory, args.track_seconds, names=['test.webm'])
+        server = start_server(directory)
+        try:
+            async def run():
+                await LoadTest(args, file_url(server, 'test.webm')).run()
+            asyncio.run(run())
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""스트림당 CPU 벤치마크: PCM 트랜스코딩 vs Opus passthrough
+
+로컬 HTTP 서버로 webm/Opus 테스트 파일을 서빙하고, N개의 가짜 음성 클라이언트가
+동시에 재생하는 상황을 두 경로로 흉내 냅니다.
+
+- pcm: FFmpegPCMAudio(디코딩 + loudnorm/volume 없음) → 프레임마다 libopus 인코딩
+- passthrough: FFmpegOpusAudio(codec='opus') → Opus 패킷을 그대로 사용
+
+가짜 클라이언트는 실제 VoiceClient처럼 source.read()와 (필요하면) Encoder.encode()만 수행하고
+전송은 하지 않습니다. FFmpeg 자식 프로세스와 파이썬 프로세스의 CPU 시간을 합산해
+오디오 1초당 스트림 하나가 쓰는 CPU 비율을 보고합니다.
+
+    python benchmarks/bench_opus_passthrough.py --clients 20 --seconds 60
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import discord  # noqa: E402
+
+from benchmarks._media import generate_files, start_server, file_url  # noqa: E402
+from core.ffmpeg import build_ffmpeg_options  # noqa: E402
+
+FRAME_SECONDS = 0.02
+STREAM_FORMAT = {'ext': 'webm', 'container': 'webm_dash', 'acodec': 'opus', 'asr': 48000, 'abr': 128}
+
+
+def open_source(url, passthrough):
+    # 볼륨 보정이 필요 없는 곡(또는 /normalize off)의 옵션
+    ffmpeg_opts = build_ffmpeg_options(STREAM_FORMAT, normalize=False)
+    if passthrough:
+        return discord.FFmpegOpusAudio(url, codec='opus', **ffmpeg_opts)
+    return discord.FFmpegPCMAudio(url, **ffmpeg_opts)
+
+
+def fake_voice_client(url, passthrough, realtime, results, errors, index):
+    try:
+        results[index] = play(url, passthrough, realtime)
+    except Exception as e:
+        errors[index] = e
+
+
+def play(url, passthrough, realtime):
+    encoder = None if passthrough else discord.opus.Encoder()
+    source = open_source(url, passthrough)
+    frames = 0
+    next_at = time.perf_counter()
+    try:
+        while True:
+            data = source.read()
+            if not data:
+                break
+            if not source.is_opus():
+                data = encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+            frames += 1
+            if realtime:
+                next_at += FRAME_SECONDS
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        source.cleanup()
+    return frames
+
+
+def cpu_times():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def run(url, clients, passthrough, realtime):
+    results = [0] * clients
+    errors = [None] * clients
+    own_before, children_before = cpu_times()
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=fake_voice_client, args=(url, passthrough, realtime, results, errors, i))
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 클라이언트가 하나라도 실패하면 CPU 비율이 의미 없으므로 결과 대신 그 예외를 올립니다.
+    for error in errors:
+        if error is not None:
+            raise error
+    wall = time.perf_counter() - started
+    own_after, children_after = cpu_times()
+    audio_seconds = sum(results) * FRAME_SECONDS
+    own_cpu = own_after - own_before
+    ffmpeg_cpu = children_after - children_before
+    return {
+        'wall': wall,
+        'python_cpu': own_cpu,
+        'ffmpeg_cpu': ffmpeg_cpu,
+        'audio_seconds': audio_seconds,
+        'cpu_per_stream_pct': (own_cpu + ffmpeg_cpu) / audio_seconds * 100 if audio_seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=10, help='동시에 재생하는 가짜 음성 클라이언트 수')
+    parser.add_argument('--seconds', type=int, default=60, help='테스트 파일 길이(초)')
+    parser.add_argument('--realtime', action='store_true', help='실제 플레이어처럼 20ms마다 한 프레임씩 읽기')
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg'):
+        sys.exit("ffmpeg를 찾을 수 없습니다.")
+    if not discord.opus.is_loaded() and not discord.opus._load_default():
+        sys.exit("libopus를 불러올 수 없습니다. PCM 경로의 인코딩을 측정하려면 libopus가 필요합니다.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_files(directory, args.seconds, names=['test.webm'])
+        server = start_server(directory)
+        url = file_url(server, 'test.webm')
+        try:
+            print(f"{args.clients} clients x {args.seconds}s audio ({'realtime' if args.realtime else 'unpaced'})")
+            for label, passthrough in (('pcm', False), ('passthrough', True)):
+                result = run(url, args.clients, passthrough, args.realtime)
+                print(
+                    f"  {label:<12} wall={result['wall']:6.1f}s  python_cpu={result['python_cpu']:6.2f}s  "
+                    f"ffmpeg_cpu={result['ffmpeg_cpu']:6.2f}s  cpu/stream={result['cpu_per_stream_pct']:5.2f}% of one core"
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import discord
+from discord.ext import commands
+
+from core.audio import gap_tracker
+from core.extractor import extraction_engine
+from core.watchdog import loop_watchdog
+
+
+class DiagnosticsCog(commands.Cog):
+    """봇 상태를 점검하는 관리자용 명령어입니다."""
+    def __init__(self, bot):
+        self.bot = bot
+
+    @discord.slash_command(name="diag", description="이벤트 루프 지연과 블로킹 위치 등 봇 진단 정보를 보여줍니다.")
+    @discord.default_permissions(manage_guild=True)
+    async def diag(self, ctx: discord.ApplicationContext):
+        stats = loop_watchdog.stats(top=5)
+        extraction = extraction_engine.stats()
+        gaps = gap_tracker.stats()
+        embed = discord.Embed(title="진단 정보", color=discord.Color.orange())
+        embed.add_field(
+            name="이벤트 루프",
+            value=(
+                f"지연: 최근 {stats['last_lag_ms']:.1f}ms / 최대 {stats['max_lag_ms']:.0f}ms\n"
+                f"{stats['threshold_ms']:.0f}ms 이상 블로킹: {stats['blocks']}회"
+                + ("" if stats['enabled'] else " (감시 꺼짐)")
+            ),
+            inline=False,
+        )
+        embed.add_field(
+            name="추출",
+            value=(
+                f"실행 중 {extraction['active']}/{extraction['workers']}, 대기 {extraction['queue_depth']}\n"
+                f"p95 {extraction['latency_p95']:.1f}s, 실패 {extraction['failed']}"
+            ),
+            inline=True,
+        )
+        embed.add_field(
+            name="곡 전환",
+            value=f"무음 p95 {gaps['p95_ms']:.0f}ms\n끊김 없음 {gaps['gapless']} / 일반 {gaps['fallback']}",
+            inline=True,
+        )
+        if stats['offenders']:
+            lines = [
+                f"`{offender['signature']}` {offender['count']}회, 최대 {offender['max_ms']:.0f}ms"
+                for offender in stats['offenders']
+            ]
+            embed.add_field(name="루프를 막은 위치 (누적 시간 순)", value='\n'.join(lines)[:1024], inline=False)
+        await ctx.respond(embed=embed, ephemeral=True)
+
+
+def setup(bot):
+    """Cog를 봇에 등록합니다."""
+    bot.add_cog(DiagnosticsCog(bot))
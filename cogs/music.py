@@ -1,62 +1,110 @@
-from ui import PaginationView
+from ui.PaginationView import PaginationView
 import discord
 import asyncio
-import yt_dlp as youtube_dl
-import functools
-from collections import deque
-from utils import get_related_videos
+from utils import related_candidates
+from core.track import Track, YOUTUBE_WATCH_URL
+from core.track_queue import TrackQueue
+from core.stream_cache import stream_cache
+from core.shared_store import shared_store
+from core.extractor import extraction_engine
+from core.scheduler import RequestDropped, PRIORITY_PREFETCH, PRIORITY_AUTOCOMPLETE
+from core.prefetch import Prefetcher, is_stream_fresh, PLAYBACK_MIN_TTL
+from core.audio import GaplessStream, PRELOAD_LEAD_SECONDS
+from core.player import GuildPlayer, PlayerStatus, PlayOutcome, backoff_delay, PLAYER_TRACK_ATTEMPTS
+from core.loader import extract_info, prepare_track, open_track
+from core.disk_cache import audio_disk_cache
+from core.guild_store import guild_store, GUILD_RESUME_MAX_AGE, GUILD_RESUME_STAGGER
+from core.loudness import loudness_analyzer
+from core.logs import set_log_context
+from core.search import search_cache, title_index, normalize_query
+from core.suggest import track_suggestions
+from core.history import PlayedHistory
 import logging
 import random
 import discord.ui
-import re
+import time
 
 logger = logging.getLogger(__name__)
 
 
-# yt-dlp와 FFmpeg 옵션 설정
-YDL_OPTS = {
-    'format': 'bestaudio[ext=m4a]/bestaudio/best',
-    'quiet': True,
-    'noplaylist': True,
-    'source_address': '0.0.0.0', # Force IPv4
-    'cookiefile': './cookies.txt',
-}
-FFMPEG_OPTS = {
-    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -analyzeduration 8M -probesize 32M',
-    'options': '-vn -af loudnorm=I=-16:TP=-1.5:LRA=11',
-}
-QUEUE_LIMIT = 30
+# FFmpeg 옵션은 core/ffmpeg.py, yt-dlp 옵션은 core/extractor.py의 YDL_PROFILES 참고
+QUEUE_LIMIT = 5000
+# 재생목록을 불러올 때 아직 재생하지 않은 곡이 이만큼 쌓이면 재생이 진행될 때까지 가져오기를 멈춥니다.
+PLAYLIST_LOOKAHEAD = 200
+PLAYLIST_PROGRESS_INTERVAL = 3.0 # 진행 상황 메시지 수정 간격(초)
+# /play 검색 결과로 보여 줄 곡 수와 그중 제목 색인(최근 대기열/재생 곡)에서 바로 보여 줄 최대 곡 수
+SEARCH_RESULTS = 5
+SEARCH_LOCAL_RESULTS = 3
+# /play 자동완성. Discord는 3초 안에 응답하지 않은 자동완성을 버립니다.
+AUTOCOMPLETE_RESULTS = 10
+AUTOCOMPLETE_REMOTE_MIN_CHARS = 3 # 이보다 짧은 입력은 유튜브에 묻지 않습니다.
+AUTOCOMPLETE_DEBOUNCE = 0.35 # 이 시간 안에 다음 글자가 입력되면 이전 입력의 유튜브 검색은 보내지 않습니다.
+AUTOCOMPLETE_TIMEOUT = 2.0 # 유튜브 검색을 기다릴 최대 시간(초). 넘으면 로컬 결과만 보여 주고 검색은 캐시를 채우러 계속 진행
+AUTOPLAY_CANDIDATES = 10 # 자동재생은 추천 목록에서 아직 듣지 않은 앞쪽(관련도 높은) 곡 중에서 고릅니다.
+AUTOPLAY_POPULARITY_WEIGHT = 0.25 # 자동재생 곡은 사용자가 고른 곡보다 인기도를 적게 올립니다.
 
 class GuildState:
     """각 서버(길드)의 상태를 관리하는 클래스"""
-    def __init__(self, loop):
+    def __init__(self, guild_id, loop, prepare_song):
+        self.guild_id = guild_id
         self.loop = loop
-        self.queue = deque()
+        self.queue = TrackQueue() # Track 목록
+        self.text_channel = None # 알림을 보낼 텍스트 채널 (마지막으로 재생 명령을 쓴 채널)
         self.current_song = None
-        self.is_playing = False
         self.autoplay_enabled = True # 자동재생 기본값
-        self.played_history = deque(maxlen=20) # 최근 재생된 곡 ID 저장
+        self.played_history = PlayedHistory() # 최근 재생된 곡 ID (수천 곡을 고정 크기 Bloom 필터로 기억)
         self.loop_mode = "off" # "off", "current", "queue"
-        self.play_lock = asyncio.Lock() # 재생 로직 접근을 제어할 Lock
+        self.normalize_enabled = True # 볼륨 평준화. 끄면 Opus 곡은 재인코딩 없이 그대로 전송
+        self.player = None # 재생 순서를 담당하는 GuildPlayer (MusicCog._new_state에서 연결)
+        self.prefetcher = Prefetcher(loop, lambda: self.queue, prepare_song) # 대기열 앞쪽 곡 미리 준비
+        self.stream = None # 재생 중인 GaplessStream
+        self.pending_source = None # 재생이 끝난 스트림에서 회수한, 미리 열어 둔 다음 곡 소스
+        self.preload_timer = None
+        self.preload_task = None
+        self.last_track_ended_at = None # 곡 사이 무음 측정용 (perf_counter)
+        self.playlist_task = None # 진행 중인 재생목록 불러오기 작업
+        self.playlist_wakeup = asyncio.Event() # 대기열이 줄어들면 멈춰 있던 재생목록 불러오기를 깨움
+
+    @property
+    def is_playing(self):
+        return self.player is not None and self.player.status not in (PlayerStatus.IDLE, PlayerStatus.STOPPED)
 
 class SongSelectionView(discord.ui.View):
-    def __init__(self, entries, original_ctx, timeout=30):
+    def __init__(self, entries, original_ctx, timeout=30, pending=False):
         super().__init__(timeout=timeout)
-        self.entries = entries
+        self.entries = []
         self.selected_entry = None
         self.original_ctx = original_ctx
         self.message = None
-
-        # 버튼 추가
-        for i, entry in enumerate(entries):
+        self.pending = pending # 유튜브 검색 결과를 아직 기다리는 중인지
+
+        # 취소 버튼 추가 (곡 버튼은 항상 취소 버튼 앞에 둡니다)
+        self.cancel_button = discord.ui.Button(label="취소", style=discord.ButtonStyle.danger, custom_id="cancel_selection")
+        self.cancel_button.callback = self.cancel_callback
+        self.add_item(self.cancel_button)
+        self.add_entries(entries)
+
+    def add_entries(self, entries):
+        """곡 버튼을 뒤에 덧붙입니다. 이미 보여 준 곡은 건너뛰고, 기존 버튼의 번호는 바뀌지 않습니다."""
+        shown = {entry.get('id') for entry in self.entries}
+        self.remove_item(self.cancel_button)
+        for entry in entries:
+            if len(self.entries) >= SEARCH_RESULTS: break
+            if entry.get('id') in shown: continue
+            shown.add(entry.get('id'))
+            i = len(self.entries)
+            self.entries.append(entry)
             button = discord.ui.Button(label=str(i+1), style=discord.ButtonStyle.primary, custom_id=f"select_song_{i}")
             button.callback = self.create_callback(entry)
             self.add_item(button)
-        
-        # 취소 버튼 추가
-        cancel_button = discord.ui.Button(label="취소", style=discord.ButtonStyle.danger, custom_id="cancel_selection")
-        cancel_button.callback = self.cancel_callback
-        self.add_item(cancel_button)
+        self.add_item(self.cancel_button)
+
+    def render(self):
+        lines = [f"{i+1}. {e.get('title', 'Unknown')}" + (" (최근 재생)" if e.get('local') else "") for i, e in enumerate(self.entries)]
+        msg = "다음 중 재생할 곡을 선택해주세요:\n" + '\n'.join(lines)
+        if self.pending:
+            msg += "\n유튜브 검색 결과를 불러오는 중입니다..."
+        return msg
 
     async def on_timeout(self):
         try:
@@ -67,7 +115,7 @@ class SongSelectionView(discord.ui.View):
         except discord.NotFound:
             pass # 메시지가 이미 삭제된 경우
         except Exception as e:
-            logger.error(f"[view_timeout] Error disabling view: {e}")
+            logger.error("[view_timeout] Error disabling view: %s", e)
         finally:
             self.stop()
 
@@ -82,7 +130,7 @@ class SongSelectionView(discord.ui.View):
                     item.disabled = True
                 await interaction.response.edit_message(content=f"'{entry.get('title', 'Unknown Title')}'을(를) 선택했습니다.", view=self)
             except Exception as e:
-                logger.error(f"[view_callback] Error in selection callback: {e}")
+                logger.error("[view_callback] Error in selection callback: %s", e)
             finally:
                 self.stop()
         return callback
@@ -97,22 +145,37 @@ class SongSelectionView(discord.ui.View):
                 item.disabled = True
             await interaction.response.edit_message(content="곡 선택이 취소되었습니다.", view=self)
         except Exception as e:
-            logger.error(f"[view_cancel] Error in cancel callback: {e}")
+            logger.error("[view_cancel] Error in cancel callback: %s", e)
         finally:
             self.stop()
 
+# 자동 완성 핸들러는 self를 인자로 받지 않는 독립 함수여야 합니다.
+async def play_query_autocomplete(ctx: discord.AutocompleteContext):
+    """/play의 query 옵션 자동완성. 곡을 고르면 URL이 전달되어 검색 없이 바로 추가됩니다."""
+    music = ctx.bot.get_cog('MusicCog')
+    return await music.autocomplete_query(ctx) if music else []
+
 class MusicCog(discord.Cog):
     """음악 기능 관련 모든 로직을 담는 Cog 클래스"""
     def __init__(self, bot):
         self.bot = bot
         self.states = {} # {guild_id: GuildState}
+        self._resume_task = None
+        self._autocomplete_tasks = {} # {user_id: 디바운스 중이거나 진행 중인 자동완성 검색}
+
+    def cog_unload(self):
+        if self._resume_task: self._resume_task.cancel()
+        guild_store.shutdown()
+        extraction_engine.shutdown()
+        loudness_analyzer.shutdown()
+        audio_disk_cache.shutdown()
+        if shared_store is not None: shared_store.shutdown()
 
     async def cog_before_invoke(self, ctx: discord.ApplicationContext):
         """모든 슬래시 커맨드 실행 전에 호출되는 후크 함수. 명령어 사용을 로깅합니다."""
-        logger.info(
-            f"[COMMAND] User='{ctx.author}' Guild='{ctx.guild.name}' "
-            f"Command='/{ctx.command.name}' Options={ctx.options}"
-        )
+        # 명령어 처리 중(그리고 여기서 만든 작업)의 로그에 길드와 명령어가 붙습니다.
+        set_log_context(guild=ctx.guild.id, command=ctx.command.name)
+        logger.info("[COMMAND] User='%s' Guild='%s' Command='/%s' Options=%s", ctx.author, ctx.guild.name, ctx.command.name, ctx.options)
 
     async def cog_command_error(self, ctx: discord.ApplicationContext, error: Exception):
         """명령어 실행 중 발생한 예외를 전역적으로 처리하는 핸들러."""
@@ -120,7 +183,7 @@ class MusicCog(discord.Cog):
         if isinstance(error, discord.ApplicationCommandInvokeError):
             error = error.original
 
-        logger.error(f"[GLOBAL_ERROR] Guild='{ctx.guild.name}' Command='/{ctx.command.name}' Error: {error}", exc_info=True)
+        logger.error("[GLOBAL_ERROR] Guild='%s' Command='/%s' Error: %s", ctx.guild.name, ctx.command.name, error, exc_info=error)
         try:
             # 이미 응답(defer 포함)이 보내졌는지 확인합니다.
             if not ctx.response.is_done():
@@ -128,114 +191,480 @@ class MusicCog(discord.Cog):
             else:
                 await ctx.followup.send("명령어 실행 중 알 수 없는 오류가 발생했습니다. 개발자에게 문의해주세요.", ephemeral=True)
         except (discord.Forbidden, discord.NotFound):
-            logger.warning(f"[GLOBAL_ERROR] Could not send error message to Guild='{ctx.guild.name}'.")
+            logger.warning("[GLOBAL_ERROR] Could not send error message to Guild='%s'.", ctx.guild.name)
             pass # 오류 메시지 전송조차 실패한 경우
 
-    def _get_state(self, guild_id) -> GuildState:
+    async def _get_state(self, guild_id) -> GuildState:
         """해당 길드의 상태 객체를 가져오거나 새로 생성합니다."""
-        if guild_id not in self.states:
-            self.states[guild_id] = GuildState(self.bot.loop)
-        return self.states[guild_id]
-
-    async def _prepare_song(self, song: dict) -> bool:
-        if song.get('prepared', False):
+        state = self.states.get(guild_id)
+        if state is None:
+            # 재시작 전에 저장해 둔 대기열과 설정이 있으면 복구합니다. (곡 준비는 재생을 시작할 때부터)
+            saved = await guild_store.load(guild_id)
+            # 저장소를 읽는 동안 다른 명령어가 먼저 만들었으면 그 상태를 씁니다.
+            state = self.states.get(guild_id)
+            if state is None:
+                state = self._new_state(guild_id)
+                if saved: self._restore_state(state, saved)
+                self.states[guild_id] = state
+        return state
+
+    def _new_state(self, guild_id) -> GuildState:
+        state = GuildState(guild_id, self.bot.loop, prepare_track)
+        state.player = GuildPlayer(
+            self.bot.loop,
+            start_next=lambda: self._start_next(guild_id),
+            on_track_end=lambda song, error: self._finish_song(state, song, error),
+            on_give_up=lambda failures: self._on_player_give_up(state, failures),
+            name=str(guild_id),
+        )
+        return state
+
+    def _snapshot_state(self, state: GuildState, settings_only=False):
+        """저장할 길드 상태. 이벤트 루프에서 호출됩니다."""
+        snapshot = {
+            'autoplay': state.autoplay_enabled,
+            'loop_mode': state.loop_mode,
+            'normalize': state.normalize_enabled,
+            'history': state.played_history.to_record(),
+            'queue': [],
+            'text_channel_id': state.text_channel.id if state.text_channel else None,
+            'voice_channel_id': None,
+        }
+        if settings_only:
+            return snapshot
+        # 재생 중이던 곡은 복구할 때 처음부터 다시 재생하도록 대기열 맨 앞에 둡니다.
+        songs = [state.current_song] if state.current_song else []
+        snapshot['queue'] = [song.to_record() for song in songs] + [song.to_record() for song in state.queue]
+        guild = self.bot.get_guild(state.guild_id)
+        voice_client = guild.voice_client if guild else None
+        if voice_client and voice_client.is_connected() and snapshot['queue']:
+            snapshot['voice_channel_id'] = voice_client.channel.id
+        return snapshot
+
+    def _restore_state(self, state: GuildState, saved):
+        state.autoplay_enabled = saved.get('autoplay', state.autoplay_enabled)
+        state.loop_mode = saved.get('loop_mode', state.loop_mode)
+        state.normalize_enabled = saved.get('normalize', state.normalize_enabled)
+        state.played_history.restore(saved.get('history', []))
+        state.queue.extend(Track.from_record(record) for record in saved.get('queue', [])[:QUEUE_LIMIT])
+        if saved.get('text_channel_id'):
+            state.text_channel = self.bot.get_channel(saved['text_channel_id'])
+        if state.queue:
+            logger.info("[guild_store] Restored %s queued tracks for guild %s", len(state.queue), state.guild_id)
+
+    def _persist(self, state: GuildState):
+        """길드 상태를 저장하도록 표시합니다. 실제 쓰기는 모아서 백그라운드에서 합니다."""
+        if self.states.get(state.guild_id) is state:
+            guild_store.mark_dirty(state.guild_id, lambda: self._snapshot_state(state))
+
+    def _drop_state(self, guild_id):
+        """길드 상태를 제거하고, 진행 중인 미리 준비 작업을 취소합니다."""
+        state = self.states.pop(guild_id, None)
+        if state:
+            # 퇴장하면 대기열은 비우고 설정만 남깁니다.
+            guild_store.mark_dirty(guild_id, lambda: self._snapshot_state(state, settings_only=True))
+            state.player.stop()
+            self._cancel_playlist_import(state)
+            state.prefetcher.cancel_all()
+            if state.preload_timer: state.preload_timer.cancel()
+            if state.preload_task: state.preload_task.cancel()
+            leftover = state.stream.clear_next() if state.stream else None
+            for source in (state.pending_source, leftover):
+                if source: source.cleanup()
+            state.pending_source = None
+
+    def _on_queue_changed(self, state: GuildState):
+        """대기열이 바뀐 뒤 호출합니다. 미리 준비 창을 갱신하고, 장전된 다음 곡이 더 이상 맞지 않으면 해제합니다."""
+        state.prefetcher.refresh()
+        self._sync_preload(state)
+        if len(state.queue) < PLAYLIST_LOOKAHEAD:
+            state.playlist_wakeup.set()
+        self._persist(state)
+
+    def _cancel_playlist_import(self, state: GuildState) -> bool:
+        """진행 중인 재생목록 불러오기를 취소합니다. 취소한 작업이 있으면 True."""
+        task, state.playlist_task = state.playlist_task, None
+        if task and not task.done():
+            task.cancel()
             return True
-        logger.info(f"[prepare_song] Starting for: {song['title']}")
+        return False
+
+    async def _edit_progress(self, message, content):
         try:
-            with youtube_dl.YoutubeDL(YDL_OPTS) as ydl:
-                info = await self.bot.loop.run_in_executor(None, functools.partial(ydl.extract_info, song['webpage_url'], download=False))
-            filtered_formats = [f for f in info.get('formats', []) if f.get('acodec') != 'none' and f.get('url') and 'hls' not in f.get('protocol', '')]
-            if not filtered_formats:
-                logger.error(f"[prepare_song] No suitable non-HLS audio stream found for: {song['title']}")
-                song['prepared'] = False
-                return False
-            filtered_formats.sort(key=lambda f: f.get('abr') or 0, reverse=True)
-            song['stream_url'] = filtered_formats[0]['url']
-            song['prepared'] = True
-            logger.info(f"[prepare_song] Success for: {song['title']} (Format: {filtered_formats[0].get('format_id')})")
-            return True
+            await message.edit(content=content)
+        except (discord.Forbidden, discord.NotFound, discord.HTTPException): pass
+
+    async def _import_playlist(self, state: GuildState, url, message):
+        """재생목록을 페이지 단위로 받아 대기열에 추가합니다. 첫 곡이 들어오면 바로 재생을 시작합니다.
+
+        아직 재생하지 않은 곡이 PLAYLIST_LOOKAHEAD곡 이상 쌓이면 재생이 진행될 때까지 다음 페이지를 요청하지 않으므로
+        아주 큰 재생목록도 한 번에 받지 않습니다. /clear, /leave에서 취소됩니다.
+        """
+        added = 0
+        duplicates = 0
+        status = None
+        last_report = time.monotonic()
+        try:
+            async for entries in extraction_engine.iter_playlist(url):
+                for entry in entries:
+                    if not entry.get('id'): continue
+                    if state.queue.has_video(entry['id']):
+                        duplicates += 1 # 이미 큐에 있는 곡은 다시 넣지 않습니다.
+                        continue
+                    if len(state.queue) >= QUEUE_LIMIT:
+                        status = f'큐가 가득 차서 {added}곡까지만 추가했습니다. (최대 {QUEUE_LIMIT}곡)'
+                        break
+                    state.queue.append(Track.from_video_id(entry['id'], entry.get('title') or 'Unknown Title'))
+                    title_index.add(entry['id'], entry.get('title'))
+                    added += 1
+                self._on_queue_changed(state)
+                state.player.wake()
+                if status: break
+                if time.monotonic() - last_report >= PLAYLIST_PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    await self._edit_progress(message, f'재생목록을 불러오는 중입니다... ({added}곡 추가됨)')
+                while len(state.queue) >= PLAYLIST_LOOKAHEAD:
+                    state.playlist_wakeup.clear()
+                    await state.playlist_wakeup.wait()
+            if status is None:
+                if added:
+                    status = f'{added}개의 노래를 큐에 추가했습니다.' + (f' (이미 큐에 있는 {duplicates}곡 제외)' if duplicates else '')
+                elif duplicates:
+                    status = '재생목록의 곡이 모두 이미 큐에 있습니다.'
+                else:
+                    status = '플레이리스트를 찾을 수 없거나, 비어있습니다.'
+        except asyncio.CancelledError:
+            status = f'재생목록 불러오기를 취소했습니다. ({added}곡 추가됨)'
+            raise
         except Exception as e:
-            logger.error(f"[prepare_song] Failed for {song['title']}: {e}")
-            song['prepared'] = False
-            return False
+            logger.error("[playlist] Import failed for %s after %s tracks: %s", url, added, e)
+            status = f'재생목록을 불러오는 중 오류가 발생했습니다. ({added}곡 추가됨)'
+        finally:
+            if state.playlist_task is asyncio.current_task(): state.playlist_task = None
+            logger.info("[playlist] Import finished for %s: %s tracks added", url, added)
+            await self._edit_progress(message, status)
+
+    def _is_queued_or_played(self, state: GuildState, video_id):
+        """대기열에 있거나 최근에 재생한 곡이면 True. 둘 다 곡 수와 관계없이 O(1)입니다."""
+        return state.queue.has_video(video_id) or video_id in state.played_history
+
+    async def _autoplay_candidates(self, state: GuildState, video_id):
+        """추천 그래프에서 대기열에 없고 최근에 재생하지 않은 관련 곡을 찾습니다."""
+        return await related_candidates(video_id, lambda v: self._is_queued_or_played(state, v))
 
-    async def _add_autoplay_song(self, state: GuildState, ctx):
+    async def _add_autoplay_song(self, state: GuildState):
         if not state.autoplay_enabled or not state.current_song: return
-        logger.info(f"[autoplay] Triggered. Finding recommendation based on: {state.current_song['title']}")
-        match = re.search(r"v=([\w-]+)", state.current_song['webpage_url'])
-        if not match: return
-        video_id = match.group(1)
+        logger.info("[autoplay] Triggered. Finding recommendation based on: %s", state.current_song.title)
+        video_id = state.current_song.video_id
+        if not video_id: return
         try:
-            related_videos = await self.bot.loop.run_in_executor(None, functools.partial(get_related_videos, video_id, max_results=10))
-            if not related_videos: return
-            current_queue_ids = {re.search(r"v=([\w-]+)", s['webpage_url']).group(1) for s in state.queue if re.search(r"v=([\w-]+)", s['webpage_url'])}
-            played_history_ids = set(state.played_history)
-            filtered_videos = [v for v in related_videos if v.get('id') and v['id'] not in current_queue_ids and v['id'] not in played_history_ids]
+            filtered_videos = await self._autoplay_candidates(state, video_id)
+            # 추천을 찾는 동안 대기열이 바뀌었을 수 있으므로 넣기 직전에 다시 거릅니다.
+            filtered_videos = [v for v in filtered_videos if not self._is_queued_or_played(state, v['id'])]
             if filtered_videos:
-                video_info = random.choice(filtered_videos)
+                video_info = random.choice(filtered_videos[:AUTOPLAY_CANDIDATES])
                 video_id = video_info.get('id')
                 title = video_info.get('title', 'Unknown Title')
-                url = f"https://www.youtube.com/watch?v={video_id}"
-                state.queue.append({'webpage_url': url, 'title': title, 'ctx': ctx, 'added_by': 'autoplay', 'prepared': False})
-                logger.info(f"[autoplay] Added '{title}' to queue.")
+                state.queue.append(Track.from_video_id(video_id, title, added_by='autoplay'))
+                title_index.add(video_id, title)
+                self._on_queue_changed(state)
+                logger.info("[autoplay] Added '%s' to queue.", title)
         except Exception as e:
-            logger.error(f"[autoplay] Failed to add song: {e}")
-
-    async def _play_next(self, ctx):
-        state = self._get_state(ctx.guild.id)
-        async with state.play_lock:
-            voice_client = ctx.voice_client
-            if not voice_client or not voice_client.is_connected():
-                state.is_playing = False
-                return
+            logger.error("[autoplay] Failed to add song: %s", e)
+
+    def _finish_song(self, state: GuildState, song: Track, error=None):
+        """곡 하나가 끝났을 때의 후처리(재생 기록, 반복 모드)를 수행합니다."""
+        if error:
+            logger.error("[player] Playback error for %s: %s", song.title, error)
+            # 재생에 실패한 스트림 URL은 다른 길드가 재사용하지 않도록 캐시에서 제거
+            if song.video_id: stream_cache.invalidate(song.video_id)
+        if song.video_id: state.played_history.append(song.video_id)
+        if state.loop_mode == "current": state.queue.appendleft(song)
+        elif state.loop_mode == "queue": state.queue.append(song)
+        self._persist(state)
+
+    def _keep_pending_source(self, state: GuildState, source):
+        """끝난 스트림에서 회수한 다음 곡 소스를 보관합니다. 그새 길드 상태가 제거되었으면 정리합니다."""
+        if self.states.get(state.guild_id) is not state:
+            source.cleanup()
+            return
+        if state.pending_source: state.pending_source.cleanup()
+        state.pending_source = source
+
+    def _take_preloaded(self, state: GuildState, song: Track):
+        """song을 위해 미리 열어 둔 소스가 있으면 꺼내 반환합니다."""
+        sources = [state.pending_source, state.stream.clear_next() if state.stream else None]
+        state.pending_source = None
+        found = None
+        for source in sources:
+            if source is None: continue
+            if found is None and source.song is song:
+                found = source
+            else:
+                source.cleanup()
+        return found
+
+    def _sync_preload(self, state: GuildState):
+        """장전된 다음 곡이 대기열 맨 앞 곡과 다르면 해제하고, 다음 곡 미리 열기를 다시 예약합니다."""
+        stream = state.stream
+        if not stream: return
+        armed = stream.peek_next_song()
+        if armed is not None and (not state.queue or state.queue[0] is not armed or state.loop_mode == "current"):
+            source = stream.clear_next()
+            if source:
+                logger.info("[gapless] Queue changed. Discarding preloaded source for: %s", source.song.title)
+                source.cleanup()
+        self._schedule_preload(state)
+
+    def _schedule_preload(self, state: GuildState):
+        """현재 곡이 끝나기 PRELOAD_LEAD_SECONDS초 전에 다음 곡의 FFmpeg 소스를 열도록 예약합니다."""
+        if state.preload_timer:
+            state.preload_timer.cancel()
+            state.preload_timer = None
+        stream = state.stream
+        if not stream or not state.queue or state.loop_mode == "current": return
+        duration = stream.song.duration
+        if not duration: return # 길이를 모르는 곡(라이브 등)은 평소처럼 곡이 끝난 뒤 엽니다.
+        delay = duration - stream.elapsed() - PRELOAD_LEAD_SECONDS
+        if delay > 0:
+            # 일시정지 등으로 재생 위치가 밀릴 수 있으므로 시간이 되면 다시 계산합니다.
+            state.preload_timer = self.bot.loop.call_later(delay, self._schedule_preload, state)
+        elif not state.preload_task or state.preload_task.done():
+            state.preload_task = self.bot.loop.create_task(self._preload_next(state))
+
+    async def _preload_next(self, state: GuildState):
+        stream = state.stream
+        if not stream or not state.queue: return
+        song = state.queue[0]
+        if stream.peek_next_song() is song: return
+        if not is_stream_fresh(song, PLAYBACK_MIN_TTL):
+            song.prepared = False
+        if not await prepare_track(song, PRIORITY_PREFETCH): return
+        source = await open_track(song, state.normalize_enabled)
+        if source is None: return
+        # 준비하는 동안 대기열이나 재생 상태가 바뀌었으면 버립니다.
+        if state.stream is not stream or not state.queue or state.queue[0] is not song or state.loop_mode == "current":
+            source.cleanup()
+            return
+        previous = stream.set_next(source)
+        if previous: previous.cleanup()
+        logger.info("[gapless] Preloaded next song: %s", song.title)
+
+    async def _notify(self, state: GuildState, content):
+        """길드의 텍스트 채널에 메시지를 보냅니다. 채널이 없거나 권한이 없으면 무시합니다."""
+        if state.text_channel is None: return
+        try:
+            await state.text_channel.send(content)
+        except (discord.Forbidden, discord.NotFound): pass
+
+    async def _announce_now_playing(self, state: GuildState, song: Track):
+        await self._notify(state, f'Now playing: {song.title}\nURL: <{song.webpage_url}>')
+
+    def _after_song_started(self, state: GuildState):
+        song = state.current_song
+        if song:
+            title_index.add(song.video_id, song.title, shared=True)
+            weight = 1.0 if song.added_by == 'user' else AUTOPLAY_POPULARITY_WEIGHT
+            track_suggestions.record(state.guild_id, song.video_id, song.title, weight)
+        if state.queue: self._on_queue_changed(state)
+        else:
+            self._persist(state)
+            if state.autoplay_enabled: self.bot.loop.create_task(self._add_autoplay_song(state))
+
+    def _on_gapless_transition(self, state: GuildState, finished: Track, upcoming: Track):
+        """GaplessStream이 다음 곡으로 넘어간 뒤 이벤트 루프에서 상태를 맞춥니다."""
+        self._finish_song(state, finished)
+        state.queue.discard(upcoming)
+        state.current_song = upcoming
+        logger.info("[gapless] Switched to: %s", upcoming.title)
+        self.bot.loop.create_task(self._announce_now_playing(state, upcoming))
+        self._after_song_started(state)
+
+    async def _open_with_retry(self, state: GuildState, song: Track):
+        """곡을 준비하고 소스를 엽니다. 실패하면 잠시 기다렸다가 PLAYER_TRACK_ATTEMPTS번까지 다시 시도합니다."""
+        for attempt in range(PLAYER_TRACK_ATTEMPTS):
+            if attempt:
+                delay = backoff_delay(attempt)
+                logger.info("[player] Retrying %s in %.1fs (attempt %s/%s)", song.title, delay, attempt + 1, PLAYER_TRACK_ATTEMPTS)
+                await asyncio.sleep(delay)
+            if not is_stream_fresh(song, PLAYBACK_MIN_TTL):
+                song.prepared = False
+            if not song.prepared:
+                logger.info("[player] Song not prepared. Preparing now: %s", song.title)
+            if await prepare_track(song):
+                source = await open_track(song, state.normalize_enabled)
+                if source is not None:
+                    return source
+        return None
+
+    async def _start_next(self, guild_id) -> PlayOutcome:
+        """대기열의 다음 곡으로 재생을 시작합니다. 길드의 GuildPlayer 코루틴에서만 호출됩니다."""
+        state = self.states.get(guild_id)
+        guild = self.bot.get_guild(guild_id)
+        voice_client = guild.voice_client if guild else None
+        if state is None or not voice_client or not voice_client.is_connected():
+            return PlayOutcome.DISCONNECTED
+        if not state.queue:
+            await self._add_autoplay_song(state)
             if not state.queue:
-                await self._add_autoplay_song(state, ctx)
-                if not state.queue:
-                    logger.info(f"[_play_next] Stopping playback as queue is empty.")
-                    state.is_playing = False
-                    state.current_song = None
-                    return
-            next_song = state.queue.popleft()
-            if not next_song.get('prepared', False):
-                logger.info(f"[_play_next] Song not prepared. Preparing now: {next_song['title']}")
-                if not await self._prepare_song(next_song):
-                    try:
-                        await ctx.channel.send(f"'{next_song['title']}'을(를) 재생할 수 없어 건너뜁니다.")
-                    except (discord.Forbidden, discord.NotFound): pass
-                    self.bot.loop.create_task(self._play_next(ctx))
-                    return
-            play_url = next_song['stream_url']
-            state.is_playing = True
-            state.current_song = next_song
-            def after_playing(error):
-                if error: logger.error(f"[_play_next:after] Playback error for {next_song['title']}: {error}")
-                match = re.search(r"v=([\w-]+)", next_song['webpage_url'])
-                if match: state.played_history.append(match.group(1))
-                if state.loop_mode == "current": state.queue.appendleft(next_song)
-                elif state.loop_mode == "queue": state.queue.append(next_song)
-                self.bot.loop.create_task(self._play_next(ctx))
-            try:
-                source = discord.FFmpegPCMAudio(play_url, **FFMPEG_OPTS)
-                voice_client.play(source, after=after_playing)
-                try:
-                    await ctx.channel.send(f'Now playing: {next_song["title"]}\nURL: <{next_song["webpage_url"]}>')
-                except (discord.Forbidden, discord.NotFound): pass
-                if state.queue: self.bot.loop.create_task(self._prepare_song(state.queue[0]))
-                elif state.autoplay_enabled: self.bot.loop.create_task(self._add_autoplay_song(state, ctx))
-            except Exception as e:
-                logger.error(f"[_play_next] Critical error for {next_song['title']}: {e}")
-                try:
-                    await ctx.channel.send(f"'{next_song['title']}' 재생 중 심각한 오류가 발생했습니다.")
-                except (discord.Forbidden, discord.NotFound): pass
-                self.bot.loop.create_task(self._play_next(ctx))
+                logger.info("[player] Stopping playback as queue is empty.")
+                state.current_song = None
+                state.last_track_ended_at = None
+                self._persist(state)
+                return PlayOutcome.EMPTY
+        next_song = state.queue.popleft()
+        source = self._take_preloaded(state, next_song)
+        if source is None:
+            source = await self._open_with_retry(state, next_song)
+            if source is None:
+                await self._notify(state, f"'{next_song.title}'을(를) 재생할 수 없어 건너뜁니다.")
+                return PlayOutcome.FAILED
+        source.gap_origin, state.last_track_ended_at = state.last_track_ended_at, None
+        state.current_song = next_song
+        def on_transition(finished, upcoming):
+            # 음성 플레이어 스레드에서 호출되므로 상태 변경은 이벤트 루프로 넘깁니다.
+            self.bot.loop.call_soon_threadsafe(self._on_gapless_transition, state, finished, upcoming)
+        stream = GaplessStream(source, on_transition)
+        def after_playing(error):
+            # 음성 플레이어 스레드에서 호출됩니다. 후처리는 GuildPlayer가 이벤트 루프에서 합니다.
+            state.last_track_ended_at = time.perf_counter()
+            # 스트림은 정리되었지만 장전된 다음 곡 소스는 남아 있으므로 회수해 다음 재생에 넘깁니다.
+            leftover = stream.clear_next()
+            if leftover is not None:
+                self.bot.loop.call_soon_threadsafe(self._keep_pending_source, state, leftover)
+            state.player.track_ended(stream.song, error)
+        try:
+            state.stream = stream
+            if voice_client.is_playing() or voice_client.is_paused():
+                # 라디오 등 다른 방송을 듣던 중이면 멈추고 대기열 재생으로 넘어갑니다.
+                voice_client.stop()
+            if voice_client.encoder is None:
+                # 첫 곡이 Opus passthrough여도 이후 PCM 곡을 인코딩할 수 있도록 인코더를 미리 만듭니다.
+                voice_client.encoder = discord.opus.Encoder()
+            voice_client.play(stream, after=after_playing)
+        except Exception as e:
+            logger.error("[player] Critical error for %s: %s", next_song.title, e)
+            state.stream = None
+            stream.cleanup()
+            await self._notify(state, f"'{next_song.title}' 재생 중 심각한 오류가 발생했습니다.")
+            return PlayOutcome.FAILED
+        await self._announce_now_playing(state, next_song)
+        self._after_song_started(state)
+        return PlayOutcome.STARTED
+
+    async def _on_player_give_up(self, state: GuildState, failures):
+        state.current_song = None
+        self._persist(state)
+        await self._notify(state, f"{failures}곡을 연속으로 재생하지 못해 재생을 멈췄습니다. 잠시 후 다시 시도해주세요.")
+
+    async def _search_remote(self, key):
+        """유튜브에서 검색하고 결과를 검색 캐시에 저장합니다."""
+        info = await extract_info('stream', f"ytsearch{SEARCH_RESULTS}:{key}", site='search')
+        entries = [e for e in info.get('entries') or [] if e and e.get('id')][:SEARCH_RESULTS]
+        if entries: search_cache.put(key, entries)
+        return entries
+
+    async def _choose_search_result(self, ctx, query):
+        """검색 결과 중 사용자가 고른 항목을 반환합니다. 결과가 없거나 취소/시간 초과면 None.
+
+        같은 검색어의 결과가 캐시에 있으면 바로 보여 줍니다. 없으면 대기열에 넣었거나 재생했던 곡의 제목 색인에서
+        찾은 곡을 먼저 보여 주고, 유튜브 검색 결과는 도착하는 대로 뒤에 덧붙입니다.
+        """
+        key = normalize_query(query)
+        entries = await search_cache.get_async(key)
+        remote = None
+        if entries is None:
+            remote = asyncio.ensure_future(self._search_remote(key))
+            entries = [dict(entry, local=True) for entry in title_index.search(key, SEARCH_LOCAL_RESULTS)]
+            if not entries:
+                entries, remote = await remote, None
+        return await self._select_entry(ctx, query, entries, remote)
+
+    async def _select_entry(self, ctx, query, entries, remote=None):
+        """SongSelectionView로 곡을 고르게 합니다. remote가 있으면 그 결과를 나중에 버튼으로 덧붙입니다."""
+        if not entries:
+            await ctx.followup.send(f"'{query}'에 대한 검색 결과를 찾을 수 없습니다.")
+            return None
+        view = SongSelectionView(entries, ctx, pending=remote is not None)
+        view.message = await ctx.followup.send(view.render(), view=view)
+        if remote is not None:
+            self.bot.loop.create_task(self._fill_search_results(view, remote))
+        await view.wait()
+        return view.selected_entry
+
+    async def _fill_search_results(self, view: SongSelectionView, remote):
+        try:
+            entries = await remote
+        except Exception as e:
+            logger.warning("[search] Remote search failed behind local matches: %s", e)
+            entries = []
+        view.pending = False
+        if view.is_finished(): return # 이미 곡을 골랐거나 시간이 지남
+        view.add_entries(entries)
+        try:
+            await view.message.edit(content=view.render(), view=view)
+        except (discord.Forbidden, discord.NotFound, discord.HTTPException): pass
+
+    async def autocomplete_query(self, ctx: discord.AutocompleteContext):
+        """길드/전체에서 많이·최근 재생한 곡으로 먼저 채우고, 모자라면 캐시되었거나 디바운스한 유튜브 검색으로 채웁니다."""
+        query = ctx.value or ''
+        if query.startswith('http'): return []
+        entries = track_suggestions.complete(ctx.interaction.guild_id, query, AUTOCOMPLETE_RESULTS)
+        key = normalize_query(query)
+        if len(entries) < AUTOCOMPLETE_RESULTS and len(key) >= AUTOCOMPLETE_REMOTE_MIN_CHARS:
+            remote = await search_cache.get_async(key)
+            if remote is None:
+                remote = await self._autocomplete_remote(ctx.interaction.user.id, key)
+            seen = {entry['id'] for entry in entries}
+            entries += [entry for entry in remote if entry['id'] not in seen]
+        return [
+            discord.OptionChoice(name=entry.get('title', 'Unknown')[:100], value=YOUTUBE_WATCH_URL.format(entry['id']))
+            for entry in entries[:AUTOCOMPLETE_RESULTS]
+        ]
+
+    async def _autocomplete_remote(self, user_id, key):
+        """사용자별로 마지막 입력만 유튜브에서 검색합니다. 제한 시간 안에 끝나지 않으면 빈 목록."""
+        previous = self._autocomplete_tasks.get(user_id)
+        # 이전 글자의 요청이 아직 디바운스 중이면 보내지 않고 버립니다. (이미 보낸 검색은 캐시를 채우도록 둠)
+        if previous and not previous.done(): previous.cancel()
+        task = asyncio.ensure_future(self._debounced_search(key))
+        self._autocomplete_tasks[user_id] = task
+        task.add_done_callback(lambda _: self._autocomplete_tasks.get(user_id) is task and self._autocomplete_tasks.pop(user_id))
+        await asyncio.wait({task}, timeout=AUTOCOMPLETE_TIMEOUT)
+        if not task.done() or task.cancelled() or task.exception() is not None:
+            return []
+        return task.result()
+
+    async def _debounced_search(self, key):
+        await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE)
+        # 여기부터는 취소되어도 검색을 끝까지 진행해 결과를 캐시에 남깁니다.
+        return await asyncio.shield(self._flat_search(key))
+
+    async def _flat_search(self, key):
+        """목록만 받는 가벼운 유튜브 검색. 결과는 /play 검색 캐시에도 저장됩니다."""
+        try:
+            # 재생 준비보다 뒤에, 짧게만 기다립니다. (토큰을 못 받으면 RequestDropped로 포기)
+            info = await extract_info('search', f"ytsearch{AUTOCOMPLETE_RESULTS}:{key}", PRIORITY_AUTOCOMPLETE, site='autocomplete')
+        except RequestDropped:
+            logger.debug("[autocomplete] Search for '%s' dropped by the rate limiter", key)
+            return []
+        except Exception as e:
+            logger.warning("[autocomplete] Search failed for '%s': %s", key, e)
+            return []
+        entries = [{'id': e['id'], 'title': e.get('title'), 'duration': e.get('duration')}
+                   for e in info.get('entries') or [] if e and e.get('id') and e.get('title')]
+        if entries: search_cache.put(key, entries[:SEARCH_RESULTS])
+        return entries
 
     @discord.slash_command(description="노래를 재생하거나 큐에 추가합니다.")
-    async def play(self, ctx, query: str):
+    async def play(self, ctx, query: discord.Option(str, "노래 제목 또는 URL", autocomplete=play_query_autocomplete)):
+        requested_at = time.perf_counter()
         await ctx.defer()
-        state = self._get_state(ctx.guild.id)
-        if any(song.get('added_by') == 'autoplay' for song in state.queue):
-            state.queue = deque(song for song in state.queue if song.get('added_by') != 'autoplay')
-            logger.info(f"[play] User interrupted autoplay. Clearing autoplay songs.")
+        state = await self._get_state(ctx.guild.id)
+        state.text_channel = ctx.channel
+        if state.queue.remove_if(lambda song: song.added_by == 'autoplay'):
+            self._on_queue_changed(state)
+            logger.info("[play] User interrupted autoplay. Clearing autoplay songs.")
             try:
                 await ctx.channel.send("자동재생 목록을 지웠습니다. 요청하신 곡을 우선 재생합니다.", delete_after=10)
             except (discord.Forbidden, discord.NotFound): pass
@@ -247,67 +676,70 @@ class MusicCog(discord.Cog):
         if voice_client and voice_client.is_connected():
             # If the user is in a different channel, move the bot.
             if ctx.author.voice and ctx.author.voice.channel != voice_client.channel:
-                logger.info(f"Moving to user's channel: {ctx.author.voice.channel.name}")
+                logger.info("Moving to user's channel: %s", ctx.author.voice.channel.name)
                 await voice_client.move_to(ctx.author.voice.channel)
         else:
             # The bot is not connected to any voice channel in this guild.
             if ctx.author.voice:
                 # If there's a lingering, broken client, disconnect it first.
                 if voice_client:
-                    logger.warning(f"Found a lingering, disconnected voice client in {ctx.guild.name}. Cleaning up.")
+                    logger.warning("Found a lingering, disconnected voice client in %s. Cleaning up.", ctx.guild.name)
                     try:
                         await voice_client.disconnect(force=True)
                     except Exception as e:
-                        logger.error(f"Error force-disconnecting lingering client: {e}")
+                        logger.error("Error force-disconnecting lingering client: %s", e)
 
                 # Now, connect to the user's channel.
                 try:
-                    logger.info(f"Connecting to voice channel: {ctx.author.voice.channel.name}")
+                    logger.info("Connecting to voice channel: %s", ctx.author.voice.channel.name)
                     await ctx.author.voice.channel.connect(timeout=15.0)
                 except (discord.errors.ConnectionClosed, asyncio.TimeoutError) as e:
-                    logger.error(f"[voice_connect] Known error connecting to voice in {ctx.guild.name}: {e}")
+                    logger.error("[voice_connect] Known error connecting to voice in %s: %s", ctx.guild.name, e)
                     await ctx.followup.send("음성 채널 연결에 실패했습니다. Discord 서버 상태에 문제가 있을 수 있습니다. 잠시 후 다시 시도해주세요.")
-                    if ctx.guild.id in self.states:
-                        del self.states[ctx.guild.id]
+                    self._drop_state(ctx.guild.id)
                     return
                 except Exception as e:
                     # This will be caught by the global error handler, but logging it here gives more context.
-                    logger.error(f"[voice_connect] Unexpected error connecting to voice in {ctx.guild.name}: {e}", exc_info=True)
+                    logger.error("[voice_connect] Unexpected error connecting to voice in %s: %s", ctx.guild.name, e, exc_info=True)
                     # Re-raise to be caught by the global handler, which will notify the user.
                     raise e
             else:
                 await ctx.followup.send("음성 채널에 먼저 참여해주세요.")
                 return
-        search_query = f"ytsearch5:{query}" if not query.startswith('http') else query
-        with youtube_dl.YoutubeDL(YDL_OPTS) as ydl:
-            info = await self.bot.loop.run_in_executor(None, functools.partial(ydl.extract_info, search_query, download=False))
-        if 'entries' in info:
-            entries = [e for e in info['entries'] if e and e.get('id')][:5]
-            if not entries:
-                await ctx.followup.send(f"'{query}'에 대한 검색 결과를 찾을 수 없습니다.")
-                return
-            msg = "다음 중 재생할 곡을 선택해주세요:\n" + '\n'.join([f"{i+1}. {e.get('title', 'Unknown')}" for i, e in enumerate(entries)])
-            view = SongSelectionView(entries, ctx)
-            message = await ctx.followup.send(msg, view=view)
-            view.message = message
-            await view.wait()
-            selected_info = view.selected_entry
-            if not selected_info: return
+        if query.startswith('http'):
+            selected_info = await extract_info('stream', query, site='play_url')
+            if 'entries' in selected_info:
+                entries = [e for e in selected_info['entries'] if e and e.get('id')]
+                selected_info = await self._select_entry(ctx, query, entries)
+                if not selected_info: return
         else:
-            selected_info = info
+            selected_info = await self._choose_search_result(ctx, query)
+            if not selected_info: return
         title = selected_info.get('title', 'Unknown Title')
         webpage_url = selected_info.get('webpage_url', f"https://www.youtube.com/watch?v={selected_info.get('id')}")
-        state.queue.append({'webpage_url': webpage_url, 'title': title, 'ctx': ctx, 'added_by': 'user', 'prepared': False})
+        song = Track(webpage_url, title)
+        title_index.add(song.video_id, title)
+        if song.video_id and state.queue.has_video(song.video_id):
+            await ctx.followup.send(f'이미 큐에 있는 곡입니다: {title}')
+            return
+        if not state.queue and not state.is_playing:
+            # 바로 재생되는 곡만 /play부터 첫 오디오까지의 시간을 잽니다. (대기열에서 기다린 시간 제외)
+            song.requested_at = requested_at
+        state.queue.append(song)
         await ctx.followup.send(f'큐에 추가됨: {title}')
-        if not state.is_playing:
-            await self._play_next(ctx)
+        self._on_queue_changed(state)
+        state.player.wake()
 
     @discord.slash_command(description="유튜브 플레이리스트를 큐에 추가합니다.")
     async def playlist(self, ctx, url: str):
         await ctx.defer()
-        state = self._get_state(ctx.guild.id)
-        if any(song.get('added_by') == 'autoplay' for song in state.queue):
-            state.queue = deque(song for song in state.queue if song.get('added_by') != 'autoplay')
+        state = await self._get_state(ctx.guild.id)
+        state.text_channel = ctx.channel
+        if state.playlist_task and not state.playlist_task.done():
+            await ctx.followup.send("이미 재생목록을 불러오는 중입니다. /clear로 취소할 수 있습니다.")
+            return
+        if state.queue.remove_if(lambda song: song.added_by == 'autoplay'):
+            self._on_queue_changed(state)
             try:
                 await ctx.channel.send("자동재생 목록을 지웠습니다. 요청하신 재생목록을 우선 추가합니다.", delete_after=10)
             except (discord.Forbidden, discord.NotFound): pass
@@ -316,54 +748,39 @@ class MusicCog(discord.Cog):
         if voice_client and voice_client.is_connected():
             # If the user is in a different channel, move the bot.
             if ctx.author.voice and ctx.author.voice.channel != voice_client.channel:
-                logger.info(f"Moving to user's channel: {ctx.author.voice.channel.name}")
+                logger.info("Moving to user's channel: %s", ctx.author.voice.channel.name)
                 await voice_client.move_to(ctx.author.voice.channel)
         else:
             # The bot is not connected to any voice channel in this guild.
             if ctx.author.voice:
                 # If there's a lingering, broken client, disconnect it first.
                 if voice_client:
-                    logger.warning(f"Found a lingering, disconnected voice client in {ctx.guild.name}. Cleaning up.")
+                    logger.warning("Found a lingering, disconnected voice client in %s. Cleaning up.", ctx.guild.name)
                     try:
                         await voice_client.disconnect(force=True)
                     except Exception as e:
-                        logger.error(f"Error force-disconnecting lingering client: {e}")
+                        logger.error("Error force-disconnecting lingering client: %s", e)
 
                 # Now, connect to the user's channel.
                 try:
-                    logger.info(f"Connecting to voice channel: {ctx.author.voice.channel.name}")
+                    logger.info("Connecting to voice channel: %s", ctx.author.voice.channel.name)
                     await ctx.author.voice.channel.connect(timeout=15.0)
                 except (discord.errors.ConnectionClosed, asyncio.TimeoutError) as e:
-                    logger.error(f"[voice_connect] Known error connecting to voice in {ctx.guild.name}: {e}")
+                    logger.error("[voice_connect] Known error connecting to voice in %s: %s", ctx.guild.name, e)
                     await ctx.followup.send("음성 채널 연결에 실패했습니다. Discord 서버 상태에 문제가 있을 수 있습니다. 잠시 후 다시 시도해주세요.")
-                    if ctx.guild.id in self.states:
-                        del self.states[ctx.guild.id]
+                    self._drop_state(ctx.guild.id)
                     return
                 except Exception as e:
                     # This will be caught by the global error handler, but logging it here gives more context.
-                    logger.error(f"[voice_connect] Unexpected error connecting to voice in {ctx.guild.name}: {e}", exc_info=True)
+                    logger.error("[voice_connect] Unexpected error connecting to voice in %s: %s", ctx.guild.name, e, exc_info=True)
                     # Re-raise to be caught by the global handler, which will notify the user.
                     raise e
             else:
                 await ctx.followup.send("음성 채널에 먼저 참여해주세요.")
                 return
-        with youtube_dl.YoutubeDL({'quiet': True, 'noplaylist': False, 'extract_flat': True, 'source_address': '0.0.0.0', 'cookiefile': './cookies.txt',}) as ydl:
-            info = await self.bot.loop.run_in_executor(None, functools.partial(ydl.extract_info, url, download=False))
-        entries = info.get('entries')
-        if not entries:
-            await ctx.followup.send('플레이리스트를 찾을 수 없거나, 비어있습니다.')
-            return
-        added_count = 0
-        for entry in entries:
-            if not entry or not entry.get('id'): continue
-            if len(state.queue) >= QUEUE_LIMIT: break
-            title = entry.get('title', 'Unknown Title')
-            webpage_url = f"https://www.youtube.com/watch?v={entry['id']}"
-            state.queue.append({'webpage_url': webpage_url, 'title': title, 'ctx': ctx, 'added_by': 'user', 'prepared': False})
-            added_count += 1
-        await ctx.followup.send(f'{added_count}개의 노래를 큐에 추가했습니다.')
-        if not state.is_playing and added_count > 0:
-            await self._play_next(ctx)
+        # 전체 목록을 기다리지 않고 백그라운드에서 페이지 단위로 불러오며, 진행 상황은 이 메시지를 수정해 알립니다.
+        message = await ctx.followup.send('재생목록을 불러오는 중입니다...')
+        state.playlist_task = self.bot.loop.create_task(self._import_playlist(state, url, message))
 
     @discord.slash_command(description="현재 재생 중인 노래를 건너뜁니다.")
     async def skip(self, ctx):
@@ -391,16 +808,13 @@ class MusicCog(discord.Cog):
 
     @discord.slash_command(description="재생 대기열을 보여줍니다.")
     async def queue(self, ctx):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
         if not state.queue:
             await ctx.respond('큐가 비어있습니다.', ephemeral=True)
             return
-        # View에 데이터를 넘겨주기 위해 deque를 list로 변환
-        queue_list = list(state.queue)
-
         # 페이지네이션 View 인스턴스 생성
-        # (한 페이지에 10개씩, 원본 명령어 사용자만 조작 가능)
-        view = PaginationView(data=queue_list, original_author=ctx.author, items_per_page=10)
+        # (한 페이지에 10개씩, 원본 명령어 사용자만 조작 가능. 대기열을 복사하지 않고 페이지만 잘라 읽음)
+        view = PaginationView(data=state.queue, original_author=ctx.author, items_per_page=10)
         
         # 첫 페이지의 임베드 생성
         initial_embed = view.create_embed()
@@ -411,34 +825,58 @@ class MusicCog(discord.Cog):
 
     @discord.slash_command(description="대기열에서 특정 노래를 제거합니다.")
     async def remove(self, ctx, position: int):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
         if not state.queue or not (1 <= position <= len(state.queue)):
             await ctx.respond("잘못된 번호입니다.", ephemeral=True)
             return
-        removed = state.queue[position-1]
-        del state.queue[position-1]
-        await ctx.respond(f'큐에서 제거됨: {removed["title"]}')
+        removed = state.queue.pop(position-1)
+        self._on_queue_changed(state)
+        await ctx.respond(f'큐에서 제거됨: {removed.title}')
+
+    @discord.slash_command(description="대기열에서 노래의 위치를 옮깁니다.")
+    async def move(self, ctx, position: int, to: int):
+        state = await self._get_state(ctx.guild.id)
+        if not (1 <= position <= len(state.queue)) or not (1 <= to <= len(state.queue)):
+            await ctx.respond("잘못된 번호입니다.", ephemeral=True)
+            return
+        moved = state.queue.move(position-1, to-1)
+        self._on_queue_changed(state)
+        await ctx.respond(f"'{moved.title}'을(를) {to}번으로 옮겼습니다.")
+
+    @discord.slash_command(description="대기열을 무작위로 섞습니다.")
+    async def shuffle(self, ctx):
+        state = await self._get_state(ctx.guild.id)
+        if len(state.queue) < 2:
+            await ctx.respond("섞을 노래가 충분하지 않습니다.", ephemeral=True)
+            return
+        state.queue.shuffle()
+        self._on_queue_changed(state)
+        await ctx.respond(f"대기열의 {len(state.queue)}곡을 섞었습니다.")
 
     @discord.slash_command(description="대기열을 모두 비웁니다.")
     async def clear(self, ctx):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
+        importing = self._cancel_playlist_import(state)
         if state.queue:
             state.queue.clear()
+            self._on_queue_changed(state)
             await ctx.respond("큐를 모두 비웠습니다.")
+        elif importing:
+            await ctx.respond("재생목록 불러오기를 취소했습니다.")
         else:
             await ctx.respond("큐가 이미 비어있습니다.", ephemeral=True)
 
     @discord.slash_command(description="현재 재생 중인 노래 정보를 보여줍니다.")
     async def nowplaying(self, ctx):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
         if state.current_song:
-            await ctx.respond(f'현재 재생 중: {state.current_song["title"]}\nURL: <{state.current_song["webpage_url"]}>')
+            await ctx.respond(f'현재 재생 중: {state.current_song.title}\nURL: <{state.current_song.webpage_url}>')
         else:
             await ctx.respond("재생 중인 노래가 없습니다.", ephemeral=True)
 
     @discord.slash_command(description="음성 채널에서 나갑니다.")
     async def leave(self, ctx):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
         voice_client = ctx.voice_client
         
         if voice_client and voice_client.is_connected():
@@ -446,39 +884,95 @@ class MusicCog(discord.Cog):
                 await voice_client.disconnect()
                 await ctx.respond("음성 채널을 나갔습니다.")
             except Exception as e:
-                logger.error(f"[voice_disconnect] Error disconnecting from voice channel in {ctx.guild.name}: {e}")
+                logger.error("[voice_disconnect] Error disconnecting from voice channel in %s: %s", ctx.guild.name, e)
                 await ctx.respond("음성 채널을 나가는 중 오류가 발생했습니다. 상태를 초기화합니다.", ephemeral=True)
             finally:
-                state.is_playing = False
                 state.current_song = None
-                if ctx.guild.id in self.states:
-                    del self.states[ctx.guild.id]
+                self._drop_state(ctx.guild.id)
         else:
             await ctx.respond("음성 채널에 연결되어 있지 않습니다.", ephemeral=True)
 
     @discord.slash_command(description="자동재생 기능을 켜거나 끕니다.")
     async def autoplay(self, ctx, mode: str):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
         mode = mode.lower()
         if mode == "on":
             state.autoplay_enabled = True
+            self._persist(state)
             await ctx.respond("자동재생이 켜졌습니다.")
         elif mode == "off":
             state.autoplay_enabled = False
+            self._persist(state)
             await ctx.respond("자동재생이 꺼졌습니다.")
         else:
             await ctx.respond("사용법: /autoplay on 또는 /autoplay off", ephemeral=True)
 
+    @discord.slash_command(description="볼륨 평준화를 켜거나 끕니다.")
+    async def normalize(self, ctx, mode: str):
+        state = await self._get_state(ctx.guild.id)
+        mode = mode.lower()
+        if mode == "on":
+            state.normalize_enabled = True
+            self._persist(state)
+            await ctx.respond("볼륨 평준화가 켜졌습니다. 다음 곡부터 적용됩니다.")
+        elif mode == "off":
+            state.normalize_enabled = False
+            self._persist(state)
+            await ctx.respond("볼륨 평준화가 꺼졌습니다. 다음 곡부터 적용됩니다.")
+        else:
+            await ctx.respond("사용법: /normalize on 또는 /normalize off", ephemeral=True)
+
     @discord.slash_command(description="반복 모드를 설정합니다. (off, current, queue)")
     async def loop(self, ctx, mode: str):
-        state = self._get_state(ctx.guild.id)
+        state = await self._get_state(ctx.guild.id)
         mode = mode.lower()
         if mode not in ["off", "current", "queue"]:
             await ctx.respond("사용법: /loop off, /loop current, 또는 /loop queue", ephemeral=True)
             return
         state.loop_mode = mode
+        self._sync_preload(state)
+        self._persist(state)
         await ctx.respond(f"반복 모드가 '{mode}'(으)로 설정되었습니다.")
 
+    @discord.Cog.listener()
+    async def on_ready(self):
+        # 재연결할 때도 호출되므로 처음 한 번만 실행합니다.
+        if self._resume_task is None:
+            self._resume_task = self.bot.loop.create_task(self._startup())
+
+    async def _startup(self):
+        """디스크를 읽는 캐시들을 이벤트 루프 밖에서 불러온 뒤 재생 중이던 길드를 이어서 재생합니다."""
+        await audio_disk_cache.load()
+        await title_index.load()
+        await self._resume_guilds()
+
+    async def _resume_guilds(self):
+        """재시작 직전까지 재생 중이던 길드의 음성 채널에 다시 들어가 저장된 대기열을 이어서 재생합니다.
+
+        길드마다 GUILD_RESUME_STAGGER초씩 간격을 두어 추출 요청이 한꺼번에 몰리지 않게 합니다.
+        곡 준비는 재생을 시작한 뒤 대기열 앞쪽부터 평소처럼 미리 준비(prefetch)합니다.
+        """
+        resumed = 0
+        for guild_id, channel_id in await guild_store.resumable_guilds(GUILD_RESUME_MAX_AGE):
+            guild = self.bot.get_guild(guild_id)
+            if guild is None or guild.voice_client: continue # 다른 샤드의 길드이거나 이미 연결됨
+            channel = guild.get_channel(channel_id)
+            if channel is None or not any(not member.bot for member in channel.members): continue
+            state = await self._get_state(guild_id)
+            if not state.queue: continue
+            try:
+                await channel.connect(timeout=15.0)
+            except Exception as e:
+                logger.warning("[resume] Could not reconnect to voice in guild %s: %s", guild_id, e)
+                continue
+            logger.info("[resume] Resuming %s queued tracks in guild %s", len(state.queue), guild_id)
+            await self._notify(state, f"봇이 다시 시작되어 이전 대기열({len(state.queue)}곡)을 이어서 재생합니다.")
+            state.player.wake()
+            resumed += 1
+            await asyncio.sleep(GUILD_RESUME_STAGGER)
+        if resumed:
+            logger.info("[resume] Resumed playback in %s guild(s)", resumed)
+
     @discord.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         if member.id == self.bot.user.id or before.channel == after.channel:
@@ -487,17 +981,16 @@ class MusicCog(discord.Cog):
         if voice_client and voice_client.is_connected():
             # 채널에 봇만 남았는지 확인
             if len(voice_client.channel.members) == 1:
-                logger.info(f"[auto-leave] Leaving voice channel in guild {member.guild.id} due to inactivity.")
-                state = self._get_state(member.guild.id)
+                logger.info("[auto-leave] Leaving voice channel in guild %s due to inactivity.", member.guild.id)
+                # 라디오만 듣던 길드에는 대기열 상태가 없으므로 새로 만들지 않습니다.
+                state = self.states.get(member.guild.id)
                 try:
                     await voice_client.disconnect()
                 except Exception as e:
-                    logger.error(f"[auto-leave] Error disconnecting from voice channel in {member.guild.name}: {e}")
+                    logger.error("[auto-leave] Error disconnecting from voice channel in %s: %s", member.guild.name, e)
                 finally:
-                    state.is_playing = False
-                    state.current_song = None
-                    if member.guild.id in self.states:
-                        del self.states[member.guild.id]
+                    if state: state.current_song = None
+                    self._drop_state(member.guild.id)
 
 def setup(bot):
     bot.add_cog(MusicCog(bot))
\ No newline at end of file
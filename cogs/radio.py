@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import os
+import random
+
+import discord
+from discord.ext import commands
+
+from core.audio import GaplessStream, PRELOAD_LEAD_SECONDS
+from core.broadcast import Broadcaster
+from core.history import PlayedHistory
+from core.loader import open_track, prepare_track
+from core.player import backoff_delay
+from core.prefetch import is_stream_fresh, PLAYBACK_MIN_TTL
+from core.scheduler import PRIORITY_AUTOPLAY, PRIORITY_PREFETCH
+from core.track import Track
+from utils import related_candidates
+
+logger = logging.getLogger(__name__)
+
+# 방송국 목록: "이름=시작 곡 URL"을 쉼표로 구분합니다. 시작 곡 이후에는 추천 그래프의 관련 곡을 이어서 방송합니다.
+RADIO_STATIONS = os.getenv('RADIO_STATIONS', '')
+RADIO_IDLE_STOP = int(os.getenv('RADIO_IDLE_STOP', '300'))  # 청취자가 없어지고 이 시간(초)이 지나면 방송을 멈춥니다.
+RADIO_TRACK_ATTEMPTS = 5  # 다음 곡을 고르고 여는 데 연속으로 실패할 수 있는 횟수
+RADIO_RETRY_DELAY = 60  # 모두 실패하면 이 시간(초) 뒤에 다시 시도합니다. (그동안 청취자에게는 무음)
+RADIO_CANDIDATES = 10  # 추천 목록에서 아직 방송하지 않은 앞쪽 곡 중에서 고릅니다.
+
+
+def parse_stations(spec):
+    """RADIO_STATIONS 값을 {이름: 시작 곡 URL}로 바꿉니다."""
+    stations = {}
+    for item in spec.split(','):
+        name, sep, url = item.partition('=')
+        if sep and name.strip() and url.strip():
+            stations[name.strip()] = url.strip()
+    return stations
+
+
+class RadioStation:
+    """방송국 하나의 곡 순서를 정하고 Broadcaster로 모든 청취 길드에 한 번에 내보냅니다.
+
+    곡 준비와 FFmpeg 소스 열기는 길드 재생과 같은 core/loader.py 함수를 쓰고, 곡이 끝나기 전에 다음 곡을
+    장전하는 것도 길드 재생과 같습니다. 이벤트 루프에서만 사용합니다.
+    """
+    def __init__(self, name, seed_url, loop):
+        self.name = name
+        self.seed_url = seed_url
+        self.loop = loop
+        self.history = PlayedHistory()  # 방송한 곡 (다시 고르지 않음)
+        self.current = None  # 방송 중인 Track
+        self.stream = None  # 방송 중인 GaplessStream
+        self.broadcaster = Broadcaster(name, on_idle=lambda: loop.call_soon_threadsafe(self._on_idle))
+        self._advance_task = None
+        self._retry_timer = None
+        self._preload_timer = None
+        self._preload_task = None
+        self._stop_timer = None
+
+    @property
+    def listeners(self):
+        return self.broadcaster.listeners
+
+    def subscribe(self):
+        """청취자 소스를 만듭니다. 방송이 멈춰 있으면 시작합니다."""
+        if self._stop_timer:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+        if not self.broadcaster.running:
+            logger.info("[radio] %s: Starting broadcast.", self.name)
+            self.broadcaster.start()
+            self._advance()
+        return self.broadcaster.listener()
+
+    def schedule_idle_stop(self):
+        """청취자가 빠졌을 때 호출합니다. RADIO_IDLE_STOP초 뒤에도 청취자가 없으면 방송을 멈춥니다."""
+        if self._stop_timer or not self.broadcaster.running:
+            return
+        def stop_if_idle():
+            self._stop_timer = None
+            if self.listeners == 0:
+                logger.info("[radio] %s: No listeners. Stopping broadcast.", self.name)
+                self.stop()
+        self._stop_timer = self.loop.call_later(RADIO_IDLE_STOP, stop_if_idle)
+
+    def stop(self):
+        for handle in (self._stop_timer, self._retry_timer, self._preload_timer, self._advance_task, self._preload_task):
+            if handle: handle.cancel()
+        self._stop_timer = self._retry_timer = self._preload_timer = None
+        self._advance_task = self._preload_task = None
+        self.broadcaster.stop()
+        self._discard_preloaded()
+        if self.current and self.current.video_id: self.history.append(self.current.video_id)
+        self.current = None
+        self.stream = None
+
+    def _discard_preloaded(self):
+        """방송을 끝낸 스트림에 장전되어 남은 다음 곡 소스를 정리합니다. (GaplessStream.cleanup()은 정리하지 않음)"""
+        leftover = self.stream.clear_next() if self.stream else None
+        if leftover: leftover.cleanup()
+
+    def _on_idle(self):
+        """방송하던 곡이 끝났고 장전된 다음 곡이 없을 때 (방송 스레드 → 이벤트 루프)"""
+        self._discard_preloaded()
+        if self.current and self.current.video_id: self.history.append(self.current.video_id)
+        self.current = None
+        self.stream = None
+        if self.broadcaster.running: self._advance()
+
+    def _advance(self):
+        if self._advance_task and not self._advance_task.done(): return
+        self._retry_timer = None
+        self._advance_task = self.loop.create_task(self._play_next())
+
+    async def _next_song(self):
+        """다음에 방송할 곡. 처음에는 시작 곡, 이후에는 마지막 곡의 관련 곡 중 방송하지 않은 곡입니다."""
+        if self.current is None:
+            seed = Track(self.seed_url, added_by='autoplay')
+            if seed.video_id is None or seed.video_id not in self.history:
+                return seed
+            base = seed.video_id
+        else:
+            base = self.current.video_id
+        if base is None: return None
+        candidates = await related_candidates(base, lambda v: v in self.history)
+        if not candidates: return None
+        choice = random.choice(candidates[:RADIO_CANDIDATES])
+        return Track.from_video_id(choice['id'], choice['title'], added_by='autoplay')
+
+    async def _open(self, song, priority):
+        if not is_stream_fresh(song, PLAYBACK_MIN_TTL):
+            song.prepared = False
+        if not await prepare_track(song, priority): return None
+        return await open_track(song)
+
+    async def _play_next(self):
+        for attempt in range(RADIO_TRACK_ATTEMPTS):
+            if attempt: await asyncio.sleep(backoff_delay(attempt))
+            song = await self._next_song()
+            if song is None: continue
+            source = await self._open(song, PRIORITY_AUTOPLAY)
+            if source is None:
+                # 열지 못한 곡은 다시 고르지 않습니다.
+                if song.video_id: self.history.append(song.video_id)
+                continue
+            if not self.broadcaster.running:
+                source.cleanup()
+                return
+            self.current = song
+            def on_transition(finished, upcoming):
+                # 방송 스레드에서 호출되므로 상태 변경은 이벤트 루프로 넘깁니다.
+                self.loop.call_soon_threadsafe(self._on_transition, finished, upcoming)
+            self.stream = GaplessStream(source, on_transition)
+            self.broadcaster.play(self.stream)
+            logger.info("[radio] %s: Now broadcasting %s to %s listener(s).", self.name, song.title, self.listeners)
+            self._schedule_preload()
+            return
+        logger.warning("[radio] %s: Could not find a playable song. Retrying in %ss.", self.name, RADIO_RETRY_DELAY)
+        self._retry_timer = self.loop.call_later(RADIO_RETRY_DELAY, self._advance)
+
+    def _on_transition(self, finished, upcoming):
+        if finished.video_id: self.history.append(finished.video_id)
+        self.current = upcoming
+        logger.info("[radio] %s: Switched to %s", self.name, upcoming.title)
+        self._schedule_preload()
+
+    def _schedule_preload(self):
+        """방송 중인 곡이 끝나기 PRELOAD_LEAD_SECONDS초 전에 다음 곡을 장전하도록 예약합니다."""
+        if self._preload_timer:
+            self._preload_timer.cancel()
+            self._preload_timer = None
+        stream = self.stream
+        if not stream or not stream.song.duration: return
+        delay = stream.song.duration - stream.elapsed() - PRELOAD_LEAD_SECONDS
+        if delay > 0:
+            self._preload_timer = self.loop.call_later(delay, self._schedule_preload)
+        elif not self._preload_task or self._preload_task.done():
+            self._preload_task = self.loop.create_task(self._preload_next())
+
+    async def _preload_next(self):
+        stream = self.stream
+        if not stream or stream.peek_next_song() is not None: return
+        song = await self._next_song()
+        if song is None: return
+        source = await self._open(song, PRIORITY_PREFETCH)
+        if source is None: return
+        # 준비하는 동안 방송이 멈췄거나 다른 곡으로 넘어갔으면 버립니다.
+        if self.stream is not stream or stream.song is not self.current:
+            source.cleanup()
+            return
+        previous = stream.set_next(source)
+        if previous: previous.cleanup()
+        logger.info("[radio] %s: Preloaded next song: %s", self.name, song.title)
+
+
+# 자동 완성 핸들러는 self를 인자로 받지 않는 독립 함수여야 합니다.
+async def get_station_names(ctx: discord.AutocompleteContext):
+    """/radio join의 station 옵션 자동완성 목록"""
+    radio = ctx.bot.get_cog('RadioCog')
+    return list(radio.station_urls) if radio else []
+
+
+class RadioCog(commands.Cog):
+    """여러 서버가 함께 듣는 24시간 라디오. 방송국마다 곡을 한 번만 디코딩/인코딩해 모든 청취 서버에 보냅니다."""
+    def __init__(self, bot):
+        self.bot = bot
+        self.station_urls = parse_stations(RADIO_STATIONS)
+        self.stations = {}  # {이름: RadioStation} (처음 들을 때 만듦)
+        self.listening = {}  # {guild_id: (RadioStation, BroadcastListener)}
+
+    def cog_unload(self):
+        for station in self.stations.values():
+            station.stop()
+
+    radio = discord.SlashCommandGroup("radio", "여러 서버가 함께 듣는 24시간 라디오")
+
+    def _get_station(self, name):
+        station = self.stations.get(name)
+        if station is None:
+            station = self.stations[name] = RadioStation(name, self.station_urls[name], self.bot.loop)
+        return station
+
+    def _on_listener_ended(self, guild_id, listener, error):
+        """길드의 음성 플레이어가 방송 청취를 멈췄을 때 (음성 플레이어 스레드 → 이벤트 루프)"""
+        if error:
+            logger.error("[radio] Listener error in guild %s: %s", guild_id, error)
+        entry = self.listening.get(guild_id)
+        if entry is None or entry[1] is not listener: return
+        del self.listening[guild_id]
+        entry[0].schedule_idle_stop()
+
+    def stats(self):
+        """방송국별 방송 지표 (지표 엔드포인트용)"""
+        return {name: station.broadcaster.stats() for name, station in self.stations.items()}
+
+    @radio.command(description="라디오 방송을 듣습니다. 지금 방송 중인 위치부터 재생됩니다.")
+    async def join(self, ctx, station: discord.Option(str, "방송국 이름", autocomplete=discord.utils.basic_autocomplete(get_station_names))):
+        if station not in self.station_urls:
+            await ctx.respond("없는 방송국입니다. `/radio stations`로 목록을 확인해주세요.", ephemeral=True)
+            return
+        if not ctx.author.voice:
+            await ctx.respond("음성 채널에 먼저 참여해주세요.", ephemeral=True)
+            return
+        # 음악 Cog가 함께 로드되어 있으면 대기열 재생과 겹치지 않게 합니다.
+        music = self.bot.get_cog('MusicCog')
+        music_state = music.states.get(ctx.guild.id) if music else None
+        if music_state and music_state.is_playing:
+            await ctx.respond("대기열을 재생 중입니다. `/leave` 후 다시 시도해주세요.", ephemeral=True)
+            return
+        await ctx.defer()
+        voice_client = ctx.voice_client
+        try:
+            if voice_client and voice_client.is_connected():
+                if ctx.author.voice.channel != voice_client.channel:
+                    await voice_client.move_to(ctx.author.voice.channel)
+            else:
+                if voice_client:
+                    await voice_client.disconnect(force=True)
+                voice_client = await ctx.author.voice.channel.connect(timeout=15.0)
+        except (discord.errors.ConnectionClosed, asyncio.TimeoutError) as e:
+            logger.error("[voice_connect] Known error connecting to voice in %s: %s", ctx.guild.name, e)
+            await ctx.followup.send("음성 채널 연결에 실패했습니다. Discord 서버 상태에 문제가 있을 수 있습니다. 잠시 후 다시 시도해주세요.")
+            return
+        if voice_client.is_playing() or voice_client.is_paused():
+            # 다른 방송국을 듣던 중이면 멈춥니다. (이전 청취자는 after 콜백에서 정리)
+            voice_client.stop()
+        radio_station = self._get_station(station)
+        listener = radio_station.subscribe()
+        guild_id = ctx.guild.id
+        self.listening[guild_id] = (radio_station, listener)
+        def after_listening(error):
+            self.bot.loop.call_soon_threadsafe(self._on_listener_ended, guild_id, listener, error)
+        voice_client.play(listener, after=after_listening)
+        now_playing = radio_station.current.title if radio_station.current else "곧 방송이 시작됩니다."
+        await ctx.followup.send(f"'{station}' 라디오를 듣습니다. (청취 중인 서버 {radio_station.listeners}곳)\n지금 나오는 곡: {now_playing}")
+
+    @radio.command(description="라디오 청취를 멈추고 음성 채널에서 나갑니다.")
+    async def leave(self, ctx):
+        entry = self.listening.get(ctx.guild.id)
+        voice_client = ctx.voice_client
+        if entry is None or not voice_client:
+            await ctx.respond("라디오를 듣고 있지 않습니다.", ephemeral=True)
+            return
+        try:
+            await voice_client.disconnect()
+            await ctx.respond(f"'{entry[0].name}' 라디오 청취를 멈췄습니다.")
+        except Exception as e:
+            logger.error("[voice_disconnect] Error disconnecting from voice channel in %s: %s", ctx.guild.name, e)
+            await ctx.respond("음성 채널을 나가는 중 오류가 발생했습니다.", ephemeral=True)
+
+    @radio.command(description="방송국 목록과 지금 나오는 곡을 보여줍니다.")
+    async def stations(self, ctx):
+        if not self.station_urls:
+            await ctx.respond("설정된 방송국이 없습니다. (`RADIO_STATIONS`)", ephemeral=True)
+            return
+        embed = discord.Embed(title="라디오 방송국", color=discord.Color.blue())
+        for name in self.station_urls:
+            station = self.stations.get(name)
+            if station and station.broadcaster.running:
+                now_playing = station.current.title if station.current else "곡 준비 중"
+                value = f"지금 나오는 곡: {now_playing}\n청취 중인 서버: {station.listeners}곳"
+            else:
+                value = "방송 대기 중 (`/radio join`으로 시작)"
+            embed.add_field(name=name, value=value, inline=False)
+        await ctx.respond(embed=embed)
+
+
+def setup(bot):
+    bot.add_cog(RadioCog(bot))
@@ -0,0 +1,216 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import discord
+
+from core.metrics import GAP_SECONDS, PLAY_TO_AUDIO_SECONDS
+
+try:
+    import audioop  # 크로스페이드 믹싱용 (Python 3.13에서 제거됨)
+except ImportError:
+    audioop = None
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 20
+CROSSFADE_MS = int(os.getenv('CROSSFADE_MS', '0'))  # 0이면 크로스페이드 없이 바로 이어 붙임
+PRELOAD_LEAD_SECONDS = 15  # 곡이 끝나기 이만큼 전에 다음 곡의 FFmpeg를 띄워 둡니다.
+
+
+class GapTracker:
+    """곡과 곡 사이의 무음 구간(이전 곡 마지막 프레임 → 다음 곡 첫 프레임)을 기록합니다."""
+    def __init__(self, window=256):
+        self._gaps = deque(maxlen=window)  # 초 단위
+        self._lock = threading.Lock()
+        self.gapless_transitions = 0
+        self.fallback_transitions = 0
+
+    def record(self, gap_s, gapless):
+        gap_s = max(0.0, gap_s)
+        with self._lock:
+            self._gaps.append(gap_s)
+            if gapless:
+                self.gapless_transitions += 1
+            else:
+                self.fallback_transitions += 1
+        GAP_SECONDS.observe(gap_s, mode='gapless' if gapless else 'fallback')
+        # 음성 플레이어 스레드에서 곡마다 호출되므로 로그가 꺼져 있으면 문자열을 만들지 않습니다.
+        logger.info("[gapless] Inter-track gap: %.1f ms (%s)", gap_s * 1000, 'gapless' if gapless else 'fallback')
+
+    def stats(self):
+        with self._lock:
+            gaps = sorted(self._gaps)
+            gapless, fallback = self.gapless_transitions, self.fallback_transitions
+        if not gaps:
+            return {'count': 0, 'gapless': gapless, 'fallback': fallback, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'count': len(gaps),
+            'gapless': gapless,
+            'fallback': fallback,
+            'p50_ms': gaps[len(gaps) // 2] * 1000,
+            'p95_ms': gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))] * 1000,
+            'max_ms': gaps[-1] * 1000,
+        }
+
+
+gap_tracker = GapTracker()
+
+
+class PrimedSource(discord.AudioSource):
+    """첫 프레임을 미리 읽어 둔 오디오 소스
+
+    prime()은 FFmpeg의 프로브/첫 디코딩이 끝날 때까지 블로킹되므로 executor에서 호출해야 합니다.
+    on_cleanup(played_seconds, ended)는 cleanup()을 호출한 스레드(대개 음성 플레이어 스레드)에서 한 번 호출됩니다.
+    """
+    def __init__(self, source, song, on_cleanup=None):
+        self.source = source
+        self.song = song
+        self._first_frame = None
+        self.primed = False
+        self.gap_origin = None  # 이전 곡이 끝난 시각(perf_counter). 첫 프레임에서 간격을 기록합니다.
+        self.on_cleanup = on_cleanup
+        self.frames = 0  # 내보낸 프레임 수
+        self.ended = False  # FFmpeg 출력이 끝까지 나왔는지
+
+    def prime(self):
+        self._first_frame = self.source.read()
+        self.primed = True
+        return bool(self._first_frame)
+
+    def read(self):
+        if self._first_frame is not None:
+            frame, self._first_frame = self._first_frame, None
+        else:
+            frame = self.source.read()
+        if frame:
+            self.frames += 1
+        else:
+            self.ended = True
+        if self.gap_origin is not None and frame:
+            gap_tracker.record(time.perf_counter() - self.gap_origin, gapless=False)
+            self.gap_origin = None
+        if self.song.requested_at is not None and frame:
+            # /play로 요청한 곡의 첫 프레임이 음성 플레이어로 나가는 시점
+            PLAY_TO_AUDIO_SECONDS.observe(time.perf_counter() - self.song.requested_at)
+            self.song.requested_at = None
+        return frame
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
+        callback, self.on_cleanup = self.on_cleanup, None
+        if callback is not None:
+            callback(self.frames * FRAME_MS / 1000, self.ended)
+
+
+class GaplessStream(discord.AudioSource):
+    """길드 하나의 연속 재생 스트림
+
+    현재 곡이 끝나면(read()가 b'' 반환) 미리 준비된 다음 곡으로 같은 read() 호출 안에서 넘어가므로
+    음성 플레이어가 멈추지 않고 곡 사이에 무음이 생기지 않습니다. 다음 곡이 없으면 b''를 반환해
+    voice_client의 after 콜백이 평소처럼 호출됩니다.
+
+    set_next()/clear_next()는 이벤트 루프에서, read()는 음성 플레이어 스레드에서 호출됩니다.
+    cleanup()은 현재 곡만 정리하므로, 스트림이 끝난 뒤 장전된 곡이 남아 있으면 clear_next()로 꺼내야 합니다.
+    on_transition(finished_song, next_song)은 플레이어 스레드에서 호출되므로 스레드 안전해야 합니다.
+    """
+    def __init__(self, source, on_transition, crossfade_ms=CROSSFADE_MS):
+        self.current = source
+        self._next = None
+        self._lock = threading.Lock()
+        self._on_transition = on_transition
+        self._crossfade_frames = crossfade_ms // FRAME_MS if audioop else 0
+        self._lookahead = deque()
+        self._current_ended = False
+        self.frames_read = 0  # 현재 곡에서 내보낸 프레임 수
+
+    @property
+    def song(self):
+        return self.current.song
+
+    def elapsed(self):
+        return self.frames_read * FRAME_MS / 1000
+
+    def set_next(self, source):
+        """다음 곡 소스를 장전합니다. 이미 장전된 소스가 있으면 반환하므로 호출자가 정리해야 합니다."""
+        with self._lock:
+            previous, self._next = self._next, source
+        return previous
+
+    def clear_next(self):
+        """장전된 다음 곡 소스를 꺼내 반환합니다. (없으면 None)"""
+        with self._lock:
+            source, self._next = self._next, None
+        return source
+
+    def peek_next_song(self):
+        with self._lock:
+            return self._next.song if self._next else None
+
+    def _read_current(self):
+        if self._crossfade_frames <= 0:
+            frame = self.current.read()
+            self._current_ended = not frame
+            return frame
+        # 크로스페이드를 위해 현재 곡을 crossfade 길이만큼 미리 읽어 둡니다.
+        while not self._current_ended and len(self._lookahead) <= self._crossfade_frames:
+            frame = self.current.read()
+            if not frame:
+                self._current_ended = True
+                break
+            self._lookahead.append(frame)
+        if not self._lookahead:
+            return b''
+        frame = self._lookahead.popleft()
+        if self._current_ended:
+            # 남은 프레임 수에 비례해 현재 곡은 줄이고 다음 곡은 키웁니다.
+            fade_out = min(1.0, len(self._lookahead) / self._crossfade_frames)
+            # 읽는 동안 이벤트 루프가 clear_next()로 꺼내 정리하지 못하도록 잠금을 쥔 채로 읽습니다.
+            with self._lock:
+                upcoming = self._next
+                # Opus 패킷은 섞을 수 없으므로 두 곡 모두 PCM일 때만 크로스페이드합니다.
+                mixable = upcoming is not None and not upcoming.is_opus() and not self.current.is_opus()
+                incoming = upcoming.read() if mixable and fade_out < 1.0 else None
+            if incoming:
+                frame = audioop.add(audioop.mul(frame, 2, fade_out), audioop.mul(incoming, 2, 1.0 - fade_out), 2)
+        return frame
+
+    def read(self):
+        frame = self._read_current()
+        if frame:
+            self.frames_read += 1
+            return frame
+        ended_at = time.perf_counter()
+        with self._lock:
+            upcoming, self._next = self._next, None
+        if upcoming is None:
+            return b''
+        finished = self.current
+        finished.cleanup()
+        self.current = upcoming
+        self._lookahead.clear()
+        self._current_ended = False
+        self.frames_read = 0
+        frame = upcoming.read()
+        gap_tracker.record(time.perf_counter() - ended_at, gapless=True)
+        try:
+            self._on_transition(finished.song, upcoming.song)
+        except Exception as e:
+            logger.error("[gapless] Transition callback failed: %s", e)
+        if frame:
+            self.frames_read += 1
+        return frame
+
+    def is_opus(self):
+        # 음성 플레이어는 프레임마다 is_opus()를 확인하므로, PCM 곡과 Opus 곡이 섞여 있어도 됩니다.
+        return self.current.is_opus()
+
+    def cleanup(self):
+        # 장전된 다음 곡은 정리하지 않습니다. 음성 플레이어는 after 콜백보다 cleanup()을 먼저 부르므로,
+        # 스트림을 버리는 쪽이 clear_next()로 꺼내 다음 재생에 쓰거나 정리합니다.
+        self.current.cleanup()
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.02
+BROADCAST_BUFFER_FRAMES = 50  # 청취자가 이만큼(1초) 넘게 밀리면 라이브 위치로 건너뜁니다.
+BROADCAST_JITTER_FRAMES = 2  # 새 청취자는 라이브 위치보다 이만큼 뒤에서 시작해 스레드 간 타이밍 차이를 흡수합니다.
+OPUS_SILENCE = b'\xf8\xff\xfe'  # 보낼 프레임이 없을 때 내보내는 Opus 무음 프레임
+
+
+class Broadcaster:
+    """한 번 디코딩/인코딩한 Opus 프레임을 여러 음성 클라이언트에 나눠 주는 방송 스레드
+
+    스레드 하나가 20ms마다 현재 소스(GaplessStream 등)에서 프레임을 읽어, PCM이면 한 번만 Opus로 인코딩한 뒤
+    최근 BROADCAST_BUFFER_FRAMES개를 담는 링 버퍼에 올립니다. 각 길드의 음성 플레이어는 listener()로 만든
+    BroadcastListener를 재생하며 같은 bytes 객체를 그대로 가져가므로(복사 없음) 청취자가 늘어도
+    FFmpeg와 인코더는 하나뿐입니다. 새 청취자는 지금 방송 중인 위치부터 듣습니다.
+
+    play()/stop()/listener()는 이벤트 루프에서, 소스의 read()는 방송 스레드에서 호출됩니다.
+    on_idle()은 소스가 끝났을 때 방송 스레드에서 호출되므로 스레드 안전해야 합니다.
+    """
+    def __init__(self, name, on_idle=None, buffer_frames=BROADCAST_BUFFER_FRAMES):
+        self.name = name
+        self._on_idle = on_idle
+        self._frames = deque(maxlen=buffer_frames)  # 최근 Opus 프레임 (번호는 _published로 계산)
+        self._published = 0  # 지금까지 올린 프레임 수 (= 다음 프레임 번호)
+        self._cond = threading.Condition()
+        self._source = None  # 방송할 소스 (이벤트 루프가 정함)
+        self._playing = None  # 방송 스레드가 실제로 읽고 있는 소스
+        self._encoder = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self.listeners = 0
+        self.encoded = 0  # PCM에서 인코딩한 프레임 수
+        self.underruns = 0  # 청취자에게 보낼 프레임이 없어 무음을 보낸 횟수
+        self.resyncs = 0  # 밀린 청취자를 라이브 위치로 옮긴 횟수
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            self._frames.clear()
+            self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stopped,), name=f'broadcast-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """방송을 멈춥니다. 청취자의 read()는 b''를 반환해 각 음성 플레이어의 after 콜백이 호출됩니다."""
+        with self._cond:
+            self._stopped.set()
+            self._thread = None
+            # 방송 스레드가 아직 집어 가지 않은 소스는 여기서 정리합니다. (읽던 소스는 방송 스레드가 정리)
+            pending, self._source = self._source, None
+            if pending is self._playing:
+                pending = None
+            self._cond.notify_all()
+        if pending is not None:
+            pending.cleanup()
+
+    def play(self, source):
+        """방송할 소스를 바꿉니다. 이전 소스는 방송 스레드가 정리합니다."""
+        with self._cond:
+            self._source = source
+
+    def listener(self):
+        """라이브 위치부터 재생하는 음성 소스를 만듭니다."""
+        with self._cond:
+            self.listeners += 1
+            position = max(self._published - len(self._frames), self._published - BROADCAST_JITTER_FRAMES)
+        return BroadcastListener(self, position)
+
+    def _remove_listener(self):
+        with self._cond:
+            self.listeners -= 1
+
+    def _encode(self, pcm):
+        if self._encoder is None:
+            self._encoder = discord.opus.Encoder()
+        self.encoded += 1
+        return self._encoder.encode(pcm, self._encoder.SAMPLES_PER_FRAME)
+
+    def _run(self, stopped):
+        playing = None
+        next_at = time.perf_counter()
+        try:
+            while not stopped.is_set():
+                with self._cond:
+                    if stopped.is_set():
+                        break
+                    source = self._playing = self._source
+                if source is not playing:
+                    if playing is not None:
+                        playing.cleanup()
+                    playing = source
+                packet = None
+                if playing is not None:
+                    frame = playing.read()
+                    if frame:
+                        packet = frame if playing.is_opus() else self._encode(frame)
+                    else:
+                        with self._cond:
+                            if self._source is playing:
+                                self._source = None
+                        playing.cleanup()
+                        playing = None
+                        if self._on_idle:
+                            self._on_idle()
+                if packet:
+                    with self._cond:
+                        self._frames.append(packet)
+                        self._published += 1
+                        self._cond.notify_all()
+                next_at += FRAME_SECONDS
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -BROADCAST_BUFFER_FRAMES * FRAME_SECONDS:
+                    next_at = time.perf_counter()  # 크게 밀렸으면 따라잡으려 몰아서 읽지 않습니다.
+        except Exception as e:
+            logger.error("[broadcast] %s: Broadcast thread crashed: %s", self.name, e, exc_info=True)
+        finally:
+            with self._cond:
+                if self._playing is playing:
+                    self._playing = None
+                if self._source is playing:
+                    self._source = None
+            if playing is not None:
+                playing.cleanup()
+
+    def read_for(self, listener):
+        """청취자의 다음 Opus 프레임. 아직 없으면 한 프레임만큼 기다린 뒤 무음을 반환합니다."""
+        with self._cond:
+            if listener.position >= self._published and not self._stopped.is_set():
+                self._cond.wait(FRAME_SECONDS)
+            if self._stopped.is_set():
+                return b''
+            if listener.position >= self._published:
+                self.underruns += 1
+                return OPUS_SILENCE
+            oldest = self._published - len(self._frames)
+            if listener.position < oldest:
+                listener.position = max(oldest, self._published - BROADCAST_JITTER_FRAMES)
+                self.resyncs += 1
+            packet = self._frames[listener.position - oldest]
+            listener.position += 1
+            return packet
+
+    def stats(self):
+        with self._cond:
+            return {
+                'running': self.running,
+                'listeners': self.listeners,
+                'published': self._published,
+                'encoded': self.encoded,
+                'underruns': self.underruns,
+                'resyncs': self.resyncs,
+            }
+
+
+class BroadcastListener(discord.AudioSource):
+    """Broadcaster의 방송을 한 음성 클라이언트에서 재생하는 소스 (항상 Opus)"""
+    def __init__(self, broadcaster, position):
+        self.broadcaster = broadcaster
+        self.position = position  # 다음에 읽을 프레임 번호
+        self._closed = False
+
+    def read(self):
+        return self.broadcaster.read_for(self)
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        if not self._closed:
+            self._closed = True
+            self.broadcaster._remove_listener()
@@ -0,0 +1,339 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from core.ffmpeg import CAPTURE_FORMATS, input_demuxer, is_local_input
+from core.logs import log_future_error
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', '')  # 비어 있으면 디스크 캐시를 쓰지 않습니다.
+AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', '2048'))
+AUDIO_CACHE_POLICY = os.getenv('AUDIO_CACHE_POLICY', 'lru')  # "lru" 또는 "lfu"
+AUDIO_CACHE_MAX_TRACK_SECONDS = 1200  # 이보다 긴 곡(믹스, 라이브 등)은 캐시하지 않습니다.
+CAPTURE_END_TOLERANCE = 2.0  # 곡 길이보다 이만큼(초) 덜 재생되어도 끝까지 받은 것으로 봅니다. (yt-dlp 길이는 초 단위로 반올림)
+
+INDEX_NAME = 'index.json'
+PART_SUFFIX = '.part'
+_EXT_TO_DEMUXER = {ext: demuxer for demuxer, (ext, _) in CAPTURE_FORMATS.items()}
+
+
+class AudioCapture:
+    """재생 FFmpeg가 원본 오디오를 함께 저장하는 파일 하나 (AudioDiskCache.start_capture()가 만듦)
+
+    keep이면 끝까지 받은 파일을 디스크 캐시에 넣고, 아니면 라우드니스 측정에만 쓰고 지웁니다.
+    """
+    __slots__ = ('video_id', 'path', 'demuxer', 'stream_format', 'duration', 'keep')
+
+    def __init__(self, video_id, path, demuxer, stream_format, duration, keep):
+        self.video_id = video_id
+        self.path = path
+        self.demuxer = demuxer
+        self.stream_format = stream_format
+        self.duration = duration
+        self.keep = keep
+
+    def is_complete(self, played_seconds):
+        return played_seconds >= self.duration - CAPTURE_END_TOLERANCE
+
+
+class AudioDiskCache:
+    """자주 재생되는 곡의 오디오를 디스크에 보관하는 캐시
+
+    - 따로 내려받지 않고, 재생 FFmpeg가 받는 원본 스트림을 재인코딩 없이(-c:a copy) 함께 저장합니다.
+      (start_capture/finish_capture) 그래서 fast-start/Opus passthrough가 캐시 파일에서도 그대로 동작합니다.
+    - 전체 크기가 max_bytes를 넘으면 LRU(마지막 재생 시각) 또는 LFU(재생 횟수) 순으로 지웁니다.
+    - 파일은 임시 파일(.part)에 받은 뒤 끝까지 재생된 경우에만 os.replace로 옮기므로 반쯤 받은 파일이 캐시로 보이지 않습니다.
+    - 인덱스(index.json)가 없거나 깨졌으면 디렉터리를 다시 훑어 복구합니다.
+    - 파일 작업은 모두 executor에서 합니다. 디렉터리 복구는 load()에서 하며, 그 전에는 캐시를 쓰지 않습니다.
+    """
+    def __init__(self, directory=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024,
+                 policy=AUDIO_CACHE_POLICY, flush_delay=10.0):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown audio cache policy: {policy}")
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.flush_delay = flush_delay
+        self.ready = False  # load()가 끝났는지
+        self.capture_directory = None  # 캐시에 넣지 않는(측정용) 저장 파일을 둘 임시 디렉터리
+        self._entries = {}  # {video_id: {'file', 'size', 'format', 'duration', 'last_access', 'hits'}}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._capturing = set()  # 저장 중인 video id (이벤트 루프에서만 사용)
+        self._flush_handle = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fills = 0
+        self.fill_failures = 0
+
+    async def load(self):
+        """캐시 디렉터리를 복구하고 임시 디렉터리를 만듭니다. 봇이 준비되었을 때 한 번 호출합니다."""
+        if self.ready:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._load)
+        except OSError as e:
+            logger.error("[disk_cache] Failed to open audio cache: %s", e)
+            return
+        self.ready = True
+
+    def _load(self):
+        self.capture_directory = tempfile.mkdtemp(prefix='musicbot-capture-')
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._recover()
+
+    # --- 인덱스 ---
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _recover(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(PART_SUFFIX):
+                # 받는 도중에 프로세스가 죽어 남은 임시 파일
+                os.unlink(os.path.join(self.directory, name))
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = {}
+        except (OSError, ValueError) as e:
+            logger.warning("[disk_cache] Index is unreadable (%s). Rebuilding from directory.", e)
+            entries = {}
+        # 인덱스와 실제 파일을 맞춥니다. 파일이 없는 항목은 버리고, 인덱스에 없는 파일은 다시 등록합니다.
+        recovered = {}
+        for name in os.listdir(self.directory):
+            video_id, _, ext = name.rpartition('.')
+            if name == INDEX_NAME or ext not in _EXT_TO_DEMUXER or not video_id:
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entry = entries.get(video_id)
+            if entry is None or entry.get('file') != name:
+                entry = {
+                    'file': name,
+                    'format': {'ext': ext, 'container': ext, 'acodec': 'opus' if ext == 'webm' else 'mp4a'},
+                    'duration': None,
+                    'last_access': stat.st_mtime,
+                    'hits': 0,
+                }
+            entry['size'] = stat.st_size
+            recovered[video_id] = entry
+        with self._lock:
+            self._entries = recovered
+            self._dirty = recovered != entries
+        logger.info("[disk_cache] %s cached tracks (%.1f MiB) in %s", len(recovered), self.total_bytes() / 1024 / 1024, self.directory)
+        self._evict()
+
+    def flush(self):
+        """인덱스를 원자적으로 저장합니다. 블로킹 I/O이므로 executor에서 호출하세요."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {video_id: dict(entry) for video_id, entry in self._entries.items()}
+            self._dirty = False
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.index-', suffix=PART_SUFFIX)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._index_path())
+        except Exception:
+            os.unlink(tmp_path)
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def flush():
+            self._flush_handle = None
+            future = loop.run_in_executor(None, self.flush)
+            future.add_done_callback(log_future_error(logger, "[disk_cache] Failed to save index"))
+
+        self._flush_handle = loop.call_later(self.flush_delay, flush)
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry['size'] for entry in self._entries.values())
+
+    def _evict(self):
+        """용량을 넘으면 오래된 곡부터 지웁니다. 블로킹 I/O이므로 executor에서 호출합니다."""
+        with self._lock:
+            total = sum(entry['size'] for entry in self._entries.values())
+            if total <= self.max_bytes:
+                return
+            if self.policy == 'lfu':
+                order = sorted(self._entries.items(), key=lambda item: (item[1]['hits'], item[1]['last_access']))
+            else:
+                order = sorted(self._entries.items(), key=lambda item: item[1]['last_access'])
+            victims = []
+            for video_id, entry in order:
+                if total <= self.max_bytes:
+                    break
+                victims.append(entry['file'])
+                total -= entry['size']
+                del self._entries[video_id]
+                self.evictions += 1
+            self._dirty = True
+        for name in victims:
+            try:
+                # 이미 이 파일을 열어 둔 FFmpeg는 영향을 받지 않습니다. (POSIX)
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    # --- 조회 ---
+
+    def lookup(self, video_id):
+        """캐시된 곡이면 {'path', 'format', 'duration'}를 반환합니다.
+
+        파일이 있는지는 확인하지 않습니다. 열지 못하면 호출한 쪽이 discard()로 항목을 지웁니다.
+        """
+        if not self.enabled or not self.ready or not video_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry['last_access'] = time.time()
+            entry['hits'] += 1
+            self._dirty = True
+            self.hits += 1
+            result = {
+                'path': os.path.join(self.directory, entry['file']),
+                'format': dict(entry['format']),
+                'duration': entry.get('duration'),
+            }
+        self._schedule_flush()
+        return result
+
+    def discard(self, video_id):
+        """열 수 없는(지워졌거나 깨진) 캐시 파일의 항목을 지웁니다."""
+        with self._lock:
+            if self._entries.pop(video_id, None) is None:
+                return
+            self._dirty = True
+        logger.warning("[disk_cache] Dropped unreadable cache entry for %s", video_id)
+        self._schedule_flush()
+
+    # --- 채우기 ---
+
+    def start_capture(self, video_id, stream_url, stream_format, duration, measure=False):
+        """재생 FFmpeg가 받는 원본 오디오를 파일로도 저장하도록 준비합니다. 저장할 필요가 없거나 저장할 수 없으면 None.
+
+        디스크 캐시에 없는 곡이면 캐시에 넣으려고, measure=True면 라우드니스를 측정하려고 저장합니다.
+        반환한 AudioCapture를 build_ffmpeg_options(capture=...)에 넘기고, 재생이 끝나면 finish_capture()를 호출합니다.
+        """
+        if not self.ready or not video_id or is_local_input(stream_url) or video_id in self._capturing:
+            return None
+        if not duration or duration > AUDIO_CACHE_MAX_TRACK_SECONDS:
+            return None
+        demuxer = input_demuxer(stream_format)
+        if demuxer not in CAPTURE_FORMATS:
+            return None
+        with self._lock:
+            keep = self.enabled and video_id not in self._entries
+        if not keep and not measure:
+            return None
+        ext, _ = CAPTURE_FORMATS[demuxer]
+        directory = self.directory if keep else self.capture_directory
+        path = os.path.join(directory, f'{video_id}.{ext}{PART_SUFFIX}')
+        self._capturing.add(video_id)
+        return AudioCapture(video_id, path, demuxer, stream_format, duration, keep)
+
+    async def finish_capture(self, capture, complete):
+        """재생이 끝난 저장 파일을 정리합니다. 이벤트 루프에서 호출합니다.
+
+        끝까지 받았으면(complete) 파일 경로를 반환합니다. keep이면 캐시에 넣은 파일이고, 아니면 임시 파일이므로
+        호출한 쪽이 다 쓴 뒤 지워야 합니다. 끝까지 받지 못했으면 파일을 지우고 None을 반환합니다.
+        """
+        self._capturing.discard(capture.video_id)
+        loop = asyncio.get_running_loop()
+        if not complete:
+            await loop.run_in_executor(None, remove_file, capture.path)
+            return None
+        if not capture.keep:
+            return capture.path
+        try:
+            path = await loop.run_in_executor(None, self._commit, capture)
+        except OSError as e:
+            self.fill_failures += 1
+            logger.warning("[disk_cache] Failed to cache %s: %s", capture.video_id, e)
+            await loop.run_in_executor(None, remove_file, capture.path)
+            return None
+        self._schedule_flush()
+        return path
+
+    def _commit(self, capture):
+        """끝까지 받은 저장 파일을 캐시에 넣습니다. 블로킹 I/O이므로 executor에서 호출합니다."""
+        ext, _ = CAPTURE_FORMATS[capture.demuxer]
+        name = f'{capture.video_id}.{ext}'
+        path = os.path.join(self.directory, name)
+        os.replace(capture.path, path)
+        size = os.path.getsize(path)
+        stored_format = {key: capture.stream_format.get(key) for key in ('acodec', 'abr', 'asr', 'audio_channels')}
+        stored_format.update(ext=ext, container=ext)
+        with self._lock:
+            self._entries[capture.video_id] = {
+                'file': name, 'size': size, 'format': stored_format, 'duration': capture.duration,
+                'last_access': time.time(), 'hits': 0,
+            }
+            self._dirty = True
+        self.fills += 1
+        logger.info("[disk_cache] Cached %s (%.1f MiB)", capture.video_id, size / 1024 / 1024)
+        self._evict()
+        return path
+
+    def shutdown(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.flush()
+        if self.capture_directory:
+            shutil.rmtree(self.capture_directory, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            count = len(self._entries)
+            total = sum(entry['size'] for entry in self._entries.values())
+        return {
+            'enabled': self.enabled,
+            'entries': count,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'fills': self.fills,
+            'fill_failures': self.fill_failures,
+            'filling': len(self._capturing),
+        }
+
+
+def remove_file(path):
+    """파일이 있으면 지웁니다. 블로킹 I/O이므로 executor에서 호출합니다."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+# 프로세스 전역 디스크 캐시 (AUDIO_CACHE_DIR이 없으면 비활성)
+audio_disk_cache = AudioDiskCache()
@@ -0,0 +1,319 @@
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing.util
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+import yt_dlp as youtube_dl
+
+from core.metrics import EXTRACT_SECONDS
+from core.scheduler import youtube_scheduler, RequestDropped, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH
+
+logger = logging.getLogger(__name__)
+
+# 추출 용도별 yt-dlp 옵션. 워커는 프로필마다 YoutubeDL 인스턴스를 하나씩 만들어 재사용합니다.
+YDL_PROFILES = {
+    'stream': {
+        'format': 'bestaudio[ext=m4a]/bestaudio/best',
+        'quiet': True,
+        'noplaylist': True,
+        'source_address': '0.0.0.0',  # Force IPv4
+        'cookiefile': './cookies.txt',
+    },
+    'playlist': {
+        'quiet': True,
+        'noplaylist': False,
+        'extract_flat': True,
+        'source_address': '0.0.0.0',
+        'cookiefile': './cookies.txt',
+    },
+    'search': {
+        # 자동완성용 가벼운 검색: 결과 목록의 id/제목만 받습니다.
+        'quiet': True,
+        'extract_flat': True,
+        'source_address': '0.0.0.0',
+        'cookiefile': './cookies.txt',
+    },
+    'related': {
+        'quiet': True,
+        'extract_flat': True,
+        'source_address': '0.0.0.0',  # Force IPv4 to potentially fix SSL errors
+        'cookiefile': './cookies.txt',
+    },
+}
+
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', '4'))
+EXTRACT_MODE = os.getenv('EXTRACT_MODE', 'thread')  # "thread" 또는 "process"
+EXTRACT_MAX_WAITING = int(os.getenv('EXTRACT_MAX_WAITING', '32'))
+# 재생목록은 한 번에 다 받지 않고 페이지 단위로 가져옵니다. 첫 페이지는 바로 재생할 수 있도록 작게 받습니다.
+PLAYLIST_FIRST_PAGE_SIZE = 1
+PLAYLIST_PAGE_SIZE = 100
+
+
+class ExtractionQueueFull(Exception):
+    """대기 중인 추출 요청이 한도를 넘었을 때 발생합니다."""
+
+
+# --- 워커 측 코드 (스레드/프로세스 공통) ---
+
+_worker_local = threading.local()
+_worker_instances = []  # 종료 시 쿠키 저장을 위해 이 프로세스에서 만든 인스턴스를 기록
+_worker_instances_lock = threading.Lock()
+
+
+def _get_ydl(profile):
+    instances = getattr(_worker_local, 'instances', None)
+    if instances is None:
+        instances = _worker_local.instances = {}
+    ydl = instances.get(profile)
+    if ydl is None:
+        ydl = youtube_dl.YoutubeDL(YDL_PROFILES[profile])
+        instances[profile] = ydl
+        with _worker_instances_lock:
+            _worker_instances.append(ydl)
+    return ydl
+
+
+def _warm_worker():
+    """워커가 시작될 때 모든 프로필의 YoutubeDL 인스턴스(와 쿠키 jar)를 미리 만들어 둡니다."""
+    for profile in YDL_PROFILES:
+        _get_ydl(profile)
+
+
+def _warm_process_worker():
+    """프로세스 워커용 initializer. 워커 프로세스가 끝날 때 인스턴스를 닫아 쿠키를 저장하도록 등록합니다."""
+    _warm_worker()
+    multiprocessing.util.Finalize(None, _close_worker_instances, exitpriority=10)
+
+
+def _run_extract(profile, url, sanitize, params=None):
+    ydl = _get_ydl(profile)
+    if params:
+        # 인스턴스는 워커 스레드 전용이므로 이번 호출에만 옵션을 잠시 바꿨다가 되돌립니다.
+        saved = {key: ydl.params.get(key) for key in params}
+        ydl.params.update(params)
+    try:
+        info = ydl.extract_info(url, download=False)
+    finally:
+        if params:
+            ydl.params.update(saved)
+    if sanitize:
+        # 프로세스 경계를 넘길 수 있도록 직렬화 가능한 형태로 정리
+        info = ydl.sanitize_info(info)
+    return info
+
+
+def _playlist_entry(entry):
+    """flat 추출 결과에서 대기열에 필요한 필드만 남깁니다."""
+    return {'id': entry.get('id'), 'title': entry.get('title')}
+
+
+def _run_open_playlist(url):
+    """재생목록을 열어 항목을 하나씩 꺼낼 수 있는 iterator를 반환합니다. (스레드 모드 전용)
+
+    process=False로 추출하면 entries가 generator로 남아 있어, 항목을 꺼낼 때 필요한 페이지만 요청합니다.
+    iterator는 여러 워커 스레드에서 번갈아 사용되므로 스레드별 인스턴스 대신 전용 YoutubeDL을 만듭니다.
+    """
+    ydl = youtube_dl.YoutubeDL(YDL_PROFILES['playlist'])
+    info = ydl.extract_info(url, download=False, process=False)
+    # 믹스 등은 재생목록 URL로 한 번 더 넘겨주는 결과를 반환합니다.
+    for _ in range(3):
+        if info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+    return iter(info.get('entries') or ())
+
+
+def _playlist_page(raw, size):
+    """(항목 목록, 마지막 페이지 여부). 끝은 걸러내기 전 개수로 판단하므로 볼 수 없는(None) 항목이 섞여도 계속 받습니다."""
+    return [_playlist_entry(entry) for entry in raw if entry], len(raw) < size
+
+
+def _run_next_page(entries, size):
+    return _playlist_page(list(islice(entries, size)), size)
+
+
+def _close_worker_instances():
+    with _worker_instances_lock:
+        instances = list(_worker_instances)
+        _worker_instances.clear()
+    for ydl in instances:
+        try:
+            ydl.close()  # cookiefile이 있으면 여기서 쿠키가 저장됩니다.
+        except Exception as e:
+            logger.warning("[extractor] Failed to close YoutubeDL instance: %s", e)
+
+
+# --- 이벤트 루프 측 코드 ---
+
+class ExtractionEngine:
+    """yt-dlp 추출 전용 워커 풀
+
+    기본 executor와 분리된 고정 크기 풀에서 추출을 실행하고, 워커가 모두 바쁘면
+    요청을 대기시키며(backpressure) 대기열이 max_waiting을 넘으면 ExtractionQueueFull을 발생시킵니다.
+    모든 추출은 실행 전에 youtube_scheduler에서 우선순위에 맞춰 토큰을 받습니다.
+    """
+    def __init__(self, workers=EXTRACT_WORKERS, mode=EXTRACT_MODE, max_waiting=EXTRACT_MAX_WAITING, latency_window=256):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown extraction mode: {mode}")
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.max_waiting = max_waiting
+        self._executor = None
+        self._slots = None
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=latency_window)  # (profile, wait_s, run_s)
+
+    def _ensure_started(self):
+        if self._executor is not None:
+            return
+        if self.mode == "process":
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_process_worker)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="ytdl-worker", initializer=_warm_worker
+            )
+        self._slots = asyncio.Semaphore(self.workers)
+        logger.info("[extractor] Started %s %s workers", self.workers, self.mode)
+
+    async def extract(self, profile, url, priority=PRIORITY_INTERACTIVE, site=None):
+        """워커에서 extract_info(url)를 실행하고 info 딕셔너리를 반환합니다.
+
+        토큰을 기다리는 동안에는 youtube_scheduler.boost((profile, url), ...)로 우선순위를 올릴 수 있습니다.
+        site는 지표에서 호출 위치를 구분하는 이름입니다. (없으면 profile)
+        """
+        if profile not in YDL_PROFILES:
+            raise ValueError(f"Unknown extraction profile: {profile}")
+        return await self._submit(
+            priority, (profile, url), profile, _run_extract, profile, url, self.mode == "process", site=site
+        )
+
+    async def iter_playlist(self, url, priority=PRIORITY_INTERACTIVE, background_priority=PRIORITY_PREFETCH):
+        """재생목록 항목({'id', 'title'})을 페이지 단위 리스트로 하나씩 내보내는 async generator
+
+        첫 페이지(PLAYLIST_FIRST_PAGE_SIZE)는 priority로, 이후 페이지는 background_priority로 토큰을 받습니다.
+        호출자가 다음 페이지를 요청할 때만 가져오므로, 소비를 멈추면 추출도 멈춥니다.
+        """
+        size, page_priority = PLAYLIST_FIRST_PAGE_SIZE, priority
+        if self.mode == "thread":
+            entries = await self._submit(priority, ('playlist', url), 'playlist', _run_open_playlist, url)
+            fetch = lambda: self._submit(page_priority, None, 'playlist', _run_next_page, entries, size, site='playlist_page')
+        else:
+            # 프로세스 모드에서는 iterator를 넘길 수 없으므로 playlist_items로 범위를 나눠 요청합니다.
+            start = 1
+            async def fetch():
+                info = await self._submit(
+                    page_priority, None, 'playlist', _run_extract, 'playlist', url, True,
+                    {'playlist_items': f'{start}-{start + size - 1}'}, site='playlist_page',
+                )
+                return _playlist_page(list(info.get('entries') or ()), size)
+        while True:
+            try:
+                page, last = await fetch()
+            except RequestDropped:
+                # 백그라운드 페이지는 토큰이 밀리면 버려지므로 잠시 뒤 다시 요청합니다.
+                await asyncio.sleep(1.0)
+                continue
+            if page:
+                yield page
+            if last:
+                return
+            if self.mode != "thread":
+                start += size
+            size, page_priority = PLAYLIST_PAGE_SIZE, background_priority
+
+    def _check_backpressure(self):
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise ExtractionQueueFull(f"{self.waiting} extraction requests already waiting")
+
+    async def _submit(self, priority, key, profile, fn, *args, site=None):
+        """토큰과 워커 슬롯을 얻은 뒤 fn(*args)를 워커에서 실행하고 그 결과를 반환합니다."""
+        self._ensure_started()
+        site = site or profile
+        submitted = time.monotonic()
+        # 대기열이 가득 차 거절할 요청이 토큰을 쓰지 않도록 토큰을 받기 전에 먼저 확인합니다.
+        self._check_backpressure()
+        await youtube_scheduler.acquire(priority, key=key)
+        try:
+            # 토큰을 기다리는 동안 대기열이 찼을 수 있습니다. 이때는 받은 토큰을 돌려줍니다.
+            self._check_backpressure()
+        except ExtractionQueueFull:
+            youtube_scheduler.refund(priority)
+            raise
+        # shutdown()이 _slots를 비워도 받은 슬롯은 같은 세마포어에 돌려줍니다.
+        slots = self._slots
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+        wait_s = time.monotonic() - queued_at
+        EXTRACT_SECONDS.observe(time.monotonic() - submitted, site=site, phase='wait')
+        self.active += 1
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            result = await loop.run_in_executor(self._executor, fn, *args)
+            self.completed += 1
+            self._latencies.append((profile, wait_s, time.monotonic() - started))
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            EXTRACT_SECONDS.observe(time.monotonic() - started, site=site, phase='run')
+            self.active -= 1
+            slots.release()
+
+    def stats(self):
+        run_times = sorted(run_s for _, _, run_s in self._latencies)
+        wait_times = [wait_s for _, wait_s, _ in self._latencies]
+
+        def percentile(values, pct):
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, int(len(values) * pct))]
+
+        by_profile = {}
+        for profile, _, run_s in self._latencies:
+            count, total = by_profile.get(profile, (0, 0.0))
+            by_profile[profile] = (count + 1, total + run_s)
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'queue_depth': self.waiting,
+            'active': self.active,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'latency_p50': percentile(run_times, 0.50),
+            'latency_p95': percentile(run_times, 0.95),
+            'latency_max': run_times[-1] if run_times else 0.0,
+            'wait_avg': (sum(wait_times) / len(wait_times)) if wait_times else 0.0,
+            'latency_avg_by_profile': {p: total / count for p, (count, total) in by_profile.items()},
+        }
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        # 진행 중인 추출이 끝나기를 기다립니다. 프로세스 모드에서는 각 워커가 종료하면서 쿠키를 저장합니다.
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.mode == "thread":
+            # 스레드 모드에서는 같은 프로세스에 남은 인스턴스를 닫아 쿠키를 저장합니다.
+            _close_worker_instances()
+        self._executor = None
+        self._slots = None
+
+
+# 프로세스 전역 추출 엔진
+extraction_engine = ExtractionEngine()
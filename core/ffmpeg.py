@@ -0,0 +1,122 @@
+import os
+import shlex
+
+# 네트워크 스트림이 끊겼을 때 다시 연결하기 위한 입력 옵션
+RECONNECT_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+# 포맷 정보를 모를 때 사용하는 전체 프로브
+FULL_PROBE_OPTIONS = '-analyzeduration 8M -probesize 32M'
+# 컨테이너를 지정했을 때 사용하는 최소 프로브. 코덱 파라미터는 컨테이너 헤더에서 바로 읽습니다.
+FAST_PROBE_OPTIONS = '-analyzeduration 0 -probesize 128K -fflags +nobuffer'
+# 라우드니스 측정값이 없을 때 쓰는 동적(1-pass) 노멀라이즈. CPU 비용이 큽니다.
+LOUDNORM_FILTER = 'loudnorm=I=-16:TP=-1.5:LRA=11'
+GAIN_EPSILON_DB = 0.5  # 이보다 작은 보정은 필터 없이 재생합니다.
+
+FFMPEG_FAST_START = os.getenv('FFMPEG_FAST_START', '1') == '1'
+# Opus 포맷을 디코딩/재인코딩 없이 그대로 Discord로 보냅니다.
+OPUS_PASSTHROUGH = os.getenv('OPUS_PASSTHROUGH', '1') == '1'
+
+# 재생 FFmpeg가 받은 원본 오디오를 재인코딩 없이(-c:a copy) 함께 저장할 때의 출력: demuxer → (파일 확장자, 출력 옵션)
+CAPTURE_FORMATS = {
+    'webm': ('webm', '-f webm'),
+    'mp4': ('m4a', '-f mp4 -movflags +faststart'),
+}
+# py-cord가 입력 바로 뒤에 넣는 출력 옵션. 저장 출력을 재생 출력보다 앞에 두면 저장 출력에 적용되므로
+# 재생 출력(pipe:1)에는 다시 지정합니다.
+PCM_OUTPUT_OPTIONS = '-f s16le -ar 48000 -ac 2'
+OPUS_OUTPUT_OPTIONS = '-map_metadata -1 -f opus -c:a copy -ar 48000 -ac 2'
+
+# yt-dlp의 ext/container 값 → FFmpeg 입력 demuxer 이름
+_DEMUXERS = {
+    'm4a': 'mp4',
+    'm4a_dash': 'mp4',
+    'mp4': 'mp4',
+    'mp4_dash': 'mp4',
+    'webm': 'webm',
+    'webm_dash': 'webm',
+}
+# 컨테이너만 알고 코덱을 모르면 헤더만으로 디코더를 고를 수 없으므로 이 코덱들만 fast-start를 허용합니다.
+_FAST_START_CODECS = ('mp4a', 'aac', 'opus', 'vorbis')
+
+
+def is_local_input(url):
+    """로컬 파일 경로(디스크 캐시)면 True. 로컬 파일에는 네트워크 재연결 옵션을 붙이지 않습니다."""
+    return bool(url) and not url.startswith(('http://', 'https://'))
+
+
+def input_demuxer(stream_format):
+    """yt-dlp 포맷 정보에서 FFmpeg demuxer 이름을 구합니다. 알 수 없으면 None."""
+    if not stream_format:
+        return None
+    acodec = (stream_format.get('acodec') or '').lower()
+    if not acodec.startswith(_FAST_START_CODECS):
+        return None
+    return _DEMUXERS.get(stream_format.get('container') or '') or _DEMUXERS.get(stream_format.get('ext') or '')
+
+
+def is_opus_format(stream_format):
+    """Discord에 그대로 보낼 수 있는 Opus(webm, 48kHz) 포맷이면 True."""
+    if not stream_format:
+        return False
+    acodec = (stream_format.get('acodec') or '').lower()
+    return (
+        acodec.startswith('opus')
+        and input_demuxer(stream_format) == 'webm'
+        and stream_format.get('asr') in (None, 48000)
+    )
+
+
+def format_sort_key(stream_format):
+    """prepare_track(core/loader.py)에서 포맷을 고를 때 쓰는 정렬 키. (passthrough 가능한 Opus 우선, 그 다음 비트레이트)"""
+    return (OPUS_PASSTHROUGH and is_opus_format(stream_format), stream_format.get('abr') or 0)
+
+
+def can_passthrough(stream_format, gain_db, normalize=True):
+    """볼륨 보정 없이 Opus 패킷을 그대로 보낼 수 있으면 True.
+
+    normalize가 켜져 있으면 측정값이 있고(gain_db가 None이 아님) 보정이 필요 없을 때만 허용합니다.
+    """
+    if not OPUS_PASSTHROUGH or not is_opus_format(stream_format):
+        return False
+    return not normalize or audio_filter(gain_db) is None
+
+
+def audio_filter(gain_db=None):
+    """볼륨 보정 필터 문자열. gain_db가 None이면 동적 loudnorm, 보정이 필요 없으면 None."""
+    if gain_db is None:
+        return LOUDNORM_FILTER
+    if abs(gain_db) < GAIN_EPSILON_DB:
+        return None
+    return f'volume={gain_db:.2f}dB'
+
+
+def build_ffmpeg_options(stream_format=None, fast_start=FFMPEG_FAST_START, gain_db=None, normalize=True, local=False,
+                         capture=None, passthrough=False):
+    """FFmpegPCMAudio에 넘길 before_options/options를 만듭니다.
+
+    fast_start가 켜져 있고 포맷 정보(컨테이너/코덱)를 알면 demuxer를 지정하고 프로브를 최소화해
+    첫 오디오까지의 시간을 줄입니다. 정보가 없으면 기존처럼 전체 프로브를 사용합니다.
+    gain_db(미리 측정한 라우드니스로 계산한 고정 게인)가 있으면 loudnorm 대신 volume 필터를 씁니다.
+    normalize가 꺼져 있으면 볼륨 보정 필터를 붙이지 않습니다.
+    local이 True(디스크 캐시 파일)면 재연결 옵션을 빼고 입력합니다.
+    capture(AudioCapture)가 있으면 원본 오디오를 capture.path에도 저장합니다. 저장 출력을 재생 출력보다 먼저 두므로
+    FFmpeg가 재생 출력(pipe:1)을 닫을 때는 저장 파일도 이미 완성되어 있습니다. passthrough는 재생 출력이
+    Opus(FFmpegOpusAudio)인지 알려 줍니다.
+    """
+    demuxer = input_demuxer(stream_format) if fast_start else None
+    input_options = '' if local else f'{RECONNECT_OPTIONS} '
+    if demuxer:
+        before_options = f'{input_options}{FAST_PROBE_OPTIONS} -f {demuxer}'
+    else:
+        before_options = f'{input_options}{FULL_PROBE_OPTIONS}'
+    filter_str = audio_filter(gain_db) if normalize else None
+    options = f'-vn -af {filter_str}' if filter_str else '-vn'
+    if capture is not None:
+        _, capture_options = CAPTURE_FORMATS[capture.demuxer]
+        # passthrough면 py-cord가 넣은 -c:a copy가 저장 출력에 이미 적용됩니다.
+        copy = '' if passthrough else '-c:a copy '
+        output_options = OPUS_OUTPUT_OPTIONS if passthrough else PCM_OUTPUT_OPTIONS
+        options = f'-y -map 0:a:0 {copy}{capture_options} {shlex.quote(capture.path)} {output_options} {options}'
+    return {
+        'before_options': before_options,
+        'options': options,
+    }
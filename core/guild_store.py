@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.logs import log_future_error
+
+logger = logging.getLogger(__name__)
+
+GUILD_STATE_PATH = os.getenv('GUILD_STATE_PATH', './data/guilds.sqlite3')  # 비어 있으면 저장하지 않습니다.
+GUILD_STATE_FLUSH_DELAY = 2.0  # 변경 후 이 시간(초) 동안 모인 변경을 한 번에 씁니다.
+# 재시작 후 음성 채널에 다시 들어가 재생을 이어 갈 길드: 이 시간(초) 안에 재생 중이던 길드만
+GUILD_RESUME_MAX_AGE = 600
+GUILD_RESUME_STAGGER = 2.0  # 길드마다 재생을 이어 가는 간격(초). 추출 요청이 한꺼번에 몰리지 않도록 합니다.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_state (
+    guild_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    voice_channel_id INTEGER,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class GuildStateStore:
+    """길드별 대기열과 설정을 SQLite에 저장해 재시작 후 복구합니다.
+
+    mark_dirty()는 저장할 길드만 표시하고 바로 반환합니다. flush_delay초 뒤 이벤트 루프에서 스냅샷을 만든 뒤
+    모인 길드를 전용 스레드에서 한 트랜잭션으로 씁니다. 복구는 길드 상태를 처음 만들 때 load()로 길드별로 합니다.
+    저장할 값은 snapshot 함수가 dict로 만들어 반환합니다. (GuildState의 구조는 MusicCog가 압니다)
+    """
+    def __init__(self, path=GUILD_STATE_PATH, flush_delay=GUILD_STATE_FLUSH_DELAY):
+        self.path = path
+        self.enabled = bool(path)
+        self.flush_delay = flush_delay
+        self._dirty = {}  # {guild_id: snapshot()}
+        self._flush_handle = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._executor = None
+        self.batches = 0
+        self.rows_written = 0
+        self.last_batch_ms = None
+        self.restored = 0
+        if self.enabled:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # 이벤트 루프(load)와 쓰기 스레드가 함께 쓰므로 잠금으로 보호합니다.
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(_SCHEMA)
+            # 쓰기 순서가 바뀌지 않도록 스레드 하나에서만 씁니다.
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='guild-store')
+
+    def mark_dirty(self, guild_id, snapshot):
+        """길드 상태가 바뀌었음을 알립니다. 이벤트 루프에서 호출합니다."""
+        if not self.enabled:
+            return
+        self._dirty[guild_id] = snapshot
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._flush_soon)
+
+    async def load(self, guild_id):
+        """저장된 길드 상태(dict)를 반환합니다. 없으면 None."""
+        if not self.enabled:
+            return None
+        snapshot = self._dirty.get(guild_id)
+        if snapshot is not None:
+            # 아직 쓰지 않은 변경이 있으면 그 값이 최신입니다.
+            return snapshot()
+        def query():
+            with self._lock:
+                return self._conn.execute('SELECT data FROM guild_state WHERE guild_id = ?', (guild_id,)).fetchone()
+        try:
+            row = await asyncio.get_running_loop().run_in_executor(self._executor, query)
+            if row is None:
+                return None
+            self.restored += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("[guild_store] Ignoring unreadable state for guild %s: %s", guild_id, e)
+            return None
+
+    async def resumable_guilds(self, max_age=GUILD_RESUME_MAX_AGE):
+        """최근 max_age초 안에 음성 채널에서 재생 중이던 (guild_id, voice_channel_id) 목록"""
+        if not self.enabled:
+            return []
+        def query():
+            with self._lock:
+                return self._conn.execute(
+                    'SELECT guild_id, voice_channel_id FROM guild_state '
+                    'WHERE voice_channel_id IS NOT NULL AND updated_at >= ? ORDER BY updated_at DESC',
+                    (time.time() - max_age,),
+                ).fetchall()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, query)
+        except sqlite3.Error as e:
+            logger.warning("[guild_store] Failed to list resumable guilds: %s", e)
+            return []
+
+    def _take_snapshots(self):
+        dirty, self._dirty = self._dirty, {}
+        rows = []
+        for guild_id, snapshot in dirty.items():
+            try:
+                rows.append((guild_id, snapshot()))
+            except Exception as e:
+                logger.error("[guild_store] Failed to snapshot guild %s: %s", guild_id, e, exc_info=True)
+        return rows
+
+    def _flush_soon(self):
+        self._flush_handle = None
+        rows = self._take_snapshots()
+        if rows:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._write, rows)
+            future.add_done_callback(log_future_error(logger, "[guild_store] Failed to save guild state"))
+
+    def _write(self, rows):
+        started = time.perf_counter()
+        now = time.time()
+        params = [
+            (guild_id, json.dumps(data, ensure_ascii=False), data.get('voice_channel_id'), now)
+            for guild_id, data in rows
+        ]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO guild_state (guild_id, data, voice_channel_id, updated_at) VALUES (?, ?, ?, ?)',
+                    params,
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        self.batches += 1
+        self.rows_written += len(params)
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        logger.debug("[guild_store] Saved %s guild(s) in %.1fms", len(params), self.last_batch_ms)
+
+    def shutdown(self):
+        """아직 쓰지 않은 변경을 바로 저장합니다."""
+        if not self.enabled:
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        rows = self._take_snapshots()
+        self._executor.shutdown(wait=True)
+        if rows:
+            self._write(rows)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'pending': len(self._dirty),
+            'batches': self.batches,
+            'rows_written': self.rows_written,
+            'last_batch_ms': self.last_batch_ms,
+            'restored': self.restored,
+        }
+
+
+# 프로세스 전역 길드 상태 저장소
+guild_store = GuildStateStore()
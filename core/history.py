@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import math
+import os
+from collections import deque
+
+HISTORY_CAPACITY = int(os.getenv('HISTORY_CAPACITY', '4000'))  # 자동재생이 다시 고르지 않도록 기억할 최근 재생 곡 수 (길드별)
+HISTORY_FALSE_POSITIVE = 0.01  # 듣지 않은 곡을 들었다고 잘못 판단할 확률 (자동재생 후보에서 빠질 뿐)
+HISTORY_RECENT = 20  # 순서까지 정확히 기억하는 최근 곡 수
+
+
+class BloomFilter:
+    """고정 크기 비트 배열 하나로 된 Bloom 필터. 해시가 고정(blake2b)이라 저장했다가 그대로 복원할 수 있습니다."""
+    def __init__(self, bits, hashes, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class PlayedHistory:
+    """길드별 재생 기록: 번갈아 쓰는 Bloom 필터 두 개(rotating Bloom filter)와 최근 곡 ring buffer
+
+    현재 필터에 capacity/2곡이 차면 이전 필터를 버리고 빈 필터로 교체하므로, 항상 최근 capacity/2~capacity곡을
+    고정된 크기(capacity 4000, 오탐 1%일 때 약 5.6KB)로 기억합니다. 추가와 확인은 곡 수와 관계없이 O(1)입니다.
+    """
+    def __init__(self, capacity=HISTORY_CAPACITY, false_positive=HISTORY_FALSE_POSITIVE, recent=HISTORY_RECENT):
+        self.generation_size = max(1, capacity // 2)
+        # 필터 두 개를 모두 확인하므로, 필터 하나당 generation_size곡에서 오탐 확률이 false_positive/2가 되도록
+        # (비트 수 m, 해시 수 k)를 정합니다.
+        self.bits = max(8, math.ceil(-self.generation_size * math.log(false_positive / 2) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.bits / self.generation_size * math.log(2)))
+        self.current = BloomFilter(self.bits, self.num_hashes)
+        self.previous = BloomFilter(self.bits, self.num_hashes)
+        self.recent = deque(maxlen=recent)
+
+    def append(self, video_id):
+        if self.current.count >= self.generation_size:
+            self.previous = self.current
+            self.current = BloomFilter(self.bits, self.num_hashes)
+        self.current.add(video_id)
+        self.recent.append(video_id)
+
+    def __contains__(self, video_id):
+        return video_id in self.current or video_id in self.previous
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __len__(self):
+        return self.current.count + self.previous.count
+
+    @property
+    def nbytes(self):
+        return len(self.current.data) + len(self.previous.data)
+
+    def to_record(self):
+        """길드 상태 저장용 dict (필터는 base64)"""
+        return {
+            'bits': self.bits,
+            'hashes': self.num_hashes,
+            'filters': [
+                [base64.b64encode(bloom.data).decode('ascii'), bloom.count] for bloom in (self.current, self.previous)
+            ],
+            'recent': list(self.recent),
+        }
+
+    def restore(self, record):
+        """to_record()로 저장한 기록을 불러옵니다. 예전 형식(최근 곡 id 목록)도 받습니다.
+
+        필터 크기 설정이 바뀌었으면 필터는 버리고 최근 곡만 다시 넣습니다.
+        """
+        if isinstance(record, list):
+            for video_id in record:
+                self.append(video_id)
+            return
+        if record.get('bits') == self.bits and record.get('hashes') == self.num_hashes:
+            filters = []
+            for data, count in record.get('filters', []):
+                bloom = BloomFilter(self.bits, self.num_hashes, base64.b64decode(data))
+                bloom.count = count
+                filters.append(bloom)
+            if len(filters) == 2:
+                self.current, self.previous = filters
+            self.recent.extend(record.get('recent', []))
+        else:
+            for video_id in record.get('recent', []):
+                self.append(video_id)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+
+import discord
+
+from core.audio import PrimedSource
+from core.disk_cache import audio_disk_cache
+from core.extractor import extraction_engine
+from core.ffmpeg import build_ffmpeg_options, can_passthrough, format_sort_key, is_local_input
+from core.loudness import loudness_analyzer, loudness_cache, static_gain_db
+from core.prefetch import PREFETCH_REFRESH_MARGIN
+from core.scheduler import youtube_scheduler, PRIORITY_INTERACTIVE
+from core.singleflight import extraction_flight
+from core.stream_cache import stream_cache
+
+logger = logging.getLogger(__name__)
+
+# 스트림 캐시에 보관할 포맷 필드
+STREAM_CACHE_FIELDS = ('url', 'format_id', 'ext', 'acodec', 'abr', 'asr', 'audio_channels', 'container', 'protocol')
+
+
+async def extract_info(profile, url, priority=PRIORITY_INTERACTIVE, site=None):
+    """추출 워커 풀에서 yt-dlp 추출을 실행합니다. 같은 (profile, url)의 요청이 진행 중이면 그 결과를 공유합니다."""
+    key = (profile, url)
+    # 미리 준비(prefetch) 중인 요청에 합류하는 경우, 토큰 대기 순서를 현재 요청의 우선순위로 올립니다.
+    youtube_scheduler.boost(key, priority)
+    return await extraction_flight.do(key, lambda: extraction_engine.extract(profile, url, priority, site))
+
+
+async def prepare_track(song, priority=PRIORITY_INTERACTIVE) -> bool:
+    """곡의 스트림 URL과 포맷을 준비합니다. 디스크 캐시, 스트림 캐시, yt-dlp 추출 순으로 찾고 실패하면 False."""
+    if song.prepared:
+        return True
+    video_id = song.video_id
+    # 디스크에 받아 둔 곡이면 추출 없이 로컬 파일을 재생합니다.
+    local = audio_disk_cache.lookup(video_id)
+    if local:
+        song.stream_url = local['path']
+        song.stream_format = local['format']
+        song.duration = local['duration']
+        song.prepared = True
+        loudness_analyzer.request(video_id, local['path'])
+        logger.info("[prepare_song] Disk cache hit for: %s", song.title)
+        return True
+    cached = await stream_cache.get_async(video_id, min_ttl=PREFETCH_REFRESH_MARGIN) if video_id else None
+    if cached:
+        song.stream_url = cached['url']
+        song.stream_format = cached
+        song.duration = cached.get('duration')
+        song.prepared = True
+        logger.info("[prepare_song] Cache hit for: %s (Format: %s)", song.title, cached.get('format_id'))
+        return True
+    logger.info("[prepare_song] Starting for: %s", song.title)
+    try:
+        site = 'prepare' if priority == PRIORITY_INTERACTIVE else 'prefetch'
+        info = await extract_info('stream', song.webpage_url, priority, site)
+        filtered_formats = [f for f in info.get('formats', []) if f.get('acodec') != 'none' and f.get('url') and 'hls' not in f.get('protocol', '')]
+        if not filtered_formats:
+            logger.error("[prepare_song] No suitable non-HLS audio stream found for: %s", song.title)
+            song.prepared = False
+            return False
+        filtered_formats.sort(key=format_sort_key, reverse=True)
+        best_format = filtered_formats[0]
+        stream_entry = {key: best_format.get(key) for key in STREAM_CACHE_FIELDS}
+        stream_entry['duration'] = info.get('duration')
+        song.stream_url = best_format['url']
+        song.stream_format = stream_entry
+        if song.title == 'Unknown Title': song.title = info.get('title') or song.title
+        song.duration = stream_entry['duration']
+        song.prepared = True
+        if video_id: stream_cache.put(video_id, stream_entry)
+        logger.info("[prepare_song] Success for: %s (Format: %s)", song.title, best_format.get('format_id'))
+        return True
+    except Exception as e:
+        logger.error("[prepare_song] Failed for %s: %s", song.title, e)
+        song.prepared = False
+        return False
+
+
+async def open_track(song, normalize=True):
+    """FFmpeg 소스를 열고 첫 프레임까지 미리 읽어 둡니다. 실패하면 None.
+
+    포맷 정보로 프로브를 건너뛰는 fast-start가 실패하면 전체 프로브로 한 번 더 시도합니다.
+    Opus 포맷이고 볼륨 보정이 필요 없으면 FFmpegOpusAudio로 패킷을 그대로 보냅니다(passthrough).
+    """
+    stream_format = song.stream_format
+    video_id = song.video_id
+    # 측정된 라우드니스가 있으면 동적 loudnorm 대신 고정 게인만 적용합니다.
+    measurement = await loudness_cache.get_async(video_id) if video_id else None
+    gain_db = static_gain_db(measurement) if measurement else None
+    passthrough = can_passthrough(stream_format, gain_db, normalize)
+    local = is_local_input(song.stream_url)
+    # 디스크 캐시에 없거나 라우드니스를 아직 모르는 곡은 재생하면서 원본 오디오를 함께 저장합니다. (따로 내려받지 않음)
+    measure = measurement is None and loudness_analyzer.wants(video_id)
+    capture = audio_disk_cache.start_capture(video_id, song.stream_url, stream_format, song.duration, measure=measure)
+    option_args = dict(gain_db=gain_db, normalize=normalize, local=local, capture=capture, passthrough=passthrough)
+    attempts = [build_ffmpeg_options(stream_format, **option_args)]
+    full_probe = build_ffmpeg_options(stream_format, fast_start=False, **option_args)
+    if full_probe != attempts[0]:
+        attempts.append(full_probe)
+    loop = asyncio.get_running_loop()
+    def on_cleanup(played_seconds, ended):
+        # 음성 플레이어 스레드에서 호출될 수 있으므로 이벤트 루프로 넘깁니다.
+        asyncio.run_coroutine_threadsafe(_finish_capture(capture, ended and capture.is_complete(played_seconds)), loop)
+    def open_and_prime():
+        for i, ffmpeg_opts in enumerate(attempts):
+            if passthrough:
+                audio = discord.FFmpegOpusAudio(song.stream_url, codec='opus', **ffmpeg_opts) # py-cord는 codec이 'opus'일 때만 -c:a copy로 전송합니다.
+            else:
+                audio = discord.FFmpegPCMAudio(song.stream_url, **ffmpeg_opts)
+            source = PrimedSource(audio, song)
+            if source.prime():
+                logger.info("[open_source] Opened %s (%s)", song.title, 'opus passthrough' if passthrough else 'pcm transcode')
+                if capture is not None: source.on_cleanup = on_cleanup
+                return source
+            source.cleanup()
+            if i + 1 < len(attempts):
+                logger.warning("[open_source] Fast-start failed for %s. Retrying with full probe.", song.title)
+        return None
+    future = loop.run_in_executor(None, open_and_prime)
+    try:
+        source = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # 재생 작업이 취소되어도 executor에서 열린 FFmpeg 프로세스와 저장 파일은 정리합니다.
+        def cleanup_opened(future):
+            opened = None if future.cancelled() or future.exception() else future.result()
+            if opened is not None: opened.cleanup()
+            elif capture is not None: loop.create_task(_finish_capture(capture, False))
+        future.add_done_callback(cleanup_opened)
+        raise
+    except Exception as e:
+        logger.error("[open_source] Failed to open FFmpeg source for %s: %s", song.title, e)
+        source = None
+    if source is None:
+        if capture is not None: await _finish_capture(capture, False)
+        if local: audio_disk_cache.discard(video_id)
+        elif video_id: stream_cache.invalidate(video_id)
+        song.prepared = False
+    return source
+
+
+async def _finish_capture(capture, complete):
+    """재생 FFmpeg가 함께 저장한 파일을 끝까지 받았으면 디스크 캐시에 넣고 라우드니스를 측정합니다. 아니면 지웁니다."""
+    path = await audio_disk_cache.finish_capture(capture, complete)
+    if path:
+        # 캐시에 넣지 않는 측정용 임시 파일은 측정이 끝나면 지웁니다.
+        loudness_analyzer.request(capture.video_id, path, discard=not capture.keep)
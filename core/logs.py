@@ -0,0 +1,193 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # "text" 또는 "json"
+LOG_FILE = os.getenv('LOG_FILE', '')  # 비어 있으면 stderr로만 출력합니다.
+# 모듈별 레벨. 예: "core.prefetch=DEBUG,discord=WARNING"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# 자주 찍히는 로그의 INFO/DEBUG 기록 비율. 예: "core.audio=0.1,core.prefetch=0.25" (WARNING 이상은 항상 남김)
+LOG_SAMPLE = os.getenv('LOG_SAMPLE', '')
+LOG_QUEUE_SIZE = 10000  # 쓰기 스레드가 밀리면 이 이상은 버립니다. (호출한 쪽이 기다리지 않도록)
+LOG_FILE_MAX_BYTES = 20 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+DEFAULT_LEVELS = {'discord': 'WARNING', 'discord.http': 'WARNING', 'yt_dlp': 'WARNING'}
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s: %(message)s%(context)s'
+
+# 지금 처리 중인 길드와 명령어. 명령어 안에서 만든 작업(create_task)에도 그대로 이어집니다.
+_log_context = contextvars.ContextVar('log_context', default={})
+_listener = None
+
+
+def set_log_context(**fields):
+    """현재 작업의 로그에 붙일 필드(guild, command 등)를 설정합니다."""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+def _parse_pairs(spec):
+    pairs = {}
+    for item in spec.split(','):
+        name, sep, value = item.partition('=')
+        if sep and name.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def _match_prefix(name, table):
+    """name에 가장 길게 맞는 로거 이름 접두사의 값. 없으면 None."""
+    while name:
+        if name in table:
+            return table[name]
+        name = name.rpartition('.')[0]
+    return table.get('')
+
+
+class ContextFilter(logging.Filter):
+    """레코드에 현재 로그 컨텍스트(guild, command)를 붙입니다. 호출한 스레드/작업에서 실행되어야 합니다."""
+    def filter(self, record):
+        context = _log_context.get()
+        record.guild = context.get('guild')
+        record.command = context.get('command')
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """로거별 비율에 따라 INFO 이하 레코드 일부만 남깁니다. 남긴 레코드에는 sample_rate를 기록합니다."""
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates  # {로거 이름 접두사: 0~1}
+
+    def filter(self, record):
+        rate = _match_prefix(record.name, self.rates) if record.levelno < logging.WARNING else None
+        if rate is None or rate >= 1.0:
+            record.sample_rate = 1.0
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 기다리지 않고 레코드를 버리는 QueueHandler"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 인자와 예외는 호출한 쪽에서 문자열로 만들어 둡니다. (나중에 값이 바뀌거나 프레임을 붙잡지 않도록)
+        # 기본 구현과 달리 메시지에 예외를 합치지 않아 JSON 출력에서 exc 필드로 따로 남습니다.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = [f'{key}={value}' for key in ('guild', 'command') if (value := getattr(record, key, None)) is not None]
+        record.context = f" ({' '.join(fields)})" if fields else ''
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 객체로 출력합니다."""
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key in ('guild', 'command'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        sample_rate = getattr(record, 'sample_rate', 1.0)
+        if sample_rate < 1.0:
+            entry['sample_rate'] = sample_rate
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, log_file=LOG_FILE, levels=LOG_LEVELS, sample=LOG_SAMPLE):
+    """로그를 큐에 넣기만 하고 실제 출력은 백그라운드 스레드(QueueListener)가 하도록 설정합니다.
+
+    이벤트 루프나 음성 플레이어 스레드가 stderr/파일 쓰기 때문에 멈추지 않게 합니다.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    formatter = JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT)
+    output_handlers = [logging.StreamHandler()]
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        output_handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8'
+        ))
+    for handler in output_handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    sampling = {name: float(rate) for name, rate in _parse_pairs(sample).items()}
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    for name, module_level in {**DEFAULT_LEVELS, **_parse_pairs(levels)}.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """큐에 남은 로그를 모두 쓰고 쓰기 스레드를 멈춥니다."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    """큐가 가득 차서 버린 로그 수"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            return handler.dropped
+    return 0
+
+
+def log_future_error(logger, message):
+    """executor 작업이 실패하면 "message: 예외"를 ERROR로 남기는 add_done_callback용 콜백을 만듭니다."""
+    def callback(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("%s: %s", message, future.exception())
+    return callback
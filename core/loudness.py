@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from core.disk_cache import remove_file
+from core.ffmpeg import is_local_input
+from core.logs import log_future_error
+from core.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+LOUDNESS_CACHE_PATH = os.getenv('LOUDNESS_CACHE_PATH', './data/loudness.json')
+LOUDNESS_ANALYSIS_WORKERS = int(os.getenv('LOUDNESS_ANALYSIS_WORKERS', '1'))
+LOUDNESS_CACHE_SIZE = 20000
+LOUDNESS_MAX_PENDING = 64
+# 긴 곡은 앞부분만 측정합니다. (초)
+LOUDNESS_ANALYSIS_SECONDS = 600
+
+TARGET_I = -16.0
+TARGET_TP = -1.5
+MAX_GAIN_DB = 12.0
+
+_JSON_BLOCK_RE = re.compile(r"\{[^{}]*\"input_i\"[^{}]*\}", re.S)
+
+
+def static_gain_db(measurement):
+    """측정값으로 목표 라우드니스(TARGET_I)에 맞추는 고정 게인(dB)을 계산합니다.
+
+    트루 피크가 TARGET_TP를 넘지 않도록 게인을 제한합니다.
+    """
+    gain = TARGET_I - measurement['input_i']
+    gain = min(gain, TARGET_TP - measurement['input_tp'])
+    return max(-MAX_GAIN_DB, min(MAX_GAIN_DB, gain))
+
+
+class LoudnessCache:
+    """video id → 라우드니스 측정값을 저장하는 영구 캐시 (JSON 파일)
+
+    변경 사항은 바로 쓰지 않고 모아서 flush()에서 원자적으로(임시 파일 + os.replace) 저장합니다.
+    backend(SharedStore)가 있으면 다른 샤드가 측정한 값도 찾아 쓰고, 새 측정값을 함께 기록합니다.
+    """
+    def __init__(self, path=LOUDNESS_CACHE_PATH, max_entries=LOUDNESS_CACHE_SIZE, backend=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries.update(data)
+            logger.info("[loudness] Loaded %s measurements from %s", len(self._entries), self.path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("[loudness] Ignoring unreadable loudness cache %s: %s", self.path, e)
+
+    def __contains__(self, video_id):
+        """로컬에 측정값이 있는지 (공유 저장소는 찾아보지 않음)"""
+        with self._lock:
+            return video_id in self._entries
+
+    def get(self, video_id):
+        """로컬 측정값을 반환합니다. 없으면 None."""
+        with self._lock:
+            measurement = self._entries.get(video_id)
+        return self._count(measurement)
+
+    async def get_async(self, video_id):
+        """get()과 같지만 로컬에 없으면 공유 저장소(backend)를 executor에서 찾아봅니다."""
+        with self._lock:
+            measurement = self._entries.get(video_id)
+        if measurement is None and self.backend is not None:
+            measurement = await self.backend.get_async('loudness', video_id)
+            if measurement is not None:
+                self._store(video_id, measurement)
+        return self._count(measurement)
+
+    def _count(self, measurement):
+        with self._lock:
+            if measurement is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return measurement
+
+    def put(self, video_id, measurement):
+        self._store(video_id, measurement)
+        if self.backend is not None:
+            self.backend.put('loudness', video_id, measurement)
+
+    def _store(self, video_id, measurement):
+        with self._lock:
+            self._entries[video_id] = measurement
+            self._entries.move_to_end(video_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def flush(self):
+        """변경 사항이 있으면 파일에 저장합니다. 블로킹 I/O이므로 executor에서 호출하세요."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.loudness-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class LoudnessAnalyzer:
+    """곡의 라우드니스를 백그라운드에서 한 번만 측정합니다.
+
+    스트림을 다시 받지 않도록 디스크 캐시 파일이나 재생 중 함께 저장한 파일(로컬 파일)만 측정합니다.
+    FFmpeg loudnorm 필터의 측정 모드(print_format=json)를 별도 프로세스로 실행하며,
+    동시에 실행되는 분석 수는 workers로 제한하고 대기 중인 요청이 너무 많으면 새 요청은 버립니다.
+    """
+    def __init__(self, cache, workers=LOUDNESS_ANALYSIS_WORKERS, max_pending=LOUDNESS_MAX_PENDING, flush_delay=10.0):
+        self.cache = cache
+        self.max_pending = max_pending
+        self.flush_delay = flush_delay
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self._pending = {}  # {video_id: asyncio.Task}
+        self._flush_handle = None
+        self.analyzed = 0
+        self.failed = 0
+
+    def wants(self, video_id):
+        """아직 측정값이 없고 측정 중도 아닌 곡인지 (재생하면서 측정용 파일을 저장할지 정할 때 씁니다.)"""
+        return bool(video_id) and video_id not in self._pending and video_id not in self.cache
+
+    def request(self, video_id, path, discard=False):
+        """측정값이 없으면 로컬 파일 path의 분석을 예약합니다. discard=True면 다 쓴 뒤(또는 버릴 때) 파일을 지웁니다."""
+        if not is_local_input(path):
+            raise ValueError(f"loudness analysis needs a local file: {path}")
+        loop = asyncio.get_running_loop()
+        if not self.wants(video_id):
+            pass
+        elif len(self._pending) >= self.max_pending:
+            logger.debug("[loudness] Analysis queue full. Skipping %s", video_id)
+        else:
+            self._pending[video_id] = loop.create_task(self._analyze(video_id, path, discard))
+            return
+        if discard:
+            loop.run_in_executor(None, remove_file, path)
+
+    async def _analyze(self, video_id, path, discard):
+        try:
+            async with self._slots:
+                started = time.monotonic()
+                measurement = await measure_loudness(path)
+            measurement['measured_at'] = int(time.time())
+            self.cache.put(video_id, measurement)
+            self.analyzed += 1
+            logger.info(
+                "[loudness] Measured %s: I=%s LUFS TP=%s dBTP (%.1fs)",
+                video_id, measurement['input_i'], measurement['input_tp'], time.monotonic() - started
+            )
+            self._schedule_flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning("[loudness] Analysis failed for %s: %s", video_id, e)
+        finally:
+            self._pending.pop(video_id, None)
+            if discard:
+                await asyncio.get_running_loop().run_in_executor(None, remove_file, path)
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def flush():
+            self._flush_handle = None
+            future = loop.run_in_executor(None, self.cache.flush)
+            future.add_done_callback(log_future_error(logger, "[loudness] Failed to save loudness cache"))
+
+        self._flush_handle = loop.call_later(self.flush_delay, flush)
+
+    def shutdown(self):
+        for task in self._pending.values():
+            task.cancel()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.cache.flush()
+
+    def stats(self):
+        return {'pending': len(self._pending), 'analyzed': self.analyzed, 'failed': self.failed, **self.cache.stats()}
+
+
+async def measure_loudness(path, max_seconds=LOUDNESS_ANALYSIS_SECONDS):
+    """FFmpeg loudnorm 1차 패스로 로컬 파일 path의 라우드니스를 측정해 딕셔너리로 반환합니다."""
+    args = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-nostats',
+        '-t', str(max_seconds), '-i', path, '-vn',
+        '-af', f'loudnorm=I={TARGET_I}:TP={TARGET_TP}:LRA=11:print_format=json', '-f', 'null', '-',
+    ]
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    match = _JSON_BLOCK_RE.search(stderr.decode('utf-8', 'replace'))
+    if proc.returncode != 0 or not match:
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode} without loudnorm stats")
+    data = json.loads(match.group(0))
+    measurement = {key: float(data[key]) for key in ('input_i', 'input_tp', 'input_lra', 'input_thresh')}
+    if measurement['input_i'] == float('-inf'):
+        raise RuntimeError("track is silent")
+    return measurement
+
+
+# 프로세스 전역 라우드니스 캐시와 분석기 (길드 재생과 라디오가 함께 씀)
+loudness_cache = LoudnessCache(backend=shared_store)
+loudness_analyzer = LoudnessAnalyzer(loudness_cache)
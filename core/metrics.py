@@ -0,0 +1,317 @@
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0이면 지표 엔드포인트를 열지 않습니다.
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+LOOP_LAG_INTERVAL = 0.1  # 이벤트 루프 지연 측정 간격(초). 짧을수록 짧은 블로킹도 놓치지 않습니다.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """Prometheus 히스토그램 하나 (라벨 조합별 버킷 카운트)
+
+    observe()는 음성 플레이어 스레드나 추출 워커 쪽에서도 호출되므로 잠금으로 보호합니다.
+    """
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # {라벨 값 튜플: [버킷별 개수..., +Inf 개수, 합계]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": _format_value(bound)})} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+EXTRACT_SECONDS = Histogram(
+    'musicbot_extract_seconds', 'yt-dlp extraction time by call site (wait = token/worker wait, run = extract_info)',
+    (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32), labelnames=('site', 'phase'),
+)
+PLAY_TO_AUDIO_SECONDS = Histogram(
+    'musicbot_play_to_first_audio_seconds', 'Time from /play to the first audio frame of the requested track',
+    (0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34),
+)
+GAP_SECONDS = Histogram(
+    'musicbot_inter_track_gap_seconds', 'Silence between the last frame of a track and the first frame of the next',
+    (0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1, 2, 5), labelnames=('mode',),
+)
+LOOP_LAG_SECONDS = Histogram(
+    'musicbot_event_loop_lag_seconds', 'How late the event loop ran a timer scheduled every 0.1s',
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+HISTOGRAMS = (EXTRACT_SECONDS, PLAY_TO_AUDIO_SECONDS, GAP_SECONDS, LOOP_LAG_SECONDS)
+
+
+class LoopLagMonitor:
+    """interval초마다 깨어나 예정보다 얼마나 늦게 실행되었는지로 이벤트 루프 지연을 측정합니다.
+
+    deadline(다음에 깨어나야 할 time.monotonic() 시각)과 thread_id는 다른 스레드(core/watchdog.py)가
+    루프가 지금 막혀 있는지 판단하는 데 씁니다.
+    """
+    def __init__(self, interval=LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.deadline = None
+        self.thread_id = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        self.thread_id = threading.get_ident()
+        while True:
+            self.deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self.deadline)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.deadline = None
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+def count_ffmpeg_processes():
+    """이 프로세스가 띄운 FFmpeg 자식 프로세스 수 (재생, 라우드니스 분석, 디스크 캐시). /proc이 없으면 None."""
+    pid = str(os.getpid())
+    count = 0
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read().decode(errors='replace')
+        except OSError:
+            continue  # 그새 종료된 프로세스
+        # 형식: pid (comm) state ppid ... (comm에 공백/괄호가 있을 수 있어 마지막 ')' 기준으로 나눔)
+        comm = stat[stat.find('(') + 1:stat.rfind(')')]
+        fields = stat[stat.rfind(')') + 2:].split()
+        if comm == 'ffmpeg' and len(fields) > 1 and fields[1] == pid:
+            count += 1
+    return count
+
+
+def render_metrics(bot, ffmpeg_processes=None):
+    """봇 전체 지표를 Prometheus 텍스트 형식으로 만듭니다. 이벤트 루프에서 호출합니다."""
+    from core.disk_cache import audio_disk_cache
+    from core.extractor import extraction_engine
+    from core.logs import dropped_records
+    from core.loudness import loudness_analyzer
+    from core.scheduler import youtube_scheduler
+    from core.recommend import related_graph
+    from core.search import search_cache, title_index
+    from core.suggest import track_suggestions
+    from core.stream_cache import stream_cache
+    from core.watchdog import loop_watchdog
+
+    lines = []
+
+    def family(name, kind, documentation, samples):
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            if value is not None:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    music = bot.get_cog('MusicCog')
+    states = music.states if music else {}
+    family('musicbot_guilds', 'gauge', 'Guilds this process serves', [({}, len(bot.guilds))])
+    family('musicbot_voice_clients', 'gauge', 'Connected voice clients', [({}, len(bot.voice_clients))])
+    family('musicbot_players_active', 'gauge', 'Guilds currently playing',
+           [({}, sum(1 for state in states.values() if state.is_playing))])
+    family('musicbot_queue_depth', 'gauge', 'Queued tracks per guild',
+           [({'guild': guild_id}, len(state.queue)) for guild_id, state in states.items() if state.queue])
+    family('musicbot_queued_tracks', 'gauge', 'Queued tracks across all guilds',
+           [({}, sum(len(state.queue) for state in states.values()))])
+
+    extraction = extraction_engine.stats()
+    family('musicbot_extract_workers', 'gauge', 'Extraction worker pool size', [({}, extraction['workers'])])
+    family('musicbot_extract_active', 'gauge', 'Extractions running on workers', [({}, extraction['active'])])
+    family('musicbot_extract_waiting', 'gauge', 'Extractions waiting for a worker', [({}, extraction['queue_depth'])])
+    family('musicbot_extract_total', 'counter', 'Finished extractions by result', [
+        ({'result': 'completed'}, extraction['completed']),
+        ({'result': 'failed'}, extraction['failed']),
+        ({'result': 'rejected'}, extraction['rejected']),
+    ])
+    scheduler = youtube_scheduler.stats()
+    family('musicbot_scheduler_tokens', 'gauge', 'Available YouTube request tokens', [({}, scheduler['tokens'])])
+    family('musicbot_scheduler_waiting', 'gauge', 'Requests waiting for a token by priority',
+           [({'priority': name}, count) for name, count in scheduler['waiting'].items()])
+    family('musicbot_scheduler_dropped_total', 'counter', 'Requests dropped by the scheduler by priority',
+           [({'priority': name}, count) for name, count in scheduler['dropped'].items()])
+
+    # 기본 executor(FFmpeg 열기, 파일 저장 등)의 포화 정도. asyncio 내부 속성이라 없을 수도 있습니다.
+    executor = getattr(bot.loop, '_default_executor', None)
+    if executor is not None and hasattr(executor, '_work_queue'):
+        family('musicbot_default_executor_threads', 'gauge', 'Threads in the default executor', [
+            ({'kind': 'max'}, executor._max_workers),
+            ({'kind': 'started'}, len(executor._threads)),
+        ])
+        family('musicbot_default_executor_queued', 'gauge', 'Jobs waiting in the default executor',
+               [({}, executor._work_queue.qsize())])
+    family('musicbot_ffmpeg_processes', 'gauge', 'Running FFmpeg child processes', [({}, ffmpeg_processes)])
+
+    stream = stream_cache.stats()
+    disk = audio_disk_cache.stats()
+    loudness = loudness_analyzer.stats()
+    search = search_cache.stats()
+    titles = title_index.stats()
+    suggestions = track_suggestions.stats()
+    related = related_graph.stats()
+    family('musicbot_cache_hits_total', 'counter', 'Cache hits by cache', [
+        ({'cache': 'stream'}, stream['hits']),
+        ({'cache': 'stream_shared'}, stream['shared_hits']),
+        ({'cache': 'disk'}, disk['hits']),
+        ({'cache': 'loudness'}, loudness['hits']),
+        ({'cache': 'search'}, search['hits']),
+        ({'cache': 'search_shared'}, search['shared_hits']),
+        ({'cache': 'title_index'}, titles['hits']),
+        ({'cache': 'related'}, related['hits']),
+        ({'cache': 'related_stale'}, related['stale_hits']),
+    ])
+    family('musicbot_cache_misses_total', 'counter', 'Cache misses by cache', [
+        ({'cache': 'stream'}, stream['misses']),
+        ({'cache': 'disk'}, disk['misses']),
+        ({'cache': 'loudness'}, loudness['misses']),
+        ({'cache': 'search'}, search['misses']),
+        ({'cache': 'title_index'}, titles['misses']),
+        ({'cache': 'related'}, related['misses']),
+    ])
+    family('musicbot_cache_entries', 'gauge', 'Entries held by cache', [
+        ({'cache': 'stream'}, stream['size']),
+        ({'cache': 'disk'}, disk['entries']),
+        ({'cache': 'loudness'}, loudness.get('size')),
+        ({'cache': 'search'}, search['size']),
+        ({'cache': 'title_index'}, titles['size']),
+        ({'cache': 'autocomplete'}, suggestions['global_tracks']),
+        ({'cache': 'related'}, related['size']),
+    ])
+    family('musicbot_disk_cache_bytes', 'gauge', 'Bytes stored in the audio disk cache', [({}, disk['bytes'])])
+
+    radio = bot.get_cog('RadioCog')
+    stations = radio.stats() if radio else {}
+    family('musicbot_radio_listeners', 'gauge', 'Voice clients listening to each radio station',
+           [({'station': name}, station['listeners']) for name, station in stations.items()])
+    family('musicbot_radio_frames_total', 'counter', 'Radio frames by station and kind', [
+        ({'station': name, 'kind': kind}, station[kind])
+        for name, station in stations.items() for kind in ('published', 'encoded', 'underruns', 'resyncs')
+    ])
+
+    family('musicbot_log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full',
+           [({}, dropped_records())])
+    family('musicbot_event_loop_blocks_total', 'counter', 'Times the event loop was blocked longer than the watchdog threshold',
+           [({}, loop_watchdog.blocks)])
+    family('musicbot_event_loop_lag_last_seconds', 'gauge', 'Most recent event loop lag sample',
+           [({}, loop_lag_monitor.last_lag)])
+    latency = bot.latency
+    family('musicbot_gateway_latency_seconds', 'gauge', 'Discord gateway heartbeat latency',
+           [({}, latency if latency == latency else None)])  # 연결 전에는 NaN
+
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """GET /metrics로 Prometheus 형식 지표를, GET /debug/blocking으로 루프 블로킹 기록(JSON)을 내보내는 로컬 HTTP 서버 (aiohttp)"""
+    def __init__(self, bot, host=METRICS_HOST, port=METRICS_PORT):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        app.router.add_get('/debug/blocking', self._handle_blocking)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except BaseException:
+            # 포트를 열지 못했으면 다음 start()에서 다시 시도할 수 있도록 정리합니다.
+            await runner.cleanup()
+            raise
+        self._runner = runner
+        logger.info("[metrics] Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+
+        # /proc을 훑는 작업은 이벤트 루프 밖에서 합니다.
+        ffmpeg_processes = await asyncio.get_running_loop().run_in_executor(None, count_ffmpeg_processes)
+        body = render_metrics(self.bot, ffmpeg_processes)
+        return web.Response(body=body.encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def _handle_blocking(self, request):
+        from aiohttp import web
+        from core.watchdog import loop_watchdog
+
+        return web.json_response(loop_watchdog.stats(top=int(request.query.get('top', '20'))))
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,148 @@
+import asyncio
+import enum
+import logging
+import random
+
+from core.logs import set_log_context
+
+logger = logging.getLogger(__name__)
+
+PLAYER_TRACK_ATTEMPTS = 2  # 곡 하나를 준비/열기에 시도하는 횟수
+PLAYER_MAX_CONSECUTIVE_FAILURES = 5  # 이만큼 연속으로 곡을 건너뛰면 재생을 멈춥니다.
+PLAYER_BACKOFF_BASE = 1.0  # 초
+PLAYER_BACKOFF_MAX = 30.0
+
+
+def backoff_delay(failures, base=PLAYER_BACKOFF_BASE, cap=PLAYER_BACKOFF_MAX):
+    """연속 실패 횟수에 따른 대기 시간(초). 지수 증가 + 지터로 여러 길드가 동시에 재시도하지 않도록 합니다."""
+    delay = min(cap, base * (2 ** max(0, failures - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class PlayerStatus(enum.Enum):
+    IDLE = "idle"          # 재생 중이 아님. wake()를 기다림
+    STARTING = "starting"  # 다음 곡을 준비해 재생을 시작하는 중
+    PLAYING = "playing"    # 음성 플레이어가 곡을 재생 중. 곡이 끝나면 track_ended()가 호출됨
+    BACKOFF = "backoff"    # 곡을 재생하지 못해 다음 시도 전에 기다리는 중
+    STOPPED = "stopped"    # stop() 이후. 더 이상 이벤트를 처리하지 않음
+
+
+class PlayOutcome(enum.Enum):
+    STARTED = "started"
+    EMPTY = "empty"                # 재생할 곡이 없음
+    FAILED = "failed"              # 곡을 재생하지 못해 건너뜀
+    DISCONNECTED = "disconnected"  # 음성 채널에 연결되어 있지 않음
+
+
+class GuildPlayer:
+    """길드 하나의 재생 순서를 담당하는 단일 코루틴
+
+    재생 흐름은 모두 이 코루틴 안에서만 진행되며, 외부에서는 이벤트만 넣습니다.
+    - wake(): 대기열에 곡이 들어왔을 때 (이벤트 루프에서 호출)
+    - track_ended(song, error): 음성 플레이어의 after 콜백에서 호출. 스레드 안전합니다.
+
+    start_next()는 async () -> PlayOutcome, on_track_end(song, error)는 이벤트 루프에서 호출되는 동기 함수,
+    on_give_up(failures)는 연속 실패로 재생을 멈출 때 호출되는 async 함수입니다.
+    """
+    def __init__(self, loop, start_next, on_track_end, on_give_up=None, name='',
+                 max_failures=PLAYER_MAX_CONSECUTIVE_FAILURES):
+        self.loop = loop
+        self.name = name
+        self.max_failures = max_failures
+        self._start_next = start_next
+        self._on_track_end = on_track_end
+        self._on_give_up = on_give_up
+        self._events = asyncio.Queue()
+        self._task = None
+        self.status = PlayerStatus.IDLE
+        self.failures = 0  # 연속으로 건너뛴 곡 수
+        self.started = 0
+        self.skipped = 0
+
+    def wake(self):
+        if self.status is PlayerStatus.STOPPED:
+            return
+        if self._task is None:
+            self._task = self.loop.create_task(self._run())
+        self._events.put_nowait(('wake', None))
+
+    def track_ended(self, song, error=None):
+        # 음성 플레이어 스레드에서 호출되므로 이벤트 루프로 넘겨서 넣습니다.
+        self.loop.call_soon_threadsafe(self._events.put_nowait, ('ended', (song, error)))
+
+    def stop(self):
+        self._set(PlayerStatus.STOPPED)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _set(self, status):
+        if status is not self.status:
+            logger.debug("[player] %s: %s -> %s", self.name, self.status.value, status.value)
+            self.status = status
+
+    async def _run(self):
+        # 이 코루틴에서 이어지는 준비/재생 로그에 길드를 붙입니다.
+        set_log_context(guild=self.name)
+        try:
+            while True:
+                kind, payload = await self._events.get()
+                if kind == 'ended':
+                    song, error = payload
+                    self._set(PlayerStatus.IDLE)
+                    try:
+                        self._on_track_end(song, error)
+                    except Exception as e:
+                        logger.error("[player] %s: Track end handler failed: %s", self.name, e, exc_info=True)
+                elif self.status is not PlayerStatus.IDLE:
+                    continue  # 이미 재생 중이거나 시작하는 중이면 wake는 무시
+                await self._advance()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("[player] %s: Player loop crashed: %s", self.name, e, exc_info=True)
+            self._task = None
+            self._set(PlayerStatus.IDLE)
+
+    async def _advance(self):
+        """곡 하나의 재생을 시작하거나, 더 이상 재생할 수 없을 때까지 다음 곡을 시도합니다."""
+        while True:
+            self._set(PlayerStatus.STARTING)
+            try:
+                outcome = await self._start_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("[player] %s: Failed to start next track: %s", self.name, e, exc_info=True)
+                outcome = PlayOutcome.FAILED
+            if outcome is PlayOutcome.STARTED:
+                self.started += 1
+                self.failures = 0
+                self._set(PlayerStatus.PLAYING)
+                return
+            if outcome is not PlayOutcome.FAILED:
+                self.failures = 0
+                self._set(PlayerStatus.IDLE)
+                return
+            self.skipped += 1
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                logger.warning("[player] %s: %s tracks failed in a row. Pausing playback.", self.name, self.failures)
+                failures, self.failures = self.failures, 0
+                self._set(PlayerStatus.IDLE)
+                if self._on_give_up:
+                    await self._on_give_up(failures)
+                return
+            delay = backoff_delay(self.failures)
+            logger.info("[player] %s: Backing off %.1fs after %s failed track(s)", self.name, delay, self.failures)
+            self._set(PlayerStatus.BACKOFF)
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            'status': self.status.value,
+            'pending_events': self._events.qsize(),
+            'consecutive_failures': self.failures,
+            'started': self.started,
+            'skipped': self.skipped,
+        }
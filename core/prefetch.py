@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import time
+
+from core.ffmpeg import is_local_input
+from core.stream_cache import parse_stream_expiry
+from core.scheduler import PRIORITY_PREFETCH
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_DEPTH = int(os.getenv('PREFETCH_DEPTH', '3'))
+# 만료까지 이 시간(초)보다 적게 남은 스트림 URL은 미리 새로 받아 둡니다.
+PREFETCH_REFRESH_MARGIN = 600
+# 재생 직전에 허용하는 최소 잔여 시간(초)
+PLAYBACK_MIN_TTL = 60
+
+
+def stream_time_left(song):
+    """준비된 곡의 스트림 URL 만료까지 남은 시간(초). 알 수 없으면 None."""
+    expires_at = parse_stream_expiry(song.stream_url)
+    if expires_at is None:
+        return None
+    return expires_at - time.time()
+
+
+def is_stream_fresh(song, min_ttl):
+    """곡이 준비되어 있고, 스트림 URL이 최소 min_ttl초 이상 유효하면 True."""
+    if not song.prepared:
+        return False
+    if is_local_input(song.stream_url):
+        # 디스크 캐시 파일은 만료되지 않지만 용량 정리로 지워졌을 수 있습니다.
+        return os.path.exists(song.stream_url)
+    time_left = stream_time_left(song)
+    return time_left is None or time_left >= min_ttl
+
+
+class Prefetcher:
+    """길드 대기열의 앞쪽 depth곡을 미리 준비해 두는 파이프라인
+
+    refresh()는 대기열이 바뀔 때마다 호출되며, 준비 창(window)에서 빠진 곡의 작업은 취소하고
+    새로 들어온 곡이나 URL 만료가 가까운 곡에 대해 백그라운드 준비 작업을 시작합니다.
+    가장 먼저 만료되는 URL에 맞춰 다음 refresh를 예약해 긴 곡이 재생되는 동안에도 URL을 갱신합니다.
+    """
+    def __init__(self, loop, get_queue, prepare, depth=PREFETCH_DEPTH):
+        self.loop = loop
+        self._get_queue = get_queue  # () -> 현재 대기열
+        self._prepare = prepare      # async (song, priority) -> bool
+        self.depth = depth
+        self._tasks = {}  # {id(song): (song, task)}
+        self._failed = set()  # 이번 창에서 준비에 실패한 곡의 id(song)
+        self._timer = None
+
+    def refresh(self):
+        """대기열 앞쪽 곡들의 준비 상태를 맞춥니다."""
+        queue = self._get_queue()
+        window = queue[:self.depth]
+        window_ids = {id(song) for song in window}
+
+        # 창 밖으로 밀려났거나 대기열에서 제거된 곡의 작업 취소
+        for song_id in list(self._tasks):
+            if song_id not in window_ids:
+                song, task = self._tasks.pop(song_id)
+                task.cancel()
+                logger.debug("[prefetch] Cancelled preparation for: %s", song.title)
+        self._failed &= window_ids
+
+        for song in window:
+            song_id = id(song)
+            if song_id in self._tasks or song_id in self._failed:
+                continue
+            if is_stream_fresh(song, PREFETCH_REFRESH_MARGIN):
+                continue
+            if song.prepared:
+                logger.info("[prefetch] Stream URL for '%s' expires soon. Refreshing.", song.title)
+                song.prepared = False
+            task = self.loop.create_task(self._run(song))
+            self._tasks[song_id] = (song, task)
+
+        self._schedule_revalidation(window)
+
+    async def _run(self, song):
+        try:
+            prepared = await self._prepare(song, PRIORITY_PREFETCH)
+        except Exception as e:
+            logger.error("[prefetch] Failed for %s: %s", song.title, e)
+            prepared = False
+        finally:
+            entry = self._tasks.get(id(song))
+            if entry is not None and entry[1] is asyncio.current_task():
+                del self._tasks[id(song)]
+        if prepared:
+            # 새 URL의 만료 시각에 맞춰 다음 재검사를 다시 예약
+            self.refresh()
+        else:
+            self._failed.add(id(song))
+
+    def _schedule_revalidation(self, window):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        time_lefts = [t for t in (stream_time_left(s) for s in window if s.prepared) if t is not None]
+        if not time_lefts:
+            return
+        delay = max(5.0, min(time_lefts) - PREFETCH_REFRESH_MARGIN)
+        self._timer = self.loop.call_later(delay, self.refresh)
+
+    def cancel(self, song):
+        """특정 곡의 준비 작업을 취소합니다. (곧바로 직접 준비할 때 사용)"""
+        entry = self._tasks.pop(id(song), None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def cancel_all(self):
+        for _, task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._failed.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def pending(self):
+        return len(self._tasks)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from core.shared_store import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+# 샤드 모드에서는 공유 저장소를 쓰고, 아니면 이 파일에 저장합니다. 비워 두면 메모리에만 둡니다.
+RELATED_CACHE_PATH = os.getenv('RELATED_CACHE_PATH', './data/related.sqlite3')
+RELATED_TTL = int(os.getenv('RELATED_TTL', str(24 * 3600)))  # 이보다 오래된 추천 목록은 쓰면서 백그라운드에서 새로 받습니다.
+RELATED_MAX_AGE = 7 * 24 * 3600  # 이보다 오래된 추천 목록은 버립니다.
+RELATED_GRAPH_SIZE = 2000  # 메모리에 둘 최대 곡(노드) 수
+
+
+class RecommendationGraph:
+    """video id → 관련 곡 (id, 제목) 목록을 담는 추천 그래프 캐시
+
+    자동재생이 받은 RD 믹스 전체를 노드 하나로 저장해, 이후 추천은 네트워크 없이 그래프에서 고릅니다.
+    ttl이 지난 노드도 max_age까지는 쓰되 fresh=False로 알려 호출한 쪽이 백그라운드에서 새로 받게 합니다.
+    메모리에는 최근에 쓴 max_nodes개만 두고, backend(SharedStore)의 'related' namespace에 함께 기록합니다.
+    backend가 없고 path가 있으면 처음 쓸 때 그 파일을 executor에서 엽니다.
+    get()은 메모리만 보며, 저장소에서 읽는 것은 load()/get_async()가 executor에서 합니다.
+    """
+    def __init__(self, max_nodes=RELATED_GRAPH_SIZE, ttl=RELATED_TTL, max_age=RELATED_MAX_AGE, backend=None, path=None):
+        self.max_nodes = max_nodes
+        self.ttl = ttl
+        self.max_age = max_age
+        self.backend = backend
+        self.path = path
+        self._opening = None  # path를 여는 작업 (asyncio.Future)
+        self._nodes = OrderedDict()  # {video_id: (fetched_at, [(id, title), ...])}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    async def _open_backend(self):
+        if self.backend is None and self.path:
+            if self._opening is None:
+                self._opening = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(None, self._open, self.path))
+            self.backend = await asyncio.shield(self._opening)
+            self.path = None
+        return self.backend
+
+    @staticmethod
+    def _open(path):
+        """추천 목록 저장 파일을 열고 만료된 목록을 지웁니다. 블로킹 I/O이므로 executor에서 호출합니다."""
+        try:
+            store = SharedStore(path)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("[recommend] Keeping recommendations in memory only. Could not open %s: %s", path, e)
+            return None
+        purged = store.purge_expired()
+        if purged:
+            logger.info("[recommend] Purged %s expired recommendation lists", purged)
+        return store
+
+    async def load(self, video_ids):
+        """메모리에 없는 video_ids의 노드를 저장소에서 한 번에 (executor에서) 읽어 메모리에 넣습니다."""
+        missing = [video_id for video_id in video_ids if video_id not in self._nodes]
+        if not missing:
+            return
+        backend = await self._open_backend()
+        if backend is None:
+            return
+        def read():
+            return [(video_id, backend.get('related', video_id)) for video_id in missing]
+        for video_id, stored in await asyncio.get_running_loop().run_in_executor(None, read):
+            if stored is not None and video_id not in self._nodes:
+                self._insert(video_id, (stored['fetched_at'], [tuple(edge) for edge in stored['edges']]))
+
+    async def get_async(self, video_id):
+        """get()과 같지만 메모리에 없으면 저장소에서 먼저 읽어 옵니다."""
+        await self.load([video_id])
+        return self.get(video_id)
+
+    def get(self, video_id):
+        """(관련 곡 [{'id', 'title'}, ...], fresh) 또는 저장된 목록이 없으면 None."""
+        node = self._nodes.get(video_id)
+        age = time.time() - node[0] if node is not None else None
+        if node is None or age > self.max_age:
+            self._nodes.pop(video_id, None)
+            self.misses += 1
+            return None
+        self._nodes.move_to_end(video_id)
+        fresh = age <= self.ttl
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return [{'id': edge_id, 'title': title} for edge_id, title in node[1]], fresh
+
+    def put(self, video_id, entries):
+        """받아 온 관련 곡 목록(yt-dlp entries)을 저장합니다."""
+        edges = [(entry['id'], entry.get('title') or 'Unknown Title') for entry in entries if entry and entry.get('id')]
+        node = (time.time(), edges)
+        self._insert(video_id, node)
+        self.stored += 1
+        if self.backend is not None:
+            self.backend.put('related', video_id, {'fetched_at': node[0], 'edges': edges}, expires_at=node[0] + self.max_age)
+
+    def _insert(self, video_id, node):
+        self._nodes[video_id] = node
+        self._nodes.move_to_end(video_id)
+        while len(self._nodes) > self.max_nodes:
+            self._nodes.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self._nodes),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'stored': self.stored,
+            'hit_rate': ((self.hits + self.stale_hits) / lookups) if lookups else 0.0,
+        }
+
+
+# 모든 길드가 공유하는 추천 그래프 (저장 파일은 자동재생이 처음 쓸 때 엽니다.)
+related_graph = RecommendationGraph(backend=shared_store, path=RELATED_CACHE_PATH)
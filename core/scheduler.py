@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# 우선순위 클래스 (숫자가 작을수록 먼저 처리)
+PRIORITY_INTERACTIVE = 0  # 사용자 검색, 지금 재생할 곡 준비
+PRIORITY_PREFETCH = 1     # 다음 곡 미리 준비
+PRIORITY_AUTOCOMPLETE = 2 # 입력 중인 검색어의 자동완성 (늦으면 쓸모없으므로 짧게만 기다림)
+PRIORITY_AUTOPLAY = 3     # 자동재생 추천 조회
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_PREFETCH: 'prefetch',
+    PRIORITY_AUTOCOMPLETE: 'autocomplete',
+    PRIORITY_AUTOPLAY: 'autoplay',
+}
+
+YT_REQUEST_RATE = float(os.getenv('YT_REQUEST_RATE', '2.0'))  # 초당 토큰 보충량
+YT_REQUEST_BURST = int(os.getenv('YT_REQUEST_BURST', '10'))
+
+
+class RequestDropped(Exception):
+    """토큰을 제때 얻지 못해 낮은 우선순위 요청이 버려졌을 때 발생합니다."""
+
+
+class RequestScheduler:
+    """유튜브로 나가는 요청을 위한 우선순위 토큰 버킷
+
+    - 대기 중인 요청은 항상 우선순위 순서로 토큰을 받습니다.
+    - 낮은 우선순위는 버킷에 일정량(reserve)이 남아 있을 때만 토큰을 가져가
+      사용자 요청을 위한 여유분을 남깁니다.
+    - max_wait를 넘겨도 토큰을 받지 못한 요청은 RequestDropped로 버려집니다.
+      (0이면 버킷이 비어 있을 때 즉시 버림, None이면 무기한 대기)
+    """
+    def __init__(self, rate=YT_REQUEST_RATE, burst=YT_REQUEST_BURST, reserve=None, max_wait=None):
+        self.rate = rate
+        self.burst = burst
+        if reserve is None:
+            reserve = {PRIORITY_INTERACTIVE: 0, PRIORITY_PREFETCH: 2, PRIORITY_AUTOCOMPLETE: 3, PRIORITY_AUTOPLAY: 4}
+        if max_wait is None:
+            max_wait = {
+                PRIORITY_INTERACTIVE: None, PRIORITY_PREFETCH: 30.0, PRIORITY_AUTOCOMPLETE: 3.0, PRIORITY_AUTOPLAY: 10.0,
+            }
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer = None
+        self._pending = {}  # {key: [priority, future]} 우선순위를 올릴 수 있는 대기 요청
+        self.granted = {p: 0 for p in PRIORITY_NAMES}
+        self.dropped = {p: 0 for p in PRIORITY_NAMES}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _required(self, priority):
+        return min(self.burst, 1 + self.reserve.get(priority, 0))
+
+    async def acquire(self, priority=PRIORITY_INTERACTIVE, key=None):
+        """토큰 하나를 얻을 때까지 기다립니다.
+
+        key를 넘기면 대기 중에 boost(key, priority)로 우선순위를 올릴 수 있습니다.
+        """
+        self._refill()
+        self._prune()
+        ahead = self._waiters and self._waiters[0][0] <= priority
+        if not ahead and self.tokens >= self._required(priority):
+            self.tokens -= 1
+            self.granted[priority] += 1
+            return
+        max_wait = self.max_wait.get(priority)
+        if max_wait == 0:
+            self.dropped[priority] += 1
+            raise RequestDropped(f"{PRIORITY_NAMES[priority]} request dropped: rate limit bucket is empty")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = [priority, future]
+        if key is not None:
+            self._pending[key] = entry
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._schedule_dispatch(reset=True)
+        started = loop.time()
+        try:
+            while True:
+                # boost로 우선순위가 바뀌었을 수 있으므로 매번 현재 우선순위의 max_wait를 다시 계산합니다.
+                max_wait = self.max_wait.get(entry[0])
+                remaining = None if max_wait is None else max_wait - (loop.time() - started)
+                if remaining is not None and remaining <= 0:
+                    future.cancel()
+                    self.dropped[entry[0]] += 1
+                    raise RequestDropped(f"{PRIORITY_NAMES[entry[0]]} request dropped after waiting {max_wait}s for a token")
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+                    return
+                except asyncio.TimeoutError:
+                    if future.done() and not future.cancelled():
+                        return  # 타임아웃과 동시에 토큰을 받은 경우
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 토큰을 받은 직후 취소되었다면 반납합니다.
+                self.refund(entry[0])
+            future.cancel()
+            raise
+        finally:
+            if key is not None and self._pending.get(key) is entry:
+                del self._pending[key]
+
+    def refund(self, priority=PRIORITY_INTERACTIVE):
+        """받은 토큰을 쓰지 않았을 때 돌려줍니다. 기다리는 요청이 있으면 바로 나눠 줍니다."""
+        self.tokens = min(self.burst, self.tokens + 1)
+        self.granted[priority] -= 1
+        self._schedule_dispatch(reset=True)
+
+    def boost(self, key, priority):
+        """key로 대기 중인 요청의 우선순위를 priority까지 올립니다. 대기 중인 요청이 없으면 무시합니다."""
+        entry = self._pending.get(key)
+        if entry is None or entry[0] <= priority or entry[1].done():
+            return
+        logger.debug("[scheduler] Boosting %r from %s to %s", key, PRIORITY_NAMES[entry[0]], PRIORITY_NAMES[priority])
+        entry[0] = priority
+        # 같은 future를 더 높은 우선순위로 다시 넣습니다. 먼저 꺼내진 쪽만 토큰을 받고 나머지는 무시됩니다.
+        heapq.heappush(self._waiters, (priority, next(self._seq), entry[1]))
+        self._schedule_dispatch(reset=True)
+
+    def _prune(self):
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+    def _schedule_dispatch(self, reset=False):
+        if self._timer is not None:
+            if not reset:
+                return
+            self._timer.cancel()
+            self._timer = None
+        self._prune()
+        if not self._waiters:
+            return
+        priority = self._waiters[0][0]
+        deficit = self._required(priority) - self.tokens
+        delay = max(0.0, deficit / self.rate) if self.rate > 0 else 1.0
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        self._prune()
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if self.tokens < self._required(priority):
+                break
+            heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            self.granted[priority] += 1
+            future.set_result(None)
+            self._prune()
+        self._schedule_dispatch()
+
+    def stats(self):
+        self._refill()
+        waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[PRIORITY_NAMES[priority]] += 1
+        return {
+            'tokens': round(self.tokens, 2),
+            'rate': self.rate,
+            'burst': self.burst,
+            'waiting': waiting,
+            'granted': {PRIORITY_NAMES[p]: n for p, n in self.granted.items()},
+            'dropped': {PRIORITY_NAMES[p]: n for p, n in self.dropped.items()},
+        }
+
+
+# 프로세스 전역 유튜브 요청 스케줄러
+youtube_scheduler = RequestScheduler()
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from core.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', str(6 * 3600)))  # 검색 결과 보관 시간(초). 0이면 캐시하지 않습니다.
+SEARCH_CACHE_SIZE = 2000
+TITLE_INDEX_SIZE = int(os.getenv('TITLE_INDEX_SIZE', '5000'))  # 제목 색인에 보관할 최대 곡 수
+TITLE_MATCH_THRESHOLD = 0.6  # 검색어 트라이그램 중 제목에 있어야 하는 비율
+
+
+def normalize_query(query):
+    """대소문자, 전각/반각, 공백 차이를 없앤 검색어. 캐시 키로 씁니다."""
+    return ' '.join(unicodedata.normalize('NFKC', query).casefold().split())
+
+
+def _trigrams(text):
+    """단어마다 앞뒤에 공백을 붙여 만든 글자 트라이그램 집합. 짧은 단어와 오타에도 부분 일치합니다."""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchCache:
+    """정규화한 검색어 → 검색 결과 목록을 담는 LRU 캐시 (TTL 만료)
+
+    결과는 만료되는 스트림 정보를 빼고 id, 제목, 길이만 저장합니다.
+    backend(SharedStore)가 있으면 'search' namespace로 다른 샤드와 결과를 공유합니다.
+    """
+    def __init__(self, max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()  # {query: (expires_at, entries)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        """캐시된 검색 결과 목록. 없거나 만료되었으면 None. 로컬 캐시만 찾아봅니다."""
+        entries = self._get_local(query)
+        if entries is None:
+            with self._lock:
+                self.misses += 1
+        return entries
+
+    async def get_async(self, query):
+        """get()과 같지만 로컬 미스면 공유 저장소(backend)를 executor에서 찾아봅니다. 이벤트 루프에서는 이쪽을 사용하세요."""
+        entries = self._get_local(query)
+        if entries is not None:
+            return entries
+        shared = await self.backend.get_async('search', query) if self.backend is not None and self.ttl > 0 else None
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            self._insert(query, (shared['expires_at'], shared['entries']))
+            self.shared_hits += 1
+            return [dict(entry) for entry in shared['entries']]
+
+    def _get_local(self, query):
+        with self._lock:
+            item = self._entries.get(query)
+            if item is not None and item[0] <= time.time():
+                del self._entries[query]
+                item = None
+            if item is None:
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return [dict(entry) for entry in item[1]]
+
+    def _insert(self, query, item):
+        self._entries[query] = item
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, query, entries):
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        entries = [{'id': entry['id'], 'title': entry.get('title'), 'duration': entry.get('duration')} for entry in entries]
+        with self._lock:
+            self._insert(query, (expires_at, entries))
+        if self.backend is not None:
+            self.backend.put('search', query, {'expires_at': expires_at, 'entries': entries}, expires_at=expires_at)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': ((self.hits + self.shared_hits) / lookups) if lookups else 0.0,
+            }
+
+
+class TitleIndex:
+    """봇이 대기열에 넣거나 재생한 곡의 제목으로 만든 퍼지 검색 색인 (글자 트라이그램 역색인)
+
+    검색어 트라이그램 중 TITLE_MATCH_THRESHOLD 이상이 제목에 들어 있는 곡을 찾습니다.
+    후보는 가장 드문 트라이그램 몇 개의 목록에서만 모으므로(prefix filtering) 흔한 글자 조합이 있어도 빠릅니다.
+    최근에 쓰인 곡부터 max_entries곡까지 보관하며, backend가 있으면 재생한 곡을 'title' namespace에 기록해
+    다른 샤드와 재시작 후에도 같은 색인을 씁니다. (저장된 제목은 시작할 때 load()로 불러옵니다.)
+    """
+    def __init__(self, max_entries=TITLE_INDEX_SIZE, threshold=TITLE_MATCH_THRESHOLD, backend=None):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.backend = backend
+        self._titles = OrderedDict()  # {video_id: (title, normalized title)}
+        self._postings = {}  # {trigram: {video_id}}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self):
+        """공유 저장소에 기록된 제목을 executor에서 읽어 색인에 넣습니다.
+
+        그새 추가된 곡이 더 최근에 쓰인 곡이므로, 불러온 제목은 남은 자리만큼 오래된 쪽에 채웁니다.
+        """
+        if self.backend is None:
+            return
+        items = await self.backend.items_async('title')
+        with self._lock:
+            room = self.max_entries - len(self._titles)
+            items = sorted((item for item in items if item[0] not in self._titles), key=lambda item: item[2])
+            items = items[-room:] if room > 0 else []
+            for video_id, title, _ in reversed(items):
+                self._add(video_id, title)
+                self._titles.move_to_end(video_id, last=False)
+        if items:
+            logger.info("[search] Loaded %s titles into the search index", len(items))
+
+    def add(self, video_id, title, shared=False):
+        """곡을 색인에 넣거나 최근 사용으로 표시합니다. shared=True면 공유 저장소에도 기록합니다."""
+        if not video_id or not title or title == 'Unknown Title':
+            return
+        with self._lock:
+            self._add(video_id, title)
+        if shared and self.backend is not None:
+            self.backend.put('title', video_id, title)  # 쓰기 스레드가 저장합니다.
+
+    def _add(self, video_id, title):
+        current = self._titles.get(video_id)
+        if current is not None and current[0] == title:
+            self._titles.move_to_end(video_id)
+            return
+        if current is not None:
+            self._remove(video_id)
+        normalized = normalize_query(title)
+        self._titles[video_id] = (title, normalized)
+        for gram in _trigrams(normalized):
+            self._postings.setdefault(gram, set()).add(video_id)
+        while len(self._titles) > self.max_entries:
+            self._remove(next(iter(self._titles)))
+
+    def _remove(self, video_id):
+        _, normalized = self._titles.pop(video_id)
+        for gram in _trigrams(normalized):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(video_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def search(self, query, limit=5):
+        """검색어와 비슷한 제목의 곡을 점수 순으로 [{'id', 'title'}, ...] 형태로 반환합니다."""
+        grams = _trigrams(normalize_query(query))
+        if not grams:
+            return []
+        needed = max(1, int(len(grams) * self.threshold + 0.999))
+        with self._lock:
+            # 일치해야 하는 트라이그램이 needed개 이상이면, 가장 드문 (len - needed + 1)개 중 하나는 반드시 들어 있습니다.
+            ordered = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))
+            candidates = set()
+            for gram in ordered[:len(grams) - needed + 1]:
+                candidates.update(self._postings.get(gram, ()))
+            matches = []
+            for video_id in candidates:
+                title, normalized = self._titles[video_id]
+                count = len(grams & _trigrams(normalized))
+                if count < needed:
+                    continue
+                # 검색어가 더 많이 들어 있을수록, 그다음엔 제목이 짧을수록(검색어에 가까울수록) 앞에 둡니다.
+                matches.append((-count, len(normalized), video_id, title))
+            matches.sort()
+            if matches:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return [{'id': video_id, 'title': title} for _, _, video_id, title in matches[:limit]]
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._titles), 'trigrams': len(self._postings), 'hits': self.hits, 'misses': self.misses}
+
+
+# 모든 길드가 공유하는 검색 캐시와 제목 색인 (샤드 모드에서는 공유 저장소까지 사용)
+search_cache = SearchCache(backend=shared_store)
+title_index = TitleIndex(backend=shared_store)
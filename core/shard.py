@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# supervisor.py가 샤드 프로세스마다 지정합니다. 비어 있으면 단일 프로세스 모드입니다.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0'))
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()]
+SHARD_NAME = os.getenv('SHARD_NAME', 'shard-0')
+SHARD_STATUS_INTERVAL = 15.0  # 상태 보고 간격(초)
+
+
+def collect_metrics(bot):
+    """샤드 프로세스 하나의 상태와 주요 지표를 모읍니다."""
+    from core.audio import gap_tracker
+    from core.disk_cache import audio_disk_cache
+    from core.extractor import extraction_engine
+    from core.guild_store import guild_store
+    from core.loudness import loudness_analyzer
+    from core.scheduler import youtube_scheduler
+    from core.search import search_cache
+    from core.stream_cache import stream_cache
+
+    music = bot.get_cog('MusicCog')
+    states = music.states if music else {}
+    latency = bot.latency
+    return {
+        'guilds': len(bot.guilds),
+        'voice_clients': len(bot.voice_clients),
+        'active_players': sum(1 for state in states.values() if state.is_playing),
+        'queued_tracks': sum(len(state.queue) for state in states.values()),
+        'latency_ms': latency * 1000 if latency == latency else None,  # 연결 전에는 NaN
+        'extraction': extraction_engine.stats(),
+        'scheduler': youtube_scheduler.stats(),
+        'stream_cache': stream_cache.stats(),
+        'search_cache': search_cache.stats(),
+        'disk_cache': audio_disk_cache.stats(),
+        'gaps': gap_tracker.stats(),
+        'guild_store': guild_store.stats(),
+        'loudness': loudness_analyzer.stats(),
+    }
+
+
+class ShardReporter:
+    """샤드 프로세스의 상태를 공유 저장소('shard_status' namespace)에 주기적으로 기록합니다.
+
+    supervisor.py는 이 기록으로 샤드의 생존 여부를 판단하고 전체 지표를 합산합니다.
+    """
+    def __init__(self, bot, store, name=SHARD_NAME, shard_ids=SHARD_IDS, interval=SHARD_STATUS_INTERVAL):
+        self.bot = bot
+        self.store = store
+        self.name = name
+        self.shard_ids = shard_ids
+        self.interval = interval
+        self.started_at = time.time()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                status = {
+                    'pid': os.getpid(),
+                    'shard_ids': self.shard_ids,
+                    'started_at': self.started_at,
+                    'reported_at': time.time(),
+                    'ready': self.bot.is_ready(),
+                    'metrics': collect_metrics(self.bot),
+                }
+                self.store.put('shard_status', self.name, status)  # 쓰기 스레드가 저장합니다.
+            except Exception as e:
+                logger.error("[shard] Failed to report status for %s: %s", self.name, e)
+            await asyncio.sleep(self.interval)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 비어 있으면 프로세스 안의 메모리 캐시만 사용합니다. 샤드 모드에서는 supervisor.py가 지정합니다.
+SHARED_STORE_PATH = os.getenv('SHARED_STORE_PATH', '')
+# 다른 프로세스가 쓰는 중일 때 읽기가 기다리는 최대 시간(초). 넘으면 캐시 미스로 취급합니다.
+SHARED_STORE_BUSY_TIMEOUT = 0.05
+# 쓰기 스레드는 이벤트 루프를 막지 않으므로 더 오래 기다립니다.
+SHARED_STORE_WRITE_TIMEOUT = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SharedStore:
+    """여러 샤드 프로세스가 함께 쓰는 로컬 키-값 저장소 (SQLite, WAL 모드)
+
+    스트림 URL, 라우드니스 측정값, 검색 결과처럼 어느 샤드가 구해도 되는 값을 namespace별로 저장합니다.
+    캐시 용도이므로 저장소 오류나 잠금 대기 시간 초과는 로그만 남기고 미스로 취급합니다.
+    연결은 스레드마다 따로 열며, WAL + synchronous=NORMAL이라 쓰기도 fsync 없이 짧게 끝납니다.
+    이벤트 루프에서는 get_async()/items_async()로 읽고, put()/delete()는 쓰기 스레드 하나에 맡기고 바로 반환합니다.
+    """
+    def __init__(self, path, busy_timeout=SHARED_STORE_BUSY_TIMEOUT, write_timeout=SHARED_STORE_WRITE_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.write_timeout = write_timeout
+        self._local = threading.local()
+        self.errors = 0
+        self.busy = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(sqlite3.connect(path, timeout=write_timeout)) as conn:
+            conn.execute(_SCHEMA)
+        # 쓰기 순서가 바뀌지 않도록 스레드 하나에서만 씁니다.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shared-store', initializer=self._open_writer)
+
+    def _conn(self, timeout=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=timeout or self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _open_writer(self):
+        self._conn(self.write_timeout)
+
+    async def get_async(self, namespace, key):
+        """get()을 executor에서 실행합니다. 이벤트 루프에서는 이쪽을 사용하세요."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, namespace, key)
+
+    async def items_async(self, namespace):
+        """items()를 executor에서 실행합니다."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.items, namespace)
+
+    def get(self, namespace, key):
+        """저장된 값을 반환합니다. 없거나 만료되었으면 None."""
+        try:
+            row = self._conn().execute(
+                'SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?', (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._log_error('get', e)
+            return None
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def put(self, namespace, key, value, expires_at=None):
+        """값을 쓰기 스레드에 넘기고 바로 반환합니다. (쓰기 전에 읽으면 이전 값이 보일 수 있음)"""
+        self._submit(self._put, namespace, key, json.dumps(value), expires_at)
+
+    def delete(self, namespace, key):
+        self._submit(self._delete, namespace, key)
+
+    def _submit(self, fn, *args):
+        try:
+            self._writer.submit(fn, *args)
+        except RuntimeError:
+            # shutdown() 이후의 쓰기는 버립니다.
+            pass
+
+    def _put(self, namespace, key, value, expires_at):
+        try:
+            self._conn().execute(
+                'INSERT OR REPLACE INTO kv (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, value, expires_at, time.time()),
+            )
+        except sqlite3.Error as e:
+            self._log_error('put', e)
+
+    def _delete(self, namespace, key):
+        try:
+            self._conn().execute('DELETE FROM kv WHERE namespace = ? AND key = ?', (namespace, key))
+        except sqlite3.Error as e:
+            self._log_error('delete', e)
+
+    def items(self, namespace):
+        """namespace의 만료되지 않은 (key, value, updated_at) 목록"""
+        try:
+            rows = self._conn().execute(
+                'SELECT key, value, updated_at FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (namespace, time.time()),
+            ).fetchall()
+        except sqlite3.Error as e:
+            self._log_error('items', e)
+            return []
+        return [(key, json.loads(value), updated_at) for key, value, updated_at in rows]
+
+    def purge_expired(self):
+        """만료된 항목을 지우고 지운 개수를 반환합니다."""
+        try:
+            cursor = self._conn().execute('DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),))
+        except sqlite3.Error as e:
+            self._log_error('purge', e)
+            return 0
+        return cursor.rowcount
+
+    def shutdown(self):
+        """남은 쓰기를 마치고 쓰기 스레드를 멈춥니다."""
+        self._writer.shutdown(wait=True)
+
+    def _log_error(self, operation, error):
+        if isinstance(error, sqlite3.OperationalError) and 'locked' in str(error):
+            # 다른 프로세스가 오래 쓰는 중이면 기다리지 않고 미스로 넘어갑니다.
+            self.busy += 1
+            logger.debug("[shared_store] %s timed out on %s: %s", operation, self.path, error)
+            return
+        self.errors += 1
+        logger.warning("[shared_store] %s failed on %s: %s", operation, self.path, error)
+
+
+# 프로세스 전역 공유 저장소 (SHARED_STORE_PATH가 없으면 None)
+shared_store = SharedStore(SHARED_STORE_PATH) if SHARED_STORE_PATH else None
@@ -0,0 +1,61 @@
+import asyncio
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """같은 key로 동시에 들어온 비동기 작업을 하나로 합치는 클래스
+
+    첫 요청만 실제 작업을 시작하고, 작업이 끝나기 전에 들어온 요청은 같은 future를 기다립니다.
+    대기자는 asyncio.shield로 기다리므로 한 대기자가 취소되어도 공유 작업은 계속 진행됩니다.
+    마지막 대기자까지 모두 취소되면 더 이상 결과를 기다리는 쪽이 없으므로 공유 작업도 취소합니다.
+    """
+    def __init__(self):
+        self._inflight = {}  # {key: asyncio.Future}
+        self._waiters = {}  # {key: 대기자 수}
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key, factory):
+        """key에 해당하는 작업의 결과를 반환합니다. factory는 awaitable을 만드는 callable입니다."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._on_done, key))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug("[singleflight] Joined in-flight work for key=%r", key)
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            remaining = self._waiters.get(key, 1) - 1
+            if remaining > 0:
+                self._waiters[key] = remaining
+            else:
+                self._waiters.pop(key, None)
+                if not future.done():
+                    self.abandoned += 1
+                    future.cancel()
+
+    def _on_done(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 모든 대기자가 취소된 경우에도 "exception was never retrieved" 경고가 남지 않도록 소비합니다.
+        if not future.cancelled():
+            future.exception()
+
+    def in_flight(self):
+        return len(self._inflight)
+
+    def stats(self):
+        return {'in_flight': len(self._inflight), 'started': self.started, 'coalesced': self.coalesced, 'abandoned': self.abandoned}
+
+
+# yt-dlp 추출 요청 전체가 공유하는 인스턴스
+extraction_flight = SingleFlight()
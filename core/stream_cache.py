@@ -0,0 +1,128 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from core.shared_store import shared_store
+
+# googlevideo 스트림 URL은 만료 시각을 `expire=<unix ts>` (또는 `/expire/<ts>/`) 형태로 담고 있습니다.
+_EXPIRE_RE = re.compile(r"[?&/]expire[=/](\d+)")
+
+
+def parse_stream_expiry(url):
+    """스트림 URL에서 만료 시각(unix timestamp)을 추출합니다. 없으면 None."""
+    if not url:
+        return None
+    match = _EXPIRE_RE.search(url)
+    if not match:
+        return None
+    return int(match.group(1))
+
+
+class StreamCache:
+    """video id → 해석된 오디오 포맷을 담는 프로세스 전역 LRU 캐시
+
+    각 항목은 스트림 URL의 `expire=` 값을 기준으로 만료되며,
+    만료 직전(safety_margin초 이내)의 항목은 캐시 미스로 취급합니다.
+    backend(SharedStore)가 있으면 로컬 미스일 때 다른 샤드가 저장한 항목을 찾아보고, 저장할 때 함께 기록합니다.
+    """
+    def __init__(self, max_entries=512, safety_margin=120, default_ttl=3600, backend=None):
+        self.max_entries = max_entries
+        self.safety_margin = safety_margin
+        self.default_ttl = default_ttl  # URL에 expire 값이 없을 때 사용할 TTL
+        self.backend = backend
+        self._entries = OrderedDict()  # {video_id: (expires_at, stream)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, video_id, min_ttl=0):
+        """유효한 캐시 항목을 반환합니다. 없거나 만료되었으면 None. 로컬 캐시만 찾아봅니다.
+
+        min_ttl을 주면 만료까지 그보다 적게 남은 항목도 미스로 취급합니다. (항목은 그대로 둠)
+        """
+        with self._lock:
+            item = self._entries.get(video_id)
+        return self._check(video_id, item, min_ttl)
+
+    async def get_async(self, video_id, min_ttl=0):
+        """get()과 같지만 로컬 미스면 공유 저장소(backend)를 executor에서 찾아봅니다. 이벤트 루프에서는 이쪽을 사용하세요."""
+        with self._lock:
+            item = self._entries.get(video_id)
+        if item is None and self.backend is not None:
+            item = await self._get_shared(video_id)
+        return self._check(video_id, item, min_ttl)
+
+    def _check(self, video_id, item, min_ttl):
+        with self._lock:
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, stream = item
+            time_left = expires_at - time.time()
+            if time_left <= self.safety_margin:
+                self._entries.pop(video_id, None)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if time_left < min_ttl:
+                self.misses += 1
+                return None
+            if video_id in self._entries:
+                self._entries.move_to_end(video_id)
+            self.hits += 1
+            return dict(stream)
+
+    async def _get_shared(self, video_id):
+        """공유 저장소에서 항목을 찾아 로컬 캐시에 넣고 (expires_at, stream)을 반환합니다."""
+        shared = await self.backend.get_async('stream', video_id)
+        if shared is None:
+            return None
+        item = (shared['expires_at'], shared['stream'])
+        with self._lock:
+            self._insert(video_id, item)
+            self.shared_hits += 1
+        return item
+
+    def _insert(self, video_id, item):
+        self._entries[video_id] = item
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, video_id, stream):
+        """해석된 포맷(최소한 'url' 키를 포함)을 캐시에 저장합니다."""
+        expires_at = parse_stream_expiry(stream.get('url')) or (time.time() + self.default_ttl)
+        with self._lock:
+            self._insert(video_id, (expires_at, dict(stream)))
+        if self.backend is not None:
+            self.backend.put('stream', video_id, {'expires_at': expires_at, 'stream': dict(stream)}, expires_at=expires_at)
+
+    def invalidate(self, video_id):
+        """재생 실패 등으로 더 이상 신뢰할 수 없는 항목을 제거합니다."""
+        with self._lock:
+            self._entries.pop(video_id, None)
+        if self.backend is not None:
+            self.backend.delete('stream', video_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# 모든 길드가 공유하는 캐시 인스턴스 (샤드 모드에서는 공유 저장소까지 사용)
+stream_cache = StreamCache(backend=shared_store)
@@ -0,0 +1,133 @@
+import heapq
+import os
+import re
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from core.search import normalize_query
+
+AUTOCOMPLETE_GUILD_TRACKS = 200  # 길드별로 기억할 곡 수
+AUTOCOMPLETE_GLOBAL_TRACKS = int(os.getenv('AUTOCOMPLETE_GLOBAL_TRACKS', '5000'))  # 전체 색인에 기억할 곡 수
+AUTOCOMPLETE_MAX_GUILDS = 2000  # 색인을 유지할 최대 길드 수 (오래 쓰지 않은 길드부터 버림)
+AUTOCOMPLETE_SCAN_LIMIT = 2000  # 접두사 하나로 훑을 최대 단어 수
+POPULARITY_HALF_LIFE = 7 * 24 * 3600  # 재생 횟수 점수가 절반으로 줄어드는 시간(초)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _words(text):
+    return _WORD_RE.findall(normalize_query(text))
+
+
+class PrefixIndex:
+    """제목의 단어 접두사로 곡을 찾는 색인
+
+    재생할 때마다 점수에 weight를 더하고 점수는 POPULARITY_HALF_LIFE마다 절반으로 줄어들어,
+    자주 그리고 최근에 재생한 곡이 앞에 옵니다. 이벤트 루프에서만 사용합니다.
+    """
+    def __init__(self, max_entries, half_life=POPULARITY_HALF_LIFE):
+        self.max_entries = max_entries
+        self.half_life = half_life
+        self._tracks = OrderedDict()  # {video_id: [title, words, score, updated_at]} (최근에 재생한 곡이 뒤)
+        self._words = []  # 정렬된 (단어, video_id) 목록
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def _score(self, track, now):
+        return track[2] * 0.5 ** ((now - track[3]) / self.half_life)
+
+    def record(self, video_id, title, weight=1.0, now=None):
+        now = now or time.time()
+        track = self._tracks.get(video_id)
+        if track is None:
+            words = sorted(set(_words(title)))
+            track = self._tracks[video_id] = [title, words, 0.0, now]
+            for word in words:
+                insort(self._words, (word, video_id))
+        track[2] = self._score(track, now) + weight
+        track[3] = now
+        self._tracks.move_to_end(video_id)
+        while len(self._tracks) > self.max_entries:
+            self._remove(next(iter(self._tracks)))
+
+    def _remove(self, video_id):
+        _, words, _, _ = self._tracks.pop(video_id)
+        for word in words:
+            i = bisect_left(self._words, (word, video_id))
+            if i < len(self._words) and self._words[i] == (word, video_id):
+                del self._words[i]
+
+    def complete(self, query, limit=10):
+        """입력 중인 검색어로 시작하는 곡을 점수 순으로 [{'id', 'title'}, ...] 형태로 반환합니다.
+
+        검색어의 각 단어가 제목의 어떤 단어의 접두사여야 합니다. (입력 중인 마지막 단어도 그대로 일치)
+        검색어가 비어 있으면 점수가 가장 높은 곡을 반환합니다.
+        """
+        now = time.time()
+        words = _words(query)
+        if not words:
+            candidates = self._tracks
+        else:
+            # 모든 단어를 접두사로 비교하므로, 가장 긴(후보가 가장 적을) 단어로 후보를 모은 뒤 나머지로 거릅니다.
+            anchor = max(words, key=len)
+            rest = [word for word in words if word is not anchor]
+            candidates = set()
+            i = bisect_left(self._words, (anchor,))
+            end = min(len(self._words), i + AUTOCOMPLETE_SCAN_LIMIT)
+            while i < end and self._words[i][0].startswith(anchor):
+                candidates.add(self._words[i][1])
+                i += 1
+            if rest:
+                candidates = [
+                    video_id for video_id in candidates
+                    if all(any(word.startswith(prefix) for word in self._tracks[video_id][1]) for prefix in rest)
+                ]
+        best = heapq.nlargest(limit, candidates, key=lambda video_id: self._score(self._tracks[video_id], now))
+        return [{'id': video_id, 'title': self._tracks[video_id][0]} for video_id in best]
+
+
+class TrackSuggestions:
+    """/play 자동완성용 길드별·전체 인기/최근 곡 색인"""
+    def __init__(self, guild_tracks=AUTOCOMPLETE_GUILD_TRACKS, global_tracks=AUTOCOMPLETE_GLOBAL_TRACKS,
+                 max_guilds=AUTOCOMPLETE_MAX_GUILDS):
+        self.guild_tracks = guild_tracks
+        self.max_guilds = max_guilds
+        self.global_index = PrefixIndex(global_tracks)
+        self._guilds = OrderedDict()  # {guild_id: PrefixIndex}
+
+    def record(self, guild_id, video_id, title, weight=1.0):
+        """재생한 곡을 길드 색인과 전체 색인에 기록합니다."""
+        if not video_id or not title or title == 'Unknown Title':
+            return
+        index = self._guilds.get(guild_id)
+        if index is None:
+            index = self._guilds[guild_id] = PrefixIndex(self.guild_tracks)
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        self._guilds.move_to_end(guild_id)
+        index.record(video_id, title, weight)
+        self.global_index.record(video_id, title, weight)
+
+    def complete(self, guild_id, query, limit=10):
+        """길드에서 재생한 곡을 먼저, 모자라면 전체에서 인기 있는 곡으로 채웁니다."""
+        index = self._guilds.get(guild_id)
+        results = index.complete(query, limit) if index is not None else []
+        if len(results) < limit:
+            seen = {entry['id'] for entry in results}
+            for entry in self.global_index.complete(query, limit):
+                if entry['id'] not in seen and len(results) < limit:
+                    results.append(entry)
+        return results
+
+    def stats(self):
+        return {
+            'guilds': len(self._guilds),
+            'guild_tracks': sum(len(index) for index in self._guilds.values()),
+            'global_tracks': len(self.global_index),
+        }
+
+
+# 프로세스 전역 자동완성 색인 (MusicCog가 재생할 때마다 기록)
+track_suggestions = TrackSuggestions()
@@ -0,0 +1,53 @@
+import re
+
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={}"
+_VIDEO_ID_RE = re.compile(r"v=([\w-]+)")
+
+
+def extract_video_id(url):
+    """유튜브 watch URL에서 video id를 추출합니다. 찾지 못하면 None."""
+    match = _VIDEO_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+class Track:
+    """대기열에 들어가는 곡 하나
+
+    대기열이 길어져도 메모리를 적게 쓰도록 __slots__를 사용하며, video id는 생성할 때 한 번만 파싱합니다.
+    유튜브 곡은 URL을 따로 저장하지 않고 video id로 만듭니다.
+    명령어 컨텍스트는 곡마다 들고 있지 않고, 알림을 보낼 채널은 GuildState.text_channel을 사용합니다.
+    """
+    __slots__ = ('video_id', 'title', 'added_by', 'prepared', 'stream_url', 'stream_format', 'duration', 'requested_at', '_url')
+
+    def __init__(self, webpage_url, title='Unknown Title', added_by='user'):
+        self.video_id = extract_video_id(webpage_url)
+        self._url = None if self.video_id else webpage_url  # 유튜브가 아닌 URL만 보관
+        self.title = title
+        self.added_by = added_by  # "user" 또는 "autoplay"
+        self.prepared = False
+        self.stream_url = None
+        self.stream_format = None  # 스트림 캐시에 저장되는 포맷 정보 (dict)
+        self.duration = None
+        self.requested_at = None  # /play 명령을 받은 시각(perf_counter). 첫 프레임까지의 시간 측정용
+
+    @classmethod
+    def from_video_id(cls, video_id, title='Unknown Title', added_by='user'):
+        return cls(YOUTUBE_WATCH_URL.format(video_id), title, added_by)
+
+    def to_record(self):
+        """저장용 (video_id, url, title, added_by) 튜플. 스트림 정보는 만료되므로 저장하지 않습니다."""
+        return (self.video_id, self._url, self.title, self.added_by)
+
+    @classmethod
+    def from_record(cls, record):
+        video_id, url, title, added_by = record
+        if video_id:
+            return cls.from_video_id(video_id, title, added_by)
+        return cls(url, title, added_by)
+
+    @property
+    def webpage_url(self):
+        return YOUTUBE_WATCH_URL.format(self.video_id) if self.video_id else self._url
+
+    def __repr__(self):
+        return f"<Track {self.video_id or self._url} {self.title!r}>"
@@ -0,0 +1,205 @@
+import random
+from collections import Counter
+from itertools import chain, islice
+
+
+class TrackQueue:
+    """위치 기반 삽입/삭제/이동이 빠른 재생 대기열
+
+    곡들을 최대 2 * block_size 크기의 블록으로 나눠 저장하고, 블록 길이의 누적합을 펜윅 트리로 관리합니다.
+    - 위치 → (블록, 오프셋) 탐색은 O(log n), 블록 안의 삽입/삭제는 블록 크기(상수)에 비례합니다.
+    - video id별 개수를 따로 세어 두므로 중복 확인(has_video)은 O(1)입니다.
+    - 슬라이스(queue[a:b])는 해당 범위만 읽으므로 페이지를 보여줄 때 전체를 복사하지 않습니다.
+
+    deque에서 쓰던 append/appendleft/popleft/clear/len/iter/인덱싱을 그대로 지원합니다.
+    """
+    def __init__(self, tracks=(), block_size=64):
+        self.block_size = block_size
+        self._blocks = []  # [[Track, ...], ...]
+        self._tree = [0]   # 블록 길이의 펜윅 트리 (1-based)
+        self._len = 0
+        self._ids = Counter()  # {video_id: 대기열 안의 개수}
+        self.extend(tracks)
+
+    # --- 인덱스 ---
+
+    def _rebuild_index(self):
+        tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, start=1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update_index(self, block_index, delta):
+        i = block_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _locate(self, position):
+        """전체 위치를 (블록 번호, 블록 안의 오프셋)으로 바꿉니다."""
+        block_index, remaining = 0, position
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = block_index + step
+            if nxt < len(self._tree) and self._tree[nxt] <= remaining:
+                block_index = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return block_index, remaining
+
+    def _normalize(self, position, inserting=False):
+        limit = self._len + 1 if inserting else self._len
+        if position < 0:
+            position += self._len
+        if not 0 <= position < limit:
+            if inserting:
+                return max(0, min(position, self._len))
+            raise IndexError("queue index out of range")
+        return position
+
+    def _split_or_merge(self, block_index):
+        block = self._blocks[block_index]
+        if len(block) > 2 * self.block_size:
+            half = len(block) // 2
+            self._blocks[block_index:block_index + 1] = [block[:half], block[half:]]
+            self._rebuild_index()
+        elif not block:
+            del self._blocks[block_index]
+            self._rebuild_index()
+        elif len(block) < self.block_size // 4 and len(self._blocks) > 1:
+            # 작은 블록이 늘어나 탐색이 느려지지 않도록 이웃 블록과 합칩니다.
+            neighbor = block_index - 1 if block_index > 0 else block_index + 1
+            first, second = sorted((block_index, neighbor))
+            merged = self._blocks[first] + self._blocks[second]
+            self._blocks[first:second + 1] = [merged]
+            if len(merged) > 2 * self.block_size:
+                half = len(merged) // 2
+                self._blocks[first:first + 1] = [merged[:half], merged[half:]]
+            self._rebuild_index()
+
+    # --- 변경 ---
+
+    def insert(self, position, track):
+        position = self._normalize(position, inserting=True)
+        if not self._blocks:
+            self._blocks.append([track])
+            self._rebuild_index()
+        elif position == self._len:
+            self._blocks[-1].append(track)
+            self._update_index(len(self._blocks) - 1, 1)
+            self._split_or_merge(len(self._blocks) - 1)
+        else:
+            block_index, offset = self._locate(position)
+            self._blocks[block_index].insert(offset, track)
+            self._update_index(block_index, 1)
+            self._split_or_merge(block_index)
+        self._len += 1
+        if track.video_id:
+            self._ids[track.video_id] += 1
+
+    def append(self, track):
+        self.insert(self._len, track)
+
+    def appendleft(self, track):
+        self.insert(0, track)
+
+    def extend(self, tracks):
+        for track in tracks:
+            self.append(track)
+
+    def pop(self, position=-1):
+        position = self._normalize(position)
+        block_index, offset = self._locate(position)
+        track = self._blocks[block_index].pop(offset)
+        self._update_index(block_index, -1)
+        self._split_or_merge(block_index)
+        self._len -= 1
+        if track.video_id:
+            self._ids[track.video_id] -= 1
+            if not self._ids[track.video_id]:
+                del self._ids[track.video_id]
+        return track
+
+    def popleft(self):
+        if not self._len:
+            raise IndexError("pop from an empty queue")
+        return self.pop(0)
+
+    def __delitem__(self, position):
+        self.pop(position)
+
+    def move(self, source, destination):
+        """source 위치의 곡을 destination 위치로 옮기고 반환합니다."""
+        track = self.pop(source)
+        self.insert(destination, track)
+        return track
+
+    def discard(self, track):
+        """track(같은 객체)을 찾아 제거합니다. 제거했으면 True."""
+        for position, item in enumerate(self):
+            if item is track:
+                self.pop(position)
+                return True
+        return False
+
+    def remove_if(self, predicate):
+        """predicate(track)가 참인 곡을 모두 제거하고 제거한 개수를 반환합니다."""
+        kept = [track for track in self if not predicate(track)]
+        removed = self._len - len(kept)
+        if removed:
+            self._reset(kept)
+        return removed
+
+    def shuffle(self, rng=random):
+        tracks = list(self)
+        rng.shuffle(tracks)
+        self._reset(tracks)
+
+    def clear(self):
+        self._reset([])
+
+    def _reset(self, tracks):
+        self._blocks = [tracks[i:i + self.block_size] for i in range(0, len(tracks), self.block_size)]
+        self._len = len(tracks)
+        self._ids = Counter(track.video_id for track in tracks if track.video_id)
+        self._rebuild_index()
+
+    # --- 조회 ---
+
+    def has_video(self, video_id):
+        return video_id in self._ids
+
+    def video_ids(self):
+        """대기열에 있는 video id 집합 (읽기 전용 뷰)"""
+        return self._ids.keys()
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            start, stop, step = position.indices(self._len)
+            if step != 1:
+                return list(self)[position]
+            return list(self._iter_from(start, stop - start)) if stop > start else []
+        position = self._normalize(position)
+        block_index, offset = self._locate(position)
+        return self._blocks[block_index][offset]
+
+    def _iter_from(self, start, count):
+        block_index, offset = self._locate(start)
+        first = islice(self._blocks[block_index], offset, None)
+        rest = chain.from_iterable(islice(self._blocks, block_index + 1, None))
+        return islice(chain(first, rest), count)
+
+    def __iter__(self):
+        return chain.from_iterable(self._blocks)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __repr__(self):
+        return f"<TrackQueue len={self._len} blocks={len(self._blocks)}>"
@@ -0,0 +1,141 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from core.metrics import loop_lag_monitor
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCK_THRESHOLD_MS = int(os.getenv('LOOP_BLOCK_THRESHOLD_MS', '100'))  # 0이면 감시하지 않습니다.
+WATCHDOG_STACK_DEPTH = 12  # 기록할 스택 프레임 수 (안쪽부터)
+WATCHDOG_MAX_OFFENDERS = 50  # 위치별 통계를 보관할 최대 개수
+WATCHDOG_RECENT = 20  # 최근 블로킹 기록 수
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IDLE_FILES = ('selectors.py',)  # 루프가 I/O를 기다리는 중이면 블로킹이 아닙니다.
+
+
+def _is_project_frame(frame):
+    filename = os.path.abspath(frame.filename)
+    return filename.startswith(_PROJECT_ROOT + os.sep) and 'site-packages' not in filename
+
+
+def _describe(frame):
+    filename = os.path.abspath(frame.filename)
+    if filename.startswith(_PROJECT_ROOT + os.sep):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+
+class BlockingCallWatchdog:
+    """이벤트 루프를 오래 붙잡는 동기 코드를 찾아내는 감시 스레드
+
+    LoopLagMonitor의 타이머가 threshold 이상 늦어지면 루프가 지금 막혀 있다는 뜻이므로,
+    그 순간 루프 스레드의 스택(sys._current_frames)을 떠서 어느 코드가 막고 있는지 기록합니다.
+    블로킹 위치는 스택에서 가장 안쪽에 있는 프로젝트 코드로 묶어 횟수/시간을 집계합니다.
+    """
+    def __init__(self, monitor=loop_lag_monitor, threshold_ms=LOOP_BLOCK_THRESHOLD_MS,
+                 max_offenders=WATCHDOG_MAX_OFFENDERS, recent=WATCHDOG_RECENT):
+        self.monitor = monitor
+        self.threshold = threshold_ms / 1000
+        self.enabled = threshold_ms > 0
+        self.max_offenders = max_offenders
+        self._offenders = {}  # {signature: {'count', 'total_ms', 'max_ms', 'last_seen', 'stack'}}
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        self.blocks = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        logger.info("[watchdog] Watching event loop for blocks over %.0fms", self.threshold * 1000)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread = None
+
+    def _run(self):
+        poll = max(0.01, self.threshold / 4)
+        pending = None  # (deadline, signature, stack)
+        captured_deadline = None
+        while not self._stopped.wait(poll):
+            deadline = self.monitor.deadline
+            if deadline is None:
+                continue
+            if pending is not None and deadline != pending[0]:
+                # 루프가 다시 돌기 시작했습니다. 막혀 있던 시간은 LoopLagMonitor가 깨어나며 잰 값을 씁니다.
+                # (last_lag를 기록한 뒤에 다음 deadline을 정하므로 deadline이 바뀌었으면 last_lag는 이미 갱신됨)
+                self._record(pending[1], pending[2], self.monitor.last_lag)
+                pending = None
+            if pending is None and deadline != captured_deadline and time.monotonic() - deadline > self.threshold:
+                captured_deadline = deadline
+                stack = self._capture()
+                if stack:
+                    pending = (deadline, self._signature(stack), stack)
+
+    def _capture(self):
+        frame = sys._current_frames().get(self.monitor.thread_id)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame, limit=WATCHDOG_STACK_DEPTH)
+        if stack and os.path.basename(stack[-1].filename) in _IDLE_FILES:
+            return None
+        return stack
+
+    def _signature(self, stack):
+        for frame in reversed(stack):
+            if _is_project_frame(frame) and not frame.filename.endswith('watchdog.py'):
+                return _describe(frame)
+        return _describe(stack[-1])
+
+    def _record(self, signature, stack, blocked_s):
+        blocked_ms = blocked_s * 1000
+        with self._lock:
+            self.blocks += 1
+            offender = self._offenders.get(signature)
+            first = offender is None
+            if first:
+                if len(self._offenders) >= self.max_offenders:
+                    oldest = min(self._offenders, key=lambda key: self._offenders[key]['last_seen'])
+                    del self._offenders[oldest]
+                offender = self._offenders[signature] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_seen': 0.0, 'stack': None}
+            offender['count'] += 1
+            offender['total_ms'] += blocked_ms
+            offender['max_ms'] = max(offender['max_ms'], blocked_ms)
+            offender['last_seen'] = time.time()
+            offender['stack'] = [_describe(frame) for frame in stack]
+            self._recent.append({'at': time.time(), 'blocked_ms': blocked_ms, 'signature': signature})
+        if first:
+            # 처음 보는 위치는 스택 전체를 남깁니다.
+            logger.warning("[watchdog] Event loop blocked for %.0f ms at %s\n%s",
+                           blocked_ms, signature, ''.join(traceback.format_list(stack)).rstrip())
+        else:
+            logger.warning("[watchdog] Event loop blocked for %.0f ms at %s", blocked_ms, signature)
+
+    def stats(self, top=10):
+        with self._lock:
+            offenders = sorted(self._offenders.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+            return {
+                'enabled': self.enabled,
+                'threshold_ms': self.threshold * 1000,
+                'blocks': self.blocks,
+                'last_lag_ms': self.monitor.last_lag * 1000,
+                'max_lag_ms': self.monitor.max_lag * 1000,
+                'offenders': [{'signature': signature, **offender} for signature, offender in offenders],
+                'recent': list(self._recent),
+            }
+
+
+# 프로세스 전역 감시자 (main.py의 on_ready에서 시작)
+loop_watchdog = BlockingCallWatchdog()
@@ -8,13 +8,23 @@ import os
 load_dotenv()
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 
-logging.basicConfig(level=logging.DEBUG, format='[%(asctime)s] %(levelname)s: %(message)s')
+from core.logs import setup_logging
 
-logging.getLogger('discord').setLevel(logging.WARNING)
-logging.getLogger('discord.http').setLevel(logging.WARNING)
-logging.getLogger('yt_dlp').setLevel(logging.WARNING)
+# 로그는 큐에 넣고 백그라운드 스레드가 출력합니다. 레벨/형식은 LOG_* 환경 변수로 조정합니다.
+setup_logging()
 
-bot = discord.Bot()
+from core.shard import SHARD_COUNT, SHARD_IDS, SHARD_NAME, ShardReporter
+from core.shared_store import shared_store
+from core.metrics import METRICS_PORT, MetricsServer, loop_lag_monitor
+from core.watchdog import loop_watchdog
+
+if SHARD_COUNT:
+    # supervisor.py가 띄운 샤드 프로세스. 맡은 샤드의 길드만 이 프로세스의 MusicCog가 관리합니다.
+    bot = discord.AutoShardedBot(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
+else:
+    bot = discord.Bot()
+shard_reporter = ShardReporter(bot, shared_store) if SHARD_COUNT and shared_store else None
+metrics_server = MetricsServer(bot) if METRICS_PORT else None
 
 @bot.event
 async def on_ready():
@@ -26,6 +36,16 @@ async def on_ready():
         vc_mod = 'discord.voice_client (import failed)'
     logging.info(f'Logged in as {bot.user}')
     logging.info(f'Pycord version={getattr(discord, "__version__", "unknown")} voice_module={vc_mod}')
+    if shard_reporter:
+        logging.info(f'{SHARD_NAME} running shards {SHARD_IDS} of {SHARD_COUNT}')
+        shard_reporter.start()
+    loop_lag_monitor.start()
+    loop_watchdog.start()
+    if metrics_server:
+        try:
+            await metrics_server.start()
+        except OSError as e:
+            logging.error(f'Failed to start metrics endpoint on port {METRICS_PORT}: {e}')
 
 # Cogs 로딩: cogs 폴더에 있는 모든 .py 파일을 자동으로 로드합니다.
 for filename in os.listdir('./cogs'):
@@ -0,0 +1,231 @@
+"""샤드 프로세스를 띄우고 상태를 모으는 감독 프로세스
+
+    python supervisor.py --processes 2 --shards 4
+
+샤드 N개를 프로세스 P개에 나눠 맡기고(각 프로세스는 main.py를 AutoShardedBot으로 실행),
+공유 저장소(SQLite)에 기록된 상태로 죽었거나 응답이 없는 프로세스를 재시작하며 전체 지표를 합산합니다.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.logs import setup_logging
+from core.player import backoff_delay
+from core.shard import SHARD_STATUS_INTERVAL
+from core.shared_store import SHARED_STORE_WRITE_TIMEOUT, SharedStore
+
+setup_logging()
+logger = logging.getLogger('supervisor')
+
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', '2'))
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0'))  # 0이면 프로세스 수와 같게
+SHARED_STORE_PATH = os.getenv('SHARED_STORE_PATH', './data/shared.sqlite3')
+SUPERVISOR_STATUS_PATH = os.getenv('SUPERVISOR_STATUS_PATH', './data/shards.json')
+STARTUP_GRACE = 120.0  # 로그인/샤드 연결에 걸리는 시간. 이 동안은 상태 보고가 없어도 기다립니다.
+STALE_AFTER = SHARD_STATUS_INTERVAL * 4  # 상태 보고가 이보다 오래 없으면 응답 없음으로 보고 재시작
+IDENTIFY_STAGGER = 5.0  # Discord identify 제한에 걸리지 않도록 프로세스 시작 간격(초)
+
+# 합산해서 보여줄 지표 (metrics 딕셔너리 안의 경로)
+_SUMMED_METRICS = {
+    'guilds': ('guilds',),
+    'voice_clients': ('voice_clients',),
+    'active_players': ('active_players',),
+    'queued_tracks': ('queued_tracks',),
+    'extract_completed': ('extraction', 'completed'),
+    'extract_failed': ('extraction', 'failed'),
+    'extract_queue_depth': ('extraction', 'queue_depth'),
+    'stream_cache_hits': ('stream_cache', 'hits'),
+    'stream_cache_shared_hits': ('stream_cache', 'shared_hits'),
+    'stream_cache_misses': ('stream_cache', 'misses'),
+    'search_cache_hits': ('search_cache', 'hits'),
+    'search_cache_shared_hits': ('search_cache', 'shared_hits'),
+    'search_cache_misses': ('search_cache', 'misses'),
+    'gapless_transitions': ('gaps', 'gapless'),
+    'fallback_transitions': ('gaps', 'fallback'),
+}
+
+
+class ShardProcess:
+    """샤드 프로세스 하나 (main.py)"""
+    def __init__(self, index, shard_ids, shard_count, processes, store_path):
+        self.index = index
+        self.name = f'shard-{index}'
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.processes = processes
+        self.store_path = store_path
+        self.proc = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start_at = 0.0
+
+    def env(self):
+        env = dict(os.environ)
+        env.update({
+            'SHARD_NAME': self.name,
+            'SHARD_COUNT': str(self.shard_count),
+            'SHARD_IDS': ','.join(map(str, self.shard_ids)),
+            'SHARED_STORE_PATH': self.store_path,
+        })
+        # 프로세스마다 따로 쓰는 파일은 경로를 나눕니다. (공유가 필요한 값은 공유 저장소로 주고받음)
+        loudness_path = env.get('LOUDNESS_CACHE_PATH', './data/loudness.json')
+        root, ext = os.path.splitext(loudness_path)
+        env['LOUDNESS_CACHE_PATH'] = f'{root}-{self.name}{ext}'
+        if int(env.get('METRICS_PORT', '0')):
+            # 프로세스마다 지표 엔드포인트 포트를 하나씩 밀어서 씁니다.
+            env['METRICS_PORT'] = str(int(env['METRICS_PORT']) + self.index)
+        if env.get('AUDIO_CACHE_DIR'):
+            env['AUDIO_CACHE_DIR'] = os.path.join(env['AUDIO_CACHE_DIR'], self.name)
+            budget = int(env.get('AUDIO_CACHE_MAX_MB', '2048'))
+            env['AUDIO_CACHE_MAX_MB'] = str(max(1, budget // self.processes))
+        return env
+
+    def start(self):
+        logger.info("Starting %s (shards %s of %s)", self.name, self.shard_ids, self.shard_count)
+        self.proc = subprocess.Popen([sys.executable, 'main.py'], env=self.env())
+        self.started_at = time.time()
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def stop(self, timeout=20.0):
+        if not self.alive():
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class Supervisor:
+    def __init__(self, processes, shard_count, store_path=SHARED_STORE_PATH, status_path=SUPERVISOR_STATUS_PATH):
+        shard_count = shard_count or processes
+        if processes > shard_count:
+            raise ValueError("Number of processes cannot exceed the number of shards")
+        # 이벤트 루프가 없는 프로세스이므로 잠금을 길게 기다려도 됩니다.
+        self.store = SharedStore(store_path, busy_timeout=SHARED_STORE_WRITE_TIMEOUT)
+        self.status_path = status_path
+        self.shards = [
+            ShardProcess(i, [s for s in range(shard_count) if s % processes == i], shard_count, processes, store_path)
+            for i in range(processes)
+        ]
+        self._stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        now = time.time()
+        for shard in self.shards:
+            shard.next_start_at = now + shard.index * IDENTIFY_STAGGER
+        try:
+            while not self._stopping:
+                self._check_processes()
+                self._report()
+                self.store.purge_expired()
+                self._sleep(SHARD_STATUS_INTERVAL)
+        finally:
+            logger.info("Stopping shard processes")
+            for shard in self.shards:
+                shard.stop()
+            self.store.shutdown()
+
+    def _sleep(self, seconds):
+        deadline = time.time() + seconds
+        while not self._stopping and time.time() < deadline:
+            time.sleep(min(1.0, deadline - time.time()))
+            self._check_processes()
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _check_processes(self):
+        now = time.time()
+        statuses = {name: status for name, status, _ in self.store.items('shard_status')}
+        for shard in self.shards:
+            if shard.alive():
+                status = statuses.get(shard.name)
+                reported_at = status['reported_at'] if status and status.get('pid') == shard.proc.pid else 0.0
+                if now - shard.started_at > STARTUP_GRACE and now - max(reported_at, shard.started_at) > STALE_AFTER:
+                    logger.warning("%s has not reported for %.0fs. Restarting.", shard.name, STALE_AFTER)
+                    shard.stop()
+                    self._schedule_restart(shard)
+                continue
+            if shard.proc is not None:
+                code = shard.proc.returncode
+                shard.proc = None
+                logger.warning("%s exited with code %s", shard.name, code)
+                self._schedule_restart(shard)
+            if now >= shard.next_start_at:
+                shard.start()
+
+    def _schedule_restart(self, shard):
+        shard.restarts += 1
+        # 금방 다시 죽는 프로세스가 계속 재시작되지 않도록 짧게 살았을수록 오래 기다립니다.
+        failures = shard.restarts if time.time() - shard.started_at < STARTUP_GRACE else 1
+        shard.next_start_at = time.time() + backoff_delay(failures, base=IDENTIFY_STAGGER, cap=300.0)
+
+    def _report(self):
+        statuses = {name: status for name, status, _ in self.store.items('shard_status')}
+        totals = dict.fromkeys(_SUMMED_METRICS, 0)
+        shards = {}
+        for shard in self.shards:
+            status = statuses.get(shard.name)
+            healthy = shard.alive() and status is not None and status.get('pid') == shard.proc.pid \
+                and time.time() - status['reported_at'] <= STALE_AFTER
+            shards[shard.name] = {
+                'pid': shard.proc.pid if shard.alive() else None,
+                'shard_ids': shard.shard_ids,
+                'healthy': healthy,
+                'ready': bool(status and status.get('ready')),
+                'restarts': shard.restarts,
+                'metrics': status.get('metrics') if status else None,
+            }
+            if healthy:
+                for key, path in _SUMMED_METRICS.items():
+                    value = status['metrics']
+                    for part in path:
+                        value = (value or {}).get(part)
+                    totals[key] += value or 0
+        healthy_count = sum(1 for info in shards.values() if info['healthy'])
+        logger.info(
+            "Shards healthy=%s/%s guilds=%s voice=%s playing=%s queued=%s extract_failed=%s",
+            healthy_count, len(self.shards), totals['guilds'], totals['voice_clients'],
+            totals['active_players'], totals['queued_tracks'], totals['extract_failed']
+        )
+        self._write_status({'updated_at': time.time(), 'healthy': healthy_count, 'totals': totals, 'shards': shards})
+
+    def _write_status(self, snapshot):
+        directory = os.path.dirname(self.status_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.shards-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.status_path)
+        except Exception as e:
+            os.unlink(tmp_path)
+            logger.error("Failed to write %s: %s", self.status_path, e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=SHARD_PROCESSES, help='샤드 프로세스 수')
+    parser.add_argument('--shards', type=int, default=SHARD_COUNT, help='전체 Discord 샤드 수 (기본: 프로세스 수)')
+    args = parser.parse_args()
+    Supervisor(args.processes, args.shards).run()
+
+
+if __name__ == '__main__':
+    main()
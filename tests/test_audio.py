@@ -0,0 +1,56 @@
+from core.audio import GaplessStream, PrimedSource
+from core.track import Track
+
+
+class FakeSource:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.cleaned = False
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else b''
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+def primed(video_id, frames, on_cleanup=None):
+    source = PrimedSource(FakeSource(frames), Track.from_video_id(video_id, video_id), on_cleanup)
+    source.prime()
+    return source
+
+
+def test_transition_happens_within_one_read():
+    transitions, cleanups = [], []
+    first = primed('a', [b'a1', b'a2'], lambda played, ended: cleanups.append(('a', ended)))
+    second = primed('b', [b'b1'])
+    stream = GaplessStream(first, lambda done, upcoming: transitions.append((done.video_id, upcoming.video_id)), crossfade_ms=0)
+    assert stream.set_next(second) is None
+    assert [stream.read(), stream.read()] == [b'a1', b'a2']
+    # 현재 곡이 끝나는 read()에서 곧바로 다음 곡의 첫 프레임을 돌려줍니다.
+    assert stream.read() == b'b1'
+    assert transitions == [('a', 'b')] and cleanups == [('a', True)]
+    assert stream.song.video_id == 'b' and stream.frames_read == 1
+    assert stream.read() == b''
+
+
+def test_set_next_returns_replaced_source():
+    stream = GaplessStream(primed('a', [b'a1']), lambda done, upcoming: None, crossfade_ms=0)
+    second, third = primed('b', [b'b1']), primed('c', [b'c1'])
+    stream.set_next(second)
+    assert stream.set_next(third) is second
+    assert stream.peek_next_song().video_id == 'c'
+    assert stream.clear_next() is third and stream.peek_next_song() is None
+
+
+def test_cleanup_keeps_armed_next_source():
+    first, second = primed('a', [b'a1']), primed('b', [b'b1'])
+    stream = GaplessStream(first, lambda done, upcoming: None, crossfade_ms=0)
+    stream.set_next(second)
+    # 음성 플레이어는 after 콜백 전에 cleanup()을 부르므로 장전된 곡은 after 콜백이 꺼내 씁니다.
+    stream.cleanup()
+    assert first.source.cleaned and not second.source.cleaned
+    assert stream.clear_next() is second
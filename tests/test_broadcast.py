@@ -0,0 +1,60 @@
+import threading
+
+from core.broadcast import Broadcaster
+
+
+class FakeOpusSource:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.cleaned = threading.Event()
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else b''
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.cleaned.set()
+
+
+def read_packets(listener, count):
+    packets = []
+    while len(packets) < count:
+        packet = listener.read()
+        assert packet != b''
+        if packet.startswith(b'frame'):
+            packets.append(packet)
+    return packets
+
+
+def test_listeners_share_the_same_packets():
+    idle = threading.Event()
+    broadcaster = Broadcaster('test', on_idle=idle.set)
+    first, second = broadcaster.listener(), broadcaster.listener()
+    source = FakeOpusSource(b'frame%d' % i for i in range(10))
+    broadcaster.play(source)
+    broadcaster.start()
+    try:
+        one, two = read_packets(first, 10), read_packets(second, 10)
+        assert one == two == [b'frame%d' % i for i in range(10)]
+        # 같은 bytes 객체를 나눠 가지므로 청취자가 늘어도 복사하지 않습니다.
+        assert all(a is b for a, b in zip(one, two))
+        assert idle.wait(2) and source.cleaned.wait(2)
+        assert broadcaster.stats()['encoded'] == 0
+    finally:
+        broadcaster.stop()
+
+
+def test_stop_ends_listeners_and_cleans_pending_source():
+    broadcaster = Broadcaster('test')
+    listener = broadcaster.listener()
+    assert broadcaster.stats()['listeners'] == 1
+    source = FakeOpusSource([])
+    broadcaster.play(source)
+    broadcaster.stop()
+    assert source.cleaned.is_set()
+    assert listener.read() == b''
+    listener.cleanup()
+    listener.cleanup()
+    assert broadcaster.stats()['listeners'] == 0
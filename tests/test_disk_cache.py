@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+
+from core.disk_cache import INDEX_NAME, AudioDiskCache
+from core.ffmpeg import build_ffmpeg_options
+
+WEBM = {'ext': 'webm', 'container': 'webm_dash', 'acodec': 'opus', 'abr': 130, 'asr': 48000}
+STREAM_URL = 'https://rr1.googlevideo.com/videoplayback?itag=251'
+
+
+async def fill(cache, video_id, size):
+    capture = cache.start_capture(video_id, STREAM_URL, WEBM, 200)
+    assert capture is not None and capture.keep
+    with open(capture.path, 'wb') as f:
+        f.write(b'\0' * size)
+    return await cache.finish_capture(capture, complete=True)
+
+
+def test_recover_rebuilds_broken_index(tmp_path):
+    (tmp_path / 'kept.webm').write_bytes(b'a' * 10)
+    (tmp_path / 'half.webm.part').write_bytes(b'b' * 10)
+    (tmp_path / 'notes.txt').write_bytes(b'c')
+    (tmp_path / INDEX_NAME).write_text('{broken', encoding='utf-8')
+
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=1000, flush_delay=60)
+        await cache.load()
+        try:
+            assert not (tmp_path / 'half.webm.part').exists()
+            assert cache.lookup('kept')['path'] == str(tmp_path / 'kept.webm')
+            assert cache.lookup('half') is None
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
+    # 복구한 인덱스는 종료할 때 다시 저장됩니다.
+    index = json.loads((tmp_path / INDEX_NAME).read_text(encoding='utf-8'))
+    assert set(index) == {'kept'} and index['kept']['hits'] == 1
+
+
+def test_index_entries_without_file_are_dropped(tmp_path):
+    (tmp_path / 'a.webm').write_bytes(b'a' * 10)
+    index = {
+        'a': {'file': 'a.webm', 'size': 10, 'format': WEBM, 'duration': 200, 'last_access': 1, 'hits': 3},
+        'gone': {'file': 'gone.webm', 'size': 10, 'format': WEBM, 'duration': 200, 'last_access': 1, 'hits': 3},
+    }
+    (tmp_path / INDEX_NAME).write_text(json.dumps(index), encoding='utf-8')
+
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=1000)
+        await cache.load()
+        try:
+            assert cache.stats()['entries'] == 1
+            assert cache.lookup('a')['duration'] == 200
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
+
+
+def test_lru_evicts_least_recently_played(tmp_path):
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=25, policy='lru', flush_delay=60)
+        await cache.load()
+        try:
+            await fill(cache, 'a', 10)
+            await fill(cache, 'b', 10)
+            cache.lookup('a')
+            path = await fill(cache, 'c', 10)
+            assert path == str(tmp_path / 'c.webm') and os.path.exists(path)
+            assert cache.lookup('b') is None and not (tmp_path / 'b.webm').exists()
+            assert cache.lookup('a') is not None
+            assert cache.stats()['evictions'] == 1 and cache.total_bytes() == 20
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
+
+
+def test_lfu_evicts_least_frequently_played(tmp_path):
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=25, policy='lfu', flush_delay=60)
+        await cache.load()
+        try:
+            await fill(cache, 'a', 10)
+            await fill(cache, 'b', 10)
+            cache.lookup('a')
+            cache.lookup('a')
+            cache.lookup('b')
+            await fill(cache, 'c', 10)
+            # c는 방금 들어왔지만 재생 횟수가 가장 적습니다.
+            assert cache.lookup('c') is None
+            assert cache.lookup('a') is not None and cache.lookup('b') is not None
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
+
+
+def test_incomplete_capture_is_removed(tmp_path):
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=1000)
+        await cache.load()
+        try:
+            capture = cache.start_capture('a', STREAM_URL, WEBM, 200)
+            assert cache.start_capture('a', STREAM_URL, WEBM, 200) is None  # 이미 저장 중
+            with open(capture.path, 'wb') as f:
+                f.write(b'half')
+            assert not capture.is_complete(100) and capture.is_complete(199)
+            assert await cache.finish_capture(capture, complete=False) is None
+            assert not os.path.exists(capture.path) and cache.lookup('a') is None
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
+
+
+def test_capture_is_skipped_for_cached_or_unsupported_tracks(tmp_path):
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=1000)
+        await cache.load()
+        try:
+            await fill(cache, 'a', 10)
+            assert cache.start_capture('a', STREAM_URL, WEBM, 200) is None
+            assert cache.start_capture('b', STREAM_URL, WEBM, 5000) is None  # 너무 긴 곡
+            assert cache.start_capture('b', STREAM_URL, {'ext': 'mp3', 'acodec': 'mp3'}, 200) is None
+            # 이미 캐시된 곡도 측정용으로는 임시 디렉터리에 저장합니다.
+            capture = cache.start_capture('a', STREAM_URL, WEBM, 200, measure=True)
+            assert not capture.keep and capture.path.startswith(cache.capture_directory)
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
+
+
+def test_capture_output_comes_before_playback_output(tmp_path):
+    async def main():
+        cache = AudioDiskCache(str(tmp_path), max_bytes=1000)
+        await cache.load()
+        try:
+            capture = cache.start_capture('a', STREAM_URL, WEBM, 200)
+            options = build_ffmpeg_options(WEBM, gain_db=None, capture=capture)['options']
+            # 재생 출력(pipe:1)에는 py-cord가 입력 뒤에 넣은 PCM 출력 옵션을 다시 지정합니다.
+            assert options.startswith(f'-y -map 0:a:0 -c:a copy -f webm {capture.path} -f s16le -ar 48000 -ac 2 -vn')
+            # passthrough면 py-cord가 넣은 -c:a copy를 저장 출력이 쓰고, 재생 출력에는 Opus 출력 옵션을 다시 지정합니다.
+            options = build_ffmpeg_options(WEBM, gain_db=0.0, capture=capture, passthrough=True)['options']
+            assert options.startswith(f'-y -map 0:a:0 -f webm {capture.path} -map_metadata -1 -f opus -c:a copy')
+        finally:
+            cache.shutdown()
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+import core.extractor
+from core.extractor import ExtractionEngine, ExtractionQueueFull, _run_next_page
+from core.scheduler import PRIORITY_INTERACTIVE, RequestScheduler
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # 워커가 닫힐 때 cookiefile(./cookies.txt)을 저장하므로 임시 디렉터리에서 실행합니다.
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = RequestScheduler(rate=1000, burst=100)
+    monkeypatch.setattr(core.extractor, 'youtube_scheduler', scheduler)
+    return scheduler
+
+
+async def wait_until(predicate):
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError('condition not reached')
+
+
+def blocking(release):
+    release.wait(5)
+    return 'done'
+
+
+def test_full_queue_is_rejected_before_taking_a_token(scheduler):
+    async def main():
+        engine = ExtractionEngine(workers=1, mode='thread', max_waiting=1)
+        release = threading.Event()
+        try:
+            running = asyncio.create_task(engine._submit(PRIORITY_INTERACTIVE, None, 'test', blocking, release))
+            await wait_until(lambda: engine.active == 1)
+            queued = asyncio.create_task(engine._submit(PRIORITY_INTERACTIVE, None, 'test', blocking, release))
+            await wait_until(lambda: engine.waiting == 1)
+            with pytest.raises(ExtractionQueueFull):
+                await engine._submit(PRIORITY_INTERACTIVE, None, 'test', blocking, release)
+            assert engine.rejected == 1
+            assert scheduler.granted[PRIORITY_INTERACTIVE] == 2
+            release.set()
+            assert await running == 'done' and await queued == 'done'
+            assert engine.completed == 2 and engine.active == 0 and engine.waiting == 0
+        finally:
+            release.set()
+            engine.shutdown()
+    asyncio.run(main())
+
+
+def test_token_is_refunded_when_queue_fills_while_waiting(monkeypatch):
+    scheduler = RequestScheduler(rate=1e-9, burst=2)
+    monkeypatch.setattr(core.extractor, 'youtube_scheduler', scheduler)
+
+    async def main():
+        engine = ExtractionEngine(workers=1, mode='thread', max_waiting=1)
+        release = threading.Event()
+        try:
+            running = asyncio.create_task(engine._submit(PRIORITY_INTERACTIVE, None, 'test', blocking, release))
+            await wait_until(lambda: engine.active == 1)
+            scheduler.tokens = 0
+            # 두 요청 모두 대기열이 비어 있을 때 토큰을 기다리기 시작합니다.
+            second = asyncio.create_task(engine._submit(PRIORITY_INTERACTIVE, None, 'test', blocking, release))
+            third = asyncio.create_task(engine._submit(PRIORITY_INTERACTIVE, None, 'test', blocking, release))
+            await asyncio.sleep(0.01)
+            assert engine.waiting == 0
+            scheduler.tokens = 2
+            scheduler._schedule_dispatch(reset=True)
+            # 먼저 토큰을 받은 요청이 워커 슬롯을 기다리는 사이 대기열이 차서 나중 요청은 토큰을 돌려줍니다.
+            with pytest.raises(ExtractionQueueFull):
+                await third
+            assert engine.waiting == 1 and engine.rejected == 1
+            assert scheduler.granted[PRIORITY_INTERACTIVE] == 2
+            assert scheduler.tokens == pytest.approx(1, abs=1e-3)
+            release.set()
+            assert await running == 'done' and await second == 'done'
+        finally:
+            release.set()
+            engine.shutdown()
+    asyncio.run(main())
+
+
+def test_failed_extraction_releases_its_slot(scheduler):
+    def fail():
+        raise RuntimeError('boom')
+
+    async def main():
+        engine = ExtractionEngine(workers=1, mode='thread', max_waiting=1)
+        try:
+            with pytest.raises(RuntimeError):
+                await engine._submit(PRIORITY_INTERACTIVE, None, 'test', fail)
+            assert engine.failed == 1 and engine.active == 0
+            assert await engine._submit(PRIORITY_INTERACTIVE, None, 'test', lambda: 'ok') == 'ok'
+        finally:
+            engine.shutdown()
+    asyncio.run(main())
+
+
+def test_unknown_mode_and_profile_are_rejected(scheduler):
+    with pytest.raises(ValueError):
+        ExtractionEngine(mode='fiber')
+    with pytest.raises(ValueError):
+        asyncio.run(ExtractionEngine(workers=1).extract('nope', 'https://example.com'))
+
+
+def test_page_end_counts_unavailable_entries():
+    entries = iter([{'id': 'a', 'title': 'A'}, None, {'id': 'b', 'title': 'B'}, {'id': 'c', 'title': 'C'}])
+    # 볼 수 없는 항목(None)이 걸러져 두 곡만 남아도 원래 3개를 받았으므로 끝이 아닙니다.
+    assert _run_next_page(entries, 3) == ([{'id': 'a', 'title': 'A'}, {'id': 'b', 'title': 'B'}], False)
+    assert _run_next_page(entries, 3) == ([{'id': 'c', 'title': 'C'}], True)
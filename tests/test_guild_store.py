@@ -0,0 +1,78 @@
+import asyncio
+
+from core.guild_store import GuildStateStore
+
+
+def test_changes_are_batched_and_snapshotted_lazily(tmp_path):
+    calls = []
+
+    def snapshot_for(guild_id):
+        def snapshot():
+            calls.append(guild_id)
+            return {'queue': [guild_id], 'voice_channel_id': guild_id * 10}
+        return snapshot
+
+    async def main():
+        store = GuildStateStore(str(tmp_path / 'guilds.sqlite3'), flush_delay=0.01)
+        try:
+            for _ in range(3):
+                for guild_id in (1, 2, 3):
+                    store.mark_dirty(guild_id, snapshot_for(guild_id))
+            assert calls == []  # 스냅샷은 모아서 쓸 때 한 번만 만듭니다.
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if store.stats()['batches']:
+                    break
+            stats = store.stats()
+            assert stats['batches'] == 1 and stats['rows_written'] == 3 and stats['pending'] == 0
+            assert sorted(calls) == [1, 2, 3]
+            assert await store.load(2) == {'queue': [2], 'voice_channel_id': 20}
+            assert sorted(await store.resumable_guilds()) == [(1, 10), (2, 20), (3, 30)]
+        finally:
+            store.shutdown()
+    asyncio.run(main())
+
+
+def test_load_prefers_unwritten_snapshot(tmp_path):
+    async def main():
+        store = GuildStateStore(str(tmp_path / 'guilds.sqlite3'), flush_delay=60)
+        try:
+            store._write([(1, {'queue': ['old']})])
+            store.mark_dirty(1, lambda: {'queue': ['new']})
+            assert await store.load(1) == {'queue': ['new']}
+            assert await store.load(2) is None
+        finally:
+            store.shutdown()
+    asyncio.run(main())
+
+
+def test_shutdown_writes_pending_changes(tmp_path):
+    path = str(tmp_path / 'guilds.sqlite3')
+
+    async def write():
+        store = GuildStateStore(path, flush_delay=60)
+        store.mark_dirty(1, lambda: {'queue': ['a'], 'voice_channel_id': None})
+        store.shutdown()
+
+    async def read():
+        store = GuildStateStore(path, flush_delay=60)
+        try:
+            data = await store.load(1)
+            assert data == {'queue': ['a'], 'voice_channel_id': None}
+            assert store.stats()['restored'] == 1
+            assert await store.resumable_guilds() == []  # 음성 채널에 없던 길드는 이어 재생하지 않습니다.
+        finally:
+            store.shutdown()
+
+    asyncio.run(write())
+    asyncio.run(read())
+
+
+def test_disabled_store_is_a_no_op():
+    async def main():
+        store = GuildStateStore('')
+        store.mark_dirty(1, lambda: {})
+        assert await store.load(1) is None
+        assert await store.resumable_guilds() == []
+        store.shutdown()
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+from core.history import BloomFilter, PlayedHistory
+
+
+def played(history, count, start=0):
+    for i in range(start, start + count):
+        history.append(f'v{i}')
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1024, 5)
+    for i in range(100):
+        bloom.add(f'v{i}')
+    assert all(f'v{i}' in bloom for i in range(100))
+    assert bloom.count == 100
+
+
+def test_false_positive_rate_near_target():
+    history = PlayedHistory(capacity=2000, false_positive=0.01)
+    played(history, 2000)
+    false_positives = sum(f'other{i}' in history for i in range(10000))
+    assert false_positives < 10000 * 0.03
+
+
+def test_rotation_forgets_oldest_generation():
+    history = PlayedHistory(capacity=10, recent=3)
+    played(history, 5)
+    played(history, 5, start=5)  # 두 번째 세대에 들어가도 첫 세대는 previous로 남습니다.
+    assert all(f'v{i}' in history for i in range(10))
+    played(history, 5, start=10)  # 두 번 교체되면 첫 세대는 잊힙니다.
+    assert all(f'v{i}' in history for i in range(5, 15))
+    assert not any(f'v{i}' in history for i in range(5))
+    assert len(history) == 10
+
+
+def test_recent_ring_keeps_order():
+    history = PlayedHistory(capacity=10, recent=3)
+    played(history, 5)
+    assert list(history) == ['v2', 'v3', 'v4']
+
+
+def test_size_stays_fixed():
+    history = PlayedHistory(capacity=100)
+    nbytes = history.nbytes
+    played(history, 1000)
+    assert history.nbytes == nbytes
+
+
+def test_record_round_trip():
+    history = PlayedHistory(capacity=10, recent=3)
+    played(history, 8)
+    restored = PlayedHistory(capacity=10, recent=3)
+    restored.restore(history.to_record())
+    assert all(f'v{i}' in restored for i in range(8))
+    assert list(restored) == list(history)
+    assert len(restored) == len(history)
+    # 복원한 뒤에도 같은 시점에 세대가 교체됩니다.
+    played(history, 2, start=8)
+    played(restored, 2, start=8)
+    assert history.to_record() == restored.to_record()
+
+
+def test_restore_legacy_list():
+    history = PlayedHistory(capacity=10, recent=3)
+    history.restore(['a', 'b', 'c', 'd'])
+    assert 'a' in history and 'd' in history
+    assert list(history) == ['b', 'c', 'd']
+
+
+def test_restore_with_changed_size_keeps_recent_only():
+    old = PlayedHistory(capacity=10, recent=3)
+    played(old, 6)
+    history = PlayedHistory(capacity=100, recent=3)
+    history.restore(old.to_record())
+    assert list(history) == ['v3', 'v4', 'v5']
+    assert 'v3' in history and 'v0' not in history
+    assert len(history) == 3
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+import core.ffmpeg
+from core.ffmpeg import GAIN_EPSILON_DB, LOUDNORM_FILTER, audio_filter, build_ffmpeg_options, can_passthrough
+from core.loudness import MAX_GAIN_DB, TARGET_I, LoudnessAnalyzer, LoudnessCache, static_gain_db
+
+OPUS = {'ext': 'webm', 'container': 'webm_dash', 'acodec': 'opus', 'asr': 48000}
+
+
+def test_static_gain_targets_integrated_loudness():
+    assert static_gain_db({'input_i': -20.0, 'input_tp': -10.0}) == pytest.approx(TARGET_I + 20.0)
+    assert static_gain_db({'input_i': -10.0, 'input_tp': -1.0}) == pytest.approx(-6.0)
+
+
+def test_static_gain_is_limited_by_true_peak_and_range():
+    # 4dB를 올리면 트루 피크가 -1.5dBTP를 넘으므로 0.5dB까지만 올립니다.
+    assert static_gain_db({'input_i': -20.0, 'input_tp': -2.0}) == pytest.approx(0.5)
+    assert static_gain_db({'input_i': -60.0, 'input_tp': -50.0}) == MAX_GAIN_DB
+    assert static_gain_db({'input_i': 5.0, 'input_tp': 0.0}) == -MAX_GAIN_DB
+
+
+def test_audio_filter():
+    assert audio_filter(None) == LOUDNORM_FILTER
+    assert audio_filter(GAIN_EPSILON_DB / 2) is None
+    assert audio_filter(-3.456) == 'volume=-3.46dB'
+
+
+def test_build_ffmpeg_options_uses_static_gain():
+    options = build_ffmpeg_options(OPUS, fast_start=True, gain_db=-4.0)
+    assert options['options'] == '-vn -af volume=-4.00dB'
+    assert '-f webm' in options['before_options'] and '-reconnect 1' in options['before_options']
+    assert build_ffmpeg_options(OPUS, gain_db=None)['options'] == f'-vn -af {LOUDNORM_FILTER}'
+    assert build_ffmpeg_options(OPUS, gain_db=0.1)['options'] == '-vn'
+    assert build_ffmpeg_options(OPUS, gain_db=None, normalize=False)['options'] == '-vn'
+    assert '-reconnect' not in build_ffmpeg_options(OPUS, local=True)['before_options']
+
+
+def test_can_passthrough_needs_measured_gain(monkeypatch):
+    monkeypatch.setattr(core.ffmpeg, 'OPUS_PASSTHROUGH', True)
+    assert can_passthrough(OPUS, 0.2)
+    assert not can_passthrough(OPUS, None)
+    assert not can_passthrough(OPUS, -5.0)
+    assert can_passthrough(OPUS, None, normalize=False)
+    assert not can_passthrough({'ext': 'm4a', 'acodec': 'mp4a.40.2'}, 0.0)
+
+
+def test_cache_round_trip_and_size_limit(tmp_path):
+    path = tmp_path / 'loudness.json'
+    cache = LoudnessCache(str(path), max_entries=2)
+    for video_id in ('a', 'b', 'c'):
+        cache.put(video_id, {'input_i': -14.0, 'input_tp': -1.0})
+    assert cache.get('a') is None and cache.get('c') is not None
+    cache.flush()
+    assert set(json.loads(path.read_text(encoding='utf-8'))) == {'b', 'c'}
+    reloaded = LoudnessCache(str(path), max_entries=2)
+    assert 'b' in reloaded and reloaded.get('c') == {'input_i': -14.0, 'input_tp': -1.0}
+    assert reloaded.stats() == {'size': 2, 'hits': 1, 'misses': 0}
+
+
+def test_unreadable_cache_file_is_ignored(tmp_path):
+    path = tmp_path / 'loudness.json'
+    path.write_text('{broken', encoding='utf-8')
+    assert LoudnessCache(str(path)).stats()['size'] == 0
+
+
+def test_cache_falls_back_to_shared_backend(tmp_path):
+    class Backend:
+        def __init__(self):
+            self.stored = {('loudness', 'a'): {'input_i': -20.0, 'input_tp': -6.0}}
+
+        async def get_async(self, kind, key):
+            return self.stored.get((kind, key))
+
+        def put(self, kind, key, value):
+            self.stored[(kind, key)] = value
+
+    backend = Backend()
+    cache = LoudnessCache(str(tmp_path / 'loudness.json'), backend=backend)
+    assert cache.get('a') is None
+    assert asyncio.run(cache.get_async('a'))['input_i'] == -20.0
+    assert 'a' in cache  # 공유 저장소에서 찾은 값은 로컬에도 둡니다.
+    cache.put('b', {'input_i': -14.0, 'input_tp': -1.0})
+    assert ('loudness', 'b') in backend.stored
+
+
+def test_analyzer_only_measures_local_files(tmp_path):
+    async def main():
+        cache = LoudnessCache(str(tmp_path / 'loudness.json'))
+        cache.put('known', {'input_i': -14.0, 'input_tp': -1.0})
+        analyzer = LoudnessAnalyzer(cache)
+        assert analyzer.wants('new') and not analyzer.wants('known') and not analyzer.wants(None)
+        with pytest.raises(ValueError):
+            analyzer.request('new', 'https://rr1.googlevideo.com/videoplayback')
+        # 이미 측정한 곡이면 분석하지 않고, discard면 파일만 지웁니다.
+        leftover = tmp_path / 'known.webm'
+        leftover.write_bytes(b'x')
+        analyzer.request('known', str(leftover), discard=True)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not leftover.exists():
+                break
+        assert not leftover.exists() and not analyzer._pending
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+import core.player
+from core.player import GuildPlayer, PlayerStatus, PlayOutcome, backoff_delay
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(core.player, 'backoff_delay', lambda failures: 0)
+
+
+def test_backoff_delay_grows_with_jitter_and_cap():
+    for failures, full in ((1, 1.0), (2, 2.0), (3, 4.0), (10, 30.0)):
+        for _ in range(20):
+            assert full * 0.5 <= backoff_delay(failures) <= full
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def make_player(outcomes, max_failures=3):
+    calls = {'start': 0, 'ended': [], 'give_up': []}
+
+    async def start_next():
+        calls['start'] += 1
+        return outcomes.pop(0) if outcomes else PlayOutcome.EMPTY
+
+    async def on_give_up(failures):
+        calls['give_up'].append(failures)
+
+    player = GuildPlayer(
+        asyncio.get_running_loop(), start_next, lambda song, error: calls['ended'].append((song, error)),
+        on_give_up, name='guild', max_failures=max_failures,
+    )
+    return player, calls
+
+
+def test_wake_starts_once_while_playing():
+    async def main():
+        player, calls = make_player([PlayOutcome.STARTED])
+        player.wake()
+        player.wake()
+        await settle()
+        assert player.status is PlayerStatus.PLAYING
+        assert calls['start'] == 1  # 재생 중에 들어온 wake는 무시합니다.
+        player.stop()
+    asyncio.run(main())
+
+
+def test_track_end_advances_to_next():
+    async def main():
+        player, calls = make_player([PlayOutcome.STARTED, PlayOutcome.STARTED, PlayOutcome.EMPTY])
+        player.wake()
+        await settle()
+        player.track_ended('first', None)
+        await settle()
+        assert calls['ended'] == [('first', None)]
+        assert player.status is PlayerStatus.PLAYING and player.started == 2
+        player.track_ended('second', 'boom')
+        await settle()
+        assert player.status is PlayerStatus.IDLE
+        assert calls['ended'][-1] == ('second', 'boom')
+        player.stop()
+    asyncio.run(main())
+
+
+def test_failures_skip_then_give_up():
+    async def main():
+        player, calls = make_player([PlayOutcome.FAILED] * 5, max_failures=3)
+        player.wake()
+        await settle()
+        assert calls['start'] == 3 and calls['give_up'] == [3]
+        assert player.status is PlayerStatus.IDLE and player.failures == 0 and player.skipped == 3
+        player.stop()
+    asyncio.run(main())
+
+
+def test_failure_counter_resets_after_success():
+    async def main():
+        player, calls = make_player([PlayOutcome.FAILED, PlayOutcome.FAILED, PlayOutcome.STARTED], max_failures=3)
+        player.wake()
+        await settle()
+        assert player.status is PlayerStatus.PLAYING
+        assert player.failures == 0 and calls['give_up'] == []
+        player.stop()
+    asyncio.run(main())
+
+
+def test_crash_in_start_next_counts_as_failure():
+    async def main():
+        outcomes = [RuntimeError('boom'), PlayOutcome.STARTED]
+
+        async def start_next():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        player = GuildPlayer(asyncio.get_running_loop(), start_next, lambda song, error: None)
+        player.wake()
+        await settle()
+        assert player.status is PlayerStatus.PLAYING and player.skipped == 1
+        player.stop()
+    asyncio.run(main())
+
+
+def test_stop_ignores_later_events():
+    async def main():
+        player, calls = make_player([PlayOutcome.STARTED])
+        player.stop()
+        player.wake()
+        await settle()
+        assert player.status is PlayerStatus.STOPPED and calls['start'] == 0
+    asyncio.run(main())
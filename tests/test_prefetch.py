@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import core.prefetch
+from core.prefetch import PREFETCH_REFRESH_MARGIN, Prefetcher, is_stream_fresh
+from core.scheduler import PRIORITY_PREFETCH
+from core.track import Track
+
+
+def stream_url(expires_at):
+    return f'https://rr1.googlevideo.com/videoplayback?expire={int(expires_at)}&itag=251'
+
+
+def make_song(video_id, expires_in=None):
+    song = Track.from_video_id(video_id, video_id)
+    if expires_in is not None:
+        song.prepared = True
+        song.stream_url = stream_url(time.time() + expires_in)
+    return song
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_is_stream_fresh():
+    assert not is_stream_fresh(make_song('a'), 60)
+    assert is_stream_fresh(make_song('a', 3600), 60)
+    assert not is_stream_fresh(make_song('a', 30), 60)
+    song = make_song('a', 0)
+    song.stream_url = 'https://example.com/audio.mp3'  # 만료 시각을 모르면 유효하다고 봅니다.
+    assert is_stream_fresh(song, 60)
+
+
+def test_prepares_window_and_cancels_songs_that_leave_it():
+    async def main():
+        queue = [make_song(f'v{i}') for i in range(5)]
+        started, cancelled = [], []
+
+        async def prepare(song, priority):
+            assert priority == PRIORITY_PREFETCH
+            started.append(song.video_id)
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(song.video_id)
+                raise
+            return True
+
+        prefetcher = Prefetcher(asyncio.get_running_loop(), lambda: queue, prepare, depth=2)
+        prefetcher.refresh()
+        await settle()
+        assert started == ['v0', 'v1'] and prefetcher.pending() == 2
+        prefetcher.refresh()  # 이미 준비 중인 곡은 다시 시작하지 않습니다.
+        await settle()
+        assert prefetcher.pending() == 2 and len(started) == 2
+        queue.insert(0, queue.pop(3))  # v3이 맨 앞으로 와서 v1이 창 밖으로 밀려남
+        prefetcher.refresh()
+        await settle()
+        assert cancelled == ['v1'] and started[-1] == 'v3'
+        prefetcher.cancel_all()
+        await settle()
+        assert prefetcher.pending() == 0 and sorted(cancelled) == ['v0', 'v1', 'v3']
+    asyncio.run(main())
+
+
+def test_refreshes_expiring_url_but_not_fresh_one():
+    async def main():
+        fresh, expiring = make_song('fresh', 3600), make_song('expiring', PREFETCH_REFRESH_MARGIN - 60)
+        queue = [fresh, expiring]
+        prepared = []
+
+        async def prepare(song, priority):
+            prepared.append(song.video_id)
+            song.prepared = True
+            song.stream_url = stream_url(time.time() + 3600)
+            return True
+
+        prefetcher = Prefetcher(asyncio.get_running_loop(), lambda: queue, prepare, depth=2)
+        prefetcher.refresh()
+        assert not expiring.prepared  # 곧 만료되는 URL은 재생에 쓰지 않도록 표시합니다.
+        await settle()
+        assert prepared == ['expiring'] and expiring.prepared
+        # 가장 먼저 만료되는 URL에 맞춰 다음 재검사를 예약합니다.
+        assert prefetcher._timer is not None
+        assert prefetcher._timer.when() - asyncio.get_running_loop().time() > 3600 - PREFETCH_REFRESH_MARGIN - 5
+        prefetcher.cancel_all()
+        assert prefetcher._timer is None
+    asyncio.run(main())
+
+
+def test_failed_song_is_not_retried_until_it_leaves_window(monkeypatch):
+    monkeypatch.setattr(core.prefetch.logger, 'disabled', True)
+
+    async def main():
+        song = make_song('bad')
+        queue = [song]
+        attempts = []
+
+        async def prepare(song, priority):
+            attempts.append(song.video_id)
+            if len(attempts) == 1:
+                raise RuntimeError('boom')
+            return False
+
+        prefetcher = Prefetcher(asyncio.get_running_loop(), lambda: queue, prepare, depth=2)
+        prefetcher.refresh()
+        await settle()
+        prefetcher.refresh()
+        await settle()
+        assert attempts == ['bad']
+        queue.clear()
+        prefetcher.refresh()
+        queue.append(song)
+        prefetcher.refresh()
+        await settle()
+        assert attempts == ['bad', 'bad']
+        prefetcher.cancel_all()
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from core.scheduler import (
+    PRIORITY_AUTOPLAY, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, RequestDropped, RequestScheduler,
+)
+
+RESERVE = {PRIORITY_INTERACTIVE: 0, PRIORITY_PREFETCH: 2, PRIORITY_AUTOPLAY: 4}
+
+
+def make_scheduler(burst=5, rate=1e-9, max_wait=None):
+    # 토큰이 사실상 다시 차지 않으므로 refund()로만 토큰을 돌려줍니다.
+    max_wait = max_wait or {PRIORITY_INTERACTIVE: None, PRIORITY_PREFETCH: 0, PRIORITY_AUTOPLAY: 0}
+    return RequestScheduler(rate=rate, burst=burst, reserve=RESERVE, max_wait=max_wait)
+
+
+def test_low_priority_leaves_reserve_for_interactive():
+    async def main():
+        scheduler = make_scheduler(burst=5)
+        await scheduler.acquire(PRIORITY_AUTOPLAY)  # 5 >= 1 + 4
+        with pytest.raises(RequestDropped):
+            await scheduler.acquire(PRIORITY_AUTOPLAY)  # 4개 남음: 예약분만 남았으므로 거절
+        await scheduler.acquire(PRIORITY_PREFETCH)  # 4 >= 1 + 2
+        await scheduler.acquire(PRIORITY_PREFETCH)  # 3 >= 1 + 2
+        with pytest.raises(RequestDropped):
+            await scheduler.acquire(PRIORITY_PREFETCH)
+        for _ in range(2):
+            await scheduler.acquire(PRIORITY_INTERACTIVE)  # 사용자 요청은 마지막 토큰까지 씁니다.
+        stats = scheduler.stats()
+        assert stats['granted'] == {'interactive': 2, 'prefetch': 2, 'autocomplete': 0, 'autoplay': 1}
+        assert stats['dropped']['prefetch'] == 1 and stats['dropped']['autoplay'] == 1
+
+    asyncio.run(main())
+
+
+def test_max_wait_drops_waiting_request():
+    async def main():
+        scheduler = make_scheduler(burst=1, max_wait={PRIORITY_INTERACTIVE: None, PRIORITY_PREFETCH: 0.05})
+        await scheduler.acquire(PRIORITY_INTERACTIVE)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(RequestDropped):
+            await scheduler.acquire(PRIORITY_PREFETCH)
+        assert 0.04 <= loop.time() - started < 1.0
+        assert scheduler.stats()['waiting']['prefetch'] == 0
+
+    asyncio.run(main())
+
+
+def test_waiters_are_served_by_priority():
+    async def main():
+        scheduler = make_scheduler(burst=2, max_wait={PRIORITY_INTERACTIVE: None, PRIORITY_PREFETCH: None})
+        scheduler.reserve = {PRIORITY_INTERACTIVE: 0, PRIORITY_PREFETCH: 0}
+        for _ in range(2):
+            await scheduler.acquire(PRIORITY_INTERACTIVE)
+        order = []
+
+        async def request(priority, name):
+            await scheduler.acquire(priority)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(request(PRIORITY_PREFETCH, 'prefetch'))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(request(PRIORITY_INTERACTIVE, 'interactive')))
+        await asyncio.sleep(0)
+        scheduler.refund(PRIORITY_INTERACTIVE)
+        scheduler.refund(PRIORITY_INTERACTIVE)
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        assert order == ['interactive', 'prefetch']
+
+    asyncio.run(main())
+
+
+def test_boost_raises_waiting_priority():
+    async def main():
+        scheduler = make_scheduler(burst=3, max_wait={PRIORITY_INTERACTIVE: None, PRIORITY_PREFETCH: None})
+        for _ in range(3):
+            await scheduler.acquire(PRIORITY_INTERACTIVE)
+        waiter = asyncio.ensure_future(scheduler.acquire(PRIORITY_PREFETCH, key='k'))
+        await asyncio.sleep(0)
+        scheduler.refund(PRIORITY_INTERACTIVE)  # 토큰 1개: 예약분 때문에 prefetch는 아직 못 받음
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        scheduler.boost('k', PRIORITY_INTERACTIVE)
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_take_token():
+    async def main():
+        scheduler = make_scheduler(burst=1, max_wait={PRIORITY_INTERACTIVE: None})
+        await scheduler.acquire(PRIORITY_INTERACTIVE)
+        waiter = asyncio.ensure_future(scheduler.acquire(PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        scheduler.refund(PRIORITY_INTERACTIVE)
+        await asyncio.sleep(0.01)
+        assert scheduler.tokens == 1
+
+    asyncio.run(main())
+
+
+def test_explicit_empty_settings_are_kept():
+    async def main():
+        # 빈 dict는 "예약분 없음, 무기한 대기"이지 기본값이 아닙니다.
+        scheduler = RequestScheduler(rate=1e-9, burst=1, reserve={}, max_wait={})
+        assert scheduler.reserve == {} and scheduler.max_wait == {}
+        await scheduler.acquire(PRIORITY_AUTOPLAY)
+        assert scheduler.tokens < 1
+
+    asyncio.run(main())
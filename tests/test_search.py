@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from core.search import SearchCache, TitleIndex, normalize_query
+
+
+class FakeBackend:
+    def __init__(self, items=()):
+        self.data = {('title', key): (value, updated_at) for key, value, updated_at in items}
+
+    async def items_async(self, namespace):
+        return [(key, value, updated_at) for (ns, key), (value, updated_at) in self.data.items() if ns == namespace]
+
+    async def get_async(self, namespace, key):
+        item = self.data.get((namespace, key))
+        return item[0] if item is not None else None
+
+    def put(self, namespace, key, value, expires_at=None):
+        self.data[(namespace, key)] = (value, time.time())
+
+
+def ids(results):
+    return [entry['id'] for entry in results]
+
+
+def test_normalize_query():
+    assert normalize_query('  IU   Ｐａｌｅｔｔｅ ') == 'iu palette'
+
+
+def test_fuzzy_match_tolerates_typos_and_case():
+    index = TitleIndex()
+    index.add('a', 'IU - Palette (feat. G-DRAGON)')
+    index.add('b', 'NewJeans - Hype Boy')
+    assert ids(index.search('palete')) == ['a']
+    assert ids(index.search('HYPE BOY')) == ['b']
+    assert index.search('completely different') == []
+    assert index.stats()['hits'] == 2 and index.stats()['misses'] == 1
+
+
+def test_shorter_title_ranks_first():
+    index = TitleIndex()
+    index.add('long', 'Hype Boy (Official MV) Performance Ver. Extended Edition')
+    index.add('short', 'Hype Boy')
+    assert ids(index.search('hype boy')) == ['short', 'long']
+
+
+def test_unknown_title_is_ignored():
+    index = TitleIndex()
+    index.add('a', 'Unknown Title')
+    index.add('b', '')
+    assert index.stats()['size'] == 0
+
+
+def test_retitle_replaces_postings():
+    index = TitleIndex()
+    index.add('a', 'Old Name')
+    index.add('a', 'Fresh Song')
+    assert index.search('old name') == []
+    assert ids(index.search('fresh song')) == ['a']
+
+
+def test_max_entries_evicts_least_recent():
+    index = TitleIndex(max_entries=2)
+    index.add('a', 'Alpha Song')
+    index.add('b', 'Bravo Song')
+    index.add('a', 'Alpha Song')  # 최근 사용으로 표시
+    index.add('c', 'Charlie Song')
+    assert index.search('bravo') == []
+    assert ids(index.search('alpha')) == ['a']
+    # 지운 곡의 트라이그램이 남지 않아야 합니다.
+    assert not any('b' in video_ids for video_ids in index._postings.values())
+
+
+def test_shared_add_writes_backend():
+    backend = FakeBackend()
+    index = TitleIndex(backend=backend)
+    index.add('a', 'Alpha Song')
+    index.add('b', 'Bravo Song', shared=True)
+    assert ('title', 'a') not in backend.data
+    assert backend.data[('title', 'b')][0] == 'Bravo Song'
+
+
+def test_load_fills_remaining_room_with_newest():
+    backend = FakeBackend([('old', 'Old Song', 1.0), ('mid', 'Middle Song', 2.0), ('new', 'Newest Song', 3.0)])
+    index = TitleIndex(max_entries=3, backend=backend)
+    index.add('live', 'Live Song')
+    asyncio.run(index.load())
+    assert index.stats()['size'] == 3
+    assert index.search('old song') == []
+    # 불러온 제목은 오래된 쪽에 들어가므로, 그새 추가된 곡보다 먼저 밀려납니다.
+    assert list(index._titles) == ['mid', 'new', 'live']
+
+
+def test_search_cache_ttl_and_backend():
+    backend = FakeBackend()
+    cache = SearchCache(ttl=60, backend=backend)
+    cache.put('iu', [{'id': 'a', 'title': 'Palette', 'duration': 200, 'url': 'https://expiring'}])
+    assert cache.get('iu') == [{'id': 'a', 'title': 'Palette', 'duration': 200}]
+    other = SearchCache(ttl=60, backend=backend)
+    assert other.get('iu') is None  # get()은 로컬 캐시만 봅니다.
+    assert ids(asyncio.run(other.get_async('iu'))) == ['a']
+    assert other.stats()['shared_hits'] == 1
+    expired = SearchCache(ttl=60)
+    expired.put('iu', [{'id': 'a'}])
+    expired._entries['iu'] = (time.time() - 1, expired._entries['iu'][1])
+    assert expired.get('iu') is None and expired.stats()['size'] == 0
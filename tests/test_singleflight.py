@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    async def main():
+        flight = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return 'result'
+
+        tasks = [asyncio.ensure_future(flight.do('k', work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flight.in_flight() == 1
+        release.set()
+        assert await asyncio.gather(*tasks) == ['result'] * 3
+        assert calls == 1
+        assert flight.stats() == {'in_flight': 0, 'started': 1, 'coalesced': 2, 'abandoned': 0}
+
+    asyncio.run(main())
+
+
+def test_exception_reaches_every_waiter():
+    async def main():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(flight.do('k', work), flight.do('k', work), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_cancelling_one_waiter_keeps_shared_work():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return 'done'
+
+        first = asyncio.ensure_future(flight.do('k', work))
+        second = asyncio.ensure_future(flight.do('k', work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == 'done'
+        assert first.cancelled()
+        assert flight.stats()['abandoned'] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelling_last_waiter_cancels_work():
+    async def main():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do('k', work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        assert flight.in_flight() == 0
+        assert flight.stats()['abandoned'] == 1
+
+    asyncio.run(main())
+
+
+def test_new_call_after_abandon_starts_fresh():
+    async def main():
+        flight = SingleFlight()
+        waiter = asyncio.ensure_future(flight.do('k', lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+        async def work():
+            return 'fresh'
+
+        assert await flight.do('k', work) == 'fresh'
+        assert flight.stats()['started'] == 2
+
+    asyncio.run(main())
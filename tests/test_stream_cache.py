@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from core.stream_cache import StreamCache, parse_stream_expiry
+
+
+def stream_url(expires_at):
+    return f'https://rr1.googlevideo.com/videoplayback?expire={int(expires_at)}&itag=251'
+
+
+def test_parse_stream_expiry_query_and_path():
+    assert parse_stream_expiry('https://x/videoplayback?expire=1700000000&id=1') == 1700000000
+    assert parse_stream_expiry('https://x/videoplayback?id=1&expire=1700000000') == 1700000000
+    assert parse_stream_expiry('https://x/videoplayback/expire/1700000000/id/1') == 1700000000
+
+
+def test_parse_stream_expiry_missing():
+    assert parse_stream_expiry(None) is None
+    assert parse_stream_expiry('') is None
+    assert parse_stream_expiry('https://x/videoplayback?id=1') is None
+    # 다른 파라미터 이름의 일부는 만료 시각이 아닙니다.
+    assert parse_stream_expiry('https://x/videoplayback?noexpire=1700000000') is None
+
+
+def test_hit_returns_copy():
+    cache = StreamCache()
+    cache.put('a', {'url': stream_url(time.time() + 3600), 'format_id': '251'})
+    entry = cache.get('a')
+    assert entry['format_id'] == '251'
+    entry['format_id'] = 'changed'
+    assert cache.get('a')['format_id'] == '251'
+    assert cache.stats()['hits'] == 2
+
+
+def test_entry_inside_safety_margin_is_dropped():
+    cache = StreamCache(safety_margin=120)
+    cache.put('a', {'url': stream_url(time.time() + 60)})
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['size'] == 0
+
+
+def test_min_ttl_misses_but_keeps_entry():
+    cache = StreamCache(safety_margin=120)
+    cache.put('a', {'url': stream_url(time.time() + 300)})
+    assert cache.get('a', min_ttl=600) is None
+    assert cache.get('a') is not None
+    assert cache.stats()['size'] == 1
+
+
+def test_default_ttl_without_expire():
+    cache = StreamCache(safety_margin=10, default_ttl=5)
+    cache.put('a', {'url': 'https://example.com/audio.webm'})
+    # 기본 TTL(5초)이 안전 여유(10초)보다 짧으므로 바로 만료로 취급합니다.
+    assert cache.get('a') is None
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = StreamCache(max_entries=2)
+    url = stream_url(time.time() + 3600)
+    cache.put('a', {'url': url})
+    cache.put('b', {'url': url})
+    assert cache.get('a') is not None  # a를 최근 사용으로
+    cache.put('c', {'url': url})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate():
+    cache = StreamCache()
+    cache.put('a', {'url': stream_url(time.time() + 3600)})
+    cache.invalidate('a')
+    assert cache.get('a') is None
+
+
+class FakeBackend:
+    def __init__(self):
+        self.data = {}
+
+    async def get_async(self, namespace, key):
+        return self.data.get((namespace, key))
+
+    def put(self, namespace, key, value, expires_at=None):
+        self.data[(namespace, key)] = value
+
+    def delete(self, namespace, key):
+        self.data.pop((namespace, key), None)
+
+
+def test_get_async_falls_back_to_backend():
+    backend = FakeBackend()
+    StreamCache(backend=backend).put('a', {'url': stream_url(time.time() + 3600)})
+    cache = StreamCache(backend=backend)
+    assert cache.get('a') is None  # get()은 로컬 캐시만 봅니다.
+    assert asyncio.run(cache.get_async('a')) is not None
+    assert cache.get('a') is not None
+    assert cache.stats()['shared_hits'] == 1
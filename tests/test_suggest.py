@@ -0,0 +1,69 @@
+import time
+
+from core.suggest import PrefixIndex, TrackSuggestions
+
+
+def ids(results):
+    return [entry['id'] for entry in results]
+
+
+def test_every_word_must_be_a_prefix():
+    index = PrefixIndex(10)
+    index.record('a', 'NewJeans - Hype Boy')
+    index.record('b', 'Hype Machine')
+    index.record('c', 'Boy With Luv')
+    assert sorted(ids(index.complete('hyp'))) == ['a', 'b']
+    assert ids(index.complete('hype bo')) == ['a']
+    assert ids(index.complete('BOY new')) == ['a']  # 단어 순서와 대소문자는 상관없습니다.
+    assert index.complete('hype luv') == []
+
+
+def test_score_orders_by_play_count():
+    index = PrefixIndex(10)
+    index.record('once', 'Song One')
+    for _ in range(3):
+        index.record('often', 'Song Two')
+    assert ids(index.complete('song')) == ['often', 'once']
+    assert ids(index.complete('', limit=1)) == ['often']
+
+
+def test_old_plays_decay():
+    now = time.time()
+    index = PrefixIndex(10, half_life=100)
+    index.record('old', 'Song Old', weight=4.0, now=now - 300)  # 지금은 0.5점
+    index.record('new', 'Song New', weight=1.0, now=now)
+    assert ids(index.complete('song')) == ['new', 'old']
+
+
+def test_eviction_removes_words():
+    index = PrefixIndex(2)
+    index.record('a', 'Alpha Song')
+    index.record('b', 'Bravo Song')
+    index.record('a', 'Alpha Song')  # 최근 재생으로 표시
+    index.record('c', 'Charlie Song')
+    assert len(index) == 2
+    assert index.complete('bravo') == []
+    assert sorted(ids(index.complete('song'))) == ['a', 'c']
+    assert all(video_id != 'b' for _, video_id in index._words)
+
+
+def test_guild_tracks_come_first():
+    suggestions = TrackSuggestions(guild_tracks=10, global_tracks=10)
+    for _ in range(5):
+        suggestions.record(2, 'popular', 'Love Song Popular')
+    suggestions.record(1, 'mine', 'Love Song Mine')
+    assert ids(suggestions.complete(1, 'love')) == ['mine', 'popular']
+    assert ids(suggestions.complete(3, 'love')) == ['popular', 'mine']
+    assert ids(suggestions.complete(1, 'love', limit=1)) == ['mine']
+
+
+def test_unknown_title_and_guild_limit():
+    suggestions = TrackSuggestions(guild_tracks=10, global_tracks=10, max_guilds=2)
+    suggestions.record(1, 'x', 'Unknown Title')
+    assert suggestions.stats()['global_tracks'] == 0
+    for guild_id in (1, 2, 3):
+        suggestions.record(guild_id, f'v{guild_id}', f'Song {guild_id}')
+    assert suggestions.stats()['guilds'] == 2
+    # 가장 오래 쓰지 않은 길드 1의 색인은 버려지지만 전체 색인에서는 여전히 찾습니다.
+    assert 1 not in suggestions._guilds
+    assert 'v1' in ids(suggestions.complete(1, 'song'))
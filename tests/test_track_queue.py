@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from core.track import Track
+from core.track_queue import TrackQueue
+
+
+def tracks(count, prefix='v'):
+    return [Track.from_video_id(f'{prefix}{i}', f'Song {i}') for i in range(count)]
+
+
+def ids(queue):
+    return [track.video_id for track in queue]
+
+
+def check_index(queue):
+    """펜윅 트리의 구간합이 실제 블록 길이와 같은지, 블록 크기가 한도 안인지 확인합니다."""
+    for i in range(1, len(queue._blocks) + 1):
+        lowest = i & -i
+        assert queue._tree[i] == sum(len(block) for block in queue._blocks[i - lowest:i])
+    assert all(0 < len(block) <= 2 * queue.block_size for block in queue._blocks)
+    assert sum(len(block) for block in queue._blocks) == len(queue)
+
+
+def test_basic_deque_operations():
+    queue = TrackQueue(tracks(3))
+    queue.appendleft(Track.from_video_id('first'))
+    queue.append(Track.from_video_id('last'))
+    assert ids(queue) == ['first', 'v0', 'v1', 'v2', 'last']
+    assert queue.popleft().video_id == 'first'
+    assert queue.pop().video_id == 'last'
+    assert queue[-1].video_id == 'v2'
+    queue.clear()
+    assert not queue
+    with pytest.raises(IndexError):
+        queue.popleft()
+
+
+def test_blocks_split_when_growing():
+    queue = TrackQueue(tracks(100), block_size=4)
+    assert len(queue._blocks) > 1
+    check_index(queue)
+    assert ids(queue) == [f'v{i}' for i in range(100)]
+    assert [queue[i].video_id for i in (0, 37, 99)] == ['v0', 'v37', 'v99']
+
+
+def test_blocks_merge_when_shrinking():
+    queue = TrackQueue(tracks(100), block_size=8)
+    blocks = len(queue._blocks)
+    for _ in range(90):
+        queue.pop(len(queue) // 2)
+        check_index(queue)
+    assert len(queue._blocks) < blocks
+    assert len(queue) == 10
+
+
+def test_matches_list_under_random_edits():
+    rng = random.Random(1234)
+    queue = TrackQueue(block_size=4)
+    expected = []
+    for step in range(2000):
+        operation = rng.random()
+        if operation < 0.45 or not expected:
+            position = rng.randint(0, len(expected))
+            track = Track.from_video_id(f'id{step % 50}')
+            queue.insert(position, track)
+            expected.insert(position, track)
+        elif operation < 0.8:
+            position = rng.randrange(len(expected))
+            assert queue.pop(position) is expected.pop(position)
+        else:
+            source, destination = rng.randrange(len(expected)), rng.randrange(len(expected))
+            track = expected.pop(source)
+            expected.insert(destination, track)
+            assert queue.move(source, destination) is track
+        assert len(queue) == len(expected)
+    check_index(queue)
+    assert list(queue) == expected
+    assert all(queue[i] is expected[i] for i in range(len(expected)))
+    assert set(queue.video_ids()) == {track.video_id for track in expected}
+
+
+def test_slices_read_only_the_range():
+    queue = TrackQueue(tracks(50), block_size=4)
+    assert [track.video_id for track in queue[10:15]] == ['v10', 'v11', 'v12', 'v13', 'v14']
+    assert queue[48:100] == queue[-2:]
+    assert queue[5:5] == []
+    assert [track.video_id for track in queue[0:6:2]] == ['v0', 'v2', 'v4']
+
+
+def test_has_video_counts_duplicates():
+    queue = TrackQueue()
+    first, second = Track.from_video_id('dup'), Track.from_video_id('dup')
+    queue.extend([first, second])
+    assert queue.discard(first)
+    assert queue.has_video('dup')
+    assert queue.discard(second)
+    assert not queue.has_video('dup')
+    assert not queue.discard(second)
+
+
+def test_remove_if_and_shuffle_keep_index():
+    queue = TrackQueue(tracks(40), block_size=4)
+    removed = queue.remove_if(lambda track: int(track.video_id[1:]) % 2)
+    assert removed == 20
+    assert not queue.has_video('v1')
+    queue.shuffle(random.Random(7))
+    check_index(queue)
+    assert sorted(ids(queue)) == sorted(f'v{i}' for i in range(0, 40, 2))
+
+
+def test_out_of_range_positions():
+    queue = TrackQueue(tracks(3))
+    with pytest.raises(IndexError):
+        queue[3]
+    with pytest.raises(IndexError):
+        queue.pop(-4)
+    queue.insert(100, Track.from_video_id('end'))  # 삽입은 list.insert처럼 끝으로 맞춥니다.
+    queue.insert(-100, Track.from_video_id('start'))
+    assert ids(queue)[0] == 'start' and ids(queue)[-1] == 'end'
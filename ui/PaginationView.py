@@ -12,16 +12,21 @@ class PaginationView(discord.ui.View):
         self.original_author = original_author
         self.items_per_page = items_per_page
         self.current_page = 1
-        # 총 페이지 계산
+        self.update_total_pages()
+        
+        self.message = None  # View가 전송된 메시지를 참조할 수 있도록
+
+    def update_total_pages(self):
+        """총 페이지를 다시 계산합니다. data는 실제 대기열이므로 보는 도중에 길이가 바뀔 수 있습니다."""
         self.total_pages = math.ceil(len(self.data) / self.items_per_page)
         # 데이터가 없을 경우 1페이지로 고정
         if self.total_pages == 0:
             self.total_pages = 1
-        
-        self.message = None  # View가 전송된 메시지를 참조할 수 있도록
+        self.current_page = min(self.current_page, self.total_pages)
 
     def create_embed(self):
         """현재 페이지에 맞는 임베드를 생성합니다."""
+        self.update_total_pages()
         
         # 현재 페이지의 시작과 끝 인덱스 계산
         start_index = (self.current_page - 1) * self.items_per_page
@@ -39,9 +44,8 @@ class PaginationView(discord.ui.View):
             # 임베드 설명란에 곡 목록 추가
             description_lines = []
             for i, item in enumerate(page_data, start=start_index + 1):
-                title = item.get('title', 'Unknown Title')
-                line = f"`{i}.` {title}"
-                if item.get('added_by') == 'autoplay':
+                line = f"`{i}.` {item.title}"
+                if item.added_by == 'autoplay':
                     line += " (추천)"
                 description_lines.append(line)
             
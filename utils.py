@@ -1,25 +1,54 @@
-import yt_dlp as youtube_dl
 import os
+import asyncio
 import logging
+import random
+
+from core.extractor import extraction_engine
+from core.singleflight import extraction_flight
+from core.scheduler import PRIORITY_AUTOPLAY
+from core.recommend import related_graph
 
 logger = logging.getLogger(__name__)
 
-def get_related_videos(video_id, max_results=5):
+async def fetch_related(video_id, priority=PRIORITY_AUTOPLAY):
+    """RD{video_id} 믹스를 받아 추천 그래프에 저장하고 관련 곡 전체를 반환합니다. 실패하면 None."""
     try:
-        # Using yt-dlp as the primary method for related videos
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': True,
-            'source_address': '0.0.0.0',  # Force IPv4 to potentially fix SSL errors
-            'cookiefile': './cookies.txt',
-        }
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-            mix_url = f"https://www.youtube.com/watch?v={video_id}&list=RD{video_id}"
-            playlist_info = ydl.extract_info(mix_url, download=False)
-            entries = playlist_info.get('entries', [])
-            # Filter out the original video and limit results
-            return [entry for entry in entries if entry and entry.get('id') and entry.get('id') != video_id][:max_results]
+        # Using the RD{video_id} mix playlist as the source of related videos
+        mix_url = f"https://www.youtube.com/watch?v={video_id}&list=RD{video_id}"
+        playlist_info = await extraction_flight.do(('related', mix_url), lambda: extraction_engine.extract('related', mix_url, priority, site='autoplay'))
+        # Filter out the original video
+        entries = [entry for entry in playlist_info.get('entries') or [] if entry and entry.get('id') and entry.get('id') != video_id]
+        related_graph.put(video_id, entries)
+        return [{'id': entry['id'], 'title': entry.get('title') or 'Unknown Title'} for entry in entries]
 
     except Exception as e:
-        logger.error(f"[utils] Failed to get related videos: {e}")
-        return []
+        logger.error("[utils] Failed to get related videos: %s", e)
+        return None
+
+async def related_candidates(video_id, excluded):
+    """추천 그래프에서 excluded(video id → bool)에 걸리지 않는 video_id의 관련 곡 목록을 찾습니다.
+
+    그래프에 목록이 있으면 네트워크 없이 고르고, 오래된 목록은 그대로 쓰면서 백그라운드에서 새로 받습니다.
+    video_id의 목록을 다 들었으면 이웃 곡들의 목록(2단계)에서 찾고, 그래도 없을 때만 이웃 곡 하나의 믹스를 새로 받습니다.
+    """
+    def unplayed(entries):
+        return [v for v in entries if v['id'] != video_id and not excluded(v['id'])]
+    node = await related_graph.get_async(video_id)
+    if node is None:
+        related_videos = await fetch_related(video_id) or []
+    else:
+        related_videos, fresh = node
+        if not fresh: asyncio.get_running_loop().create_task(fetch_related(video_id))
+    candidates = unplayed(related_videos)
+    if candidates: return candidates
+    neighbours = [v['id'] for v in related_videos]
+    random.shuffle(neighbours)
+    # 이웃 곡들의 목록은 저장소에서 한 번에 읽어 두고 메모리에서 고릅니다.
+    await related_graph.load(neighbours)
+    for neighbour in neighbours:
+        node = related_graph.get(neighbour)
+        if node and (candidates := unplayed(node[0])):
+            return candidates
+    if not neighbours: return []
+    logger.info("[utils] Recommendations around %s exhausted. Expanding from %s.", video_id, neighbours[0])
+    return unplayed(await fetch_related(neighbours[0]) or [])